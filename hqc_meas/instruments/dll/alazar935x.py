@@ -19,11 +19,14 @@ import time
 import math
 import numpy as np
 import ctypes
+from ctypes.util import find_library
 from inspect import cleandoc
+from threading import Lock
 
 from pyclibrary import CLibrary
 
 from ..dll_tools import DllInstrument
+from .alazar_acquisition import BufferAcquisition
 
 class DMABuffer:
     '''Buffer suitable for DMA transfers.
@@ -62,9 +65,10 @@ class DMABuffer:
             self.addr = ctypes.windll.kernel32.VirtualAlloc(
                 0, ctypes.c_long(size_bytes), MEM_COMMIT, PAGE_READWRITE)
         elif os.name == 'posix':
-            ctypes.libc.valloc.argtypes = [ctypes.c_long]
-            ctypes.libc.valloc.restype = ctypes.c_void_p
-            self.addr = ctypes.libc.valloc(size_bytes)
+            libc = ctypes.CDLL(find_library('c'))
+            libc.valloc.argtypes = [ctypes.c_long]
+            libc.valloc.restype = ctypes.c_void_p
+            self.addr = libc.valloc(size_bytes)
         else:
             raise Exception("Unsupported OS")
 
@@ -81,15 +85,309 @@ class DMABuffer:
             ctypes.windll.kernel32.VirtualFree.restype = ctypes.c_int
             ctypes.windll.kernel32.VirtualFree(ctypes.c_void_p(self.addr), 0, MEM_RELEASE)
         elif os.name == 'posix':
-            ctypes.libc.free(self.addr)
+            libc = ctypes.CDLL(find_library('c'))
+            libc.free.argtypes = [ctypes.c_void_p]
+            libc.free(self.addr)
         else:
             raise Exception("Unsupported OS")
 
 
+#: Sampling rate of the board (in samples per second).
+SAMPLES_PER_SEC = 500000000.0
+
+#: Input range of the channels (in V) and constants used to convert the raw
+#: 12 bits data (stored in the 12 most significant bits) into volts.
+CHANNEL_RANGE = 0.4
+BIT_SHIFT = 4
+CODE = (1 << (12 - 1)) - 0.5
+
+#: Maximal number of DMA buffers posted to the board. Buffers are reposted
+#: once processed so this does not limit the number of records.
+MAX_DMA_BUFFERS = 16
+
+
+def _demod_field_names(NdemodA, NdemodB, Nstep):
+    """Names of the I and Q fields of each demodulation and time step.
+
+    """
+    names = []
+    for i in range(NdemodA + NdemodB):
+        if i < NdemodA:
+            chanLetter = 'A'
+            zerosDemod = 1 + int(np.floor(np.log10(NdemodA)))
+            index = str(i).zfill(zerosDemod)
+        else:
+            chanLetter = 'B'
+            zerosDemod = 1 + int(np.floor(np.log10(NdemodB)))
+            index = str(i - NdemodA).zfill(zerosDemod)
+        zerosStep = 1 + int(np.floor(np.log10(Nstep[i])))
+        steps = []
+        for j in range(Nstep[i]):
+            if Nstep[i] > 1:
+                iindex = index + '_' + str(j).zfill(zerosStep)
+            else:
+                iindex = index
+            steps.append((chanLetter + 'I' + iindex, chanLetter + 'Q' + iindex))
+        names.append(steps)
+    return names
+
+
+class DemodPipeline(object):
+    """Streaming processing of the buffers acquired by the board.
+
+    Each buffer is demodulated as soon as it is complete using precomputed
+    weight tables, which include the folding of the records in blocks of an
+    integer number of periods, the averaging over the samples and the phase
+    of the start of the demodulation window. The per record products are
+    computed in single precision, the accumulations in double precision. In
+    averaging mode only the sum over the records of each sample is kept so
+    that the memory use does not depend on the number of records.
+
+    The buffers can be processed concurrently from several threads provided
+    each thread uses its own scratch space (see new_scratch).
+
+    Parameters
+    ----------
+    startaftertrig, duration, timestep, freq : list(float)
+        Parameters of the demodulations (in s and Hz) followed by the ones of
+        the traces (timestep and freq only for the demodulations).
+
+    NdemodA, NdemodB, NtraceA, NtraceB : int
+        Number of demodulations and traces on each channel.
+
+    recordsPerCapture, recordsPerBuffer : int
+        Total number of records and number of records in each buffer.
+
+    channel_number : int
+        Number of channels acquired (1 or 2).
+
+    average : bool
+        Whether to average the records.
+
+    """
+
+    def __init__(self, startaftertrig, duration, timestep, freq, NdemodA,
+                 NdemodB, NtraceA, NtraceB, recordsPerCapture,
+                 recordsPerBuffer, channel_number, average):
+        self.NdemodA = NdemodA
+        self.NdemodB = NdemodB
+        self.NtraceA = NtraceA
+        self.NtraceB = NtraceB
+        self.recordsPerCapture = recordsPerCapture
+        self.recordsPerBuffer = recordsPerBuffer
+        self.average = average
+        self.buffers_processed = 0
+        self._lock = Lock()
+
+        R = recordsPerBuffer
+        fs = SAMPLES_PER_SEC
+        Ndemod = NdemodA + NdemodB
+        channels = [0]*NdemodA + [1]*NdemodB + [0]*NtraceA + [1]*NtraceB
+        self.rows = [slice(c*(channel_number - 1)*R,
+                           (c*(channel_number - 1) + 1)*R)
+                     for c in channels]
+        self.windows = []
+        self.Nstep = []
+        self.weights = []
+        self.weights32 = []
+        self.offsets = []
+        self.shifted = []
+        self.work = []
+        self.accumulators = []
+
+        for i in range(Ndemod + NtraceA + NtraceB):
+            startSample = int(fs * startaftertrig[i])
+            samplesPerDemod = int(fs * duration[i])
+            self.windows.append(slice(startSample,
+                                      startSample + samplesPerDemod))
+            self.shifted.append(np.empty((R, samplesPerDemod), np.uint16))
+            if average:
+                self.accumulators.append(np.zeros(samplesPerDemod, np.int64))
+            if i >= Ndemod:
+                continue
+
+            if timestep[i]:
+                Nstep = samplesPerDemod // int(fs * timestep[i])
+                samplesPerBlock = samplesPerDemod
+                counts = np.ones(samplesPerDemod)
+            else:
+                # Cut each record in blocks of size equal to an integer
+                # number of periods if possible.
+                Nstep = 1
+                periodsPerBlock = 1
+                while (periodsPerBlock * fs < freq[i] * samplesPerDemod
+                       and periodsPerBlock * fs % freq[i]):
+                    periodsPerBlock += 1
+                samplesPerBlock = int(min(periodsPerBlock * fs / freq[i],
+                                          samplesPerDemod))
+                # Number of samples folded on each column of a block.
+                counts = np.bincount(np.arange(samplesPerDemod) %
+                                     samplesPerBlock)
+                counts = counts[np.arange(samplesPerDemod) % samplesPerBlock]
+
+            # Weights of each sample in the I and Q quadratures, including the
+            # rotation by the phase of the first sample of the window.
+            columns = np.arange(samplesPerDemod) % samplesPerBlock
+            phase = 2*np.pi*freq[i]*(columns + startSample)/fs
+            norm = 2./(samplesPerBlock // Nstep)/counts
+            weights = np.empty((samplesPerDemod, 2))
+            weights[:, 0] = norm*np.cos(phase)
+            weights[:, 1] = norm*np.sin(phase)
+            weights = weights.reshape((Nstep, -1, 2))
+
+            self.Nstep.append(Nstep)
+            self.weights.append(weights)
+            self.weights32.append(weights.astype(np.float32))
+            self.offsets.append(CHANNEL_RANGE*weights.sum(axis=1))
+            if not average:
+                self.work.append(np.empty((R, samplesPerDemod), np.float32))
+                self.accumulators.append(np.empty((recordsPerCapture, Nstep,
+                                                   2)))
+
+        # Preallocate the traces answer as it is filled buffer after buffer.
+        self.trace_names = self._trace_names()
+        biggerTrace = max([self.windows[i].stop - self.windows[i].start
+                           for i in range(Ndemod, len(self.windows))] or [0])
+        answerTypeTrace = ([(name, 'float64') for name in self.trace_names]
+                           or 'f')
+        if average:
+            self.answerTrace = np.zeros(biggerTrace, dtype=answerTypeTrace)
+        else:
+            self.answerTrace = np.zeros((recordsPerCapture, biggerTrace),
+                                        dtype=answerTypeTrace)
+
+    def new_scratch(self):
+        """Allocate the temporary arrays used to process a buffer.
+
+        Returns
+        -------
+        scratch : tuple
+            Arrays holding the shifted samples and their single precision
+            copies, to pass to process.
+
+        """
+        return ([np.empty_like(a) for a in self.shifted],
+                [np.empty_like(a) for a in self.work])
+
+    def process(self, raw, index=None, scratch=None):
+        """Process a buffer as soon as it has been filled by the board.
+
+        Parameters
+        ----------
+        raw : np.ndarray
+            Content of the buffer as an array of uint16 of shape
+            (recordsPerBuffer*channel_number, samplesPerRecord).
+
+        index : int, optional
+            Index of the buffer in the acquisition. By default the buffers
+            are assumed to be processed in order.
+
+        scratch : tuple, optional
+            Temporary arrays created by new_scratch, required when several
+            threads process buffers concurrently.
+
+        """
+        R = self.recordsPerBuffer
+        Ndemod = self.NdemodA + self.NdemodB
+        if index is None:
+            index = self.buffers_processed
+        records = slice(index*R, (index + 1)*R)
+        scale = CHANNEL_RANGE/CODE
+        shifted_arrays, work_arrays = scratch or (self.shifted, self.work)
+
+        for i, shifted in enumerate(shifted_arrays):
+            np.right_shift(raw[self.rows[i], self.windows[i]], BIT_SHIFT,
+                           out=shifted)
+
+            if self.average:
+                column_sums = shifted.sum(axis=0, dtype=np.int64)
+                with self._lock:
+                    self.accumulators[i] += column_sums
+
+            elif i < Ndemod:
+                work = work_arrays[i]
+                work[...] = shifted
+                weights = self.weights32[i]
+                if self.Nstep[i] == 1:
+                    res = np.dot(work, weights[0])[:, np.newaxis]
+                else:
+                    res = np.einsum('rsl,slc->rsc',
+                                    work.reshape((R, self.Nstep[i], -1)),
+                                    weights)
+                self.accumulators[i][records] = scale*res - self.offsets[i]
+
+            else:
+                trace = self.answerTrace[self.trace_names[i - Ndemod]]
+                out = trace[records, :shifted.shape[1]]
+                np.multiply(shifted, scale, out=out)
+                out -= CHANNEL_RANGE
+
+        with self._lock:
+            self.buffers_processed += 1
+
+    def result(self):
+        """Build the answers once all the buffers have been processed.
+
+        Returns
+        -------
+        answerDemod : np.ndarray
+            Structured array containing the I and Q quadratures of each
+            demodulation (one line per record if not averaging).
+
+        answerTrace : np.ndarray
+            Structured array containing the traces.
+
+        """
+        Ndemod = self.NdemodA + self.NdemodB
+        scale = CHANNEL_RANGE/CODE
+        names = _demod_field_names(self.NdemodA, self.NdemodB, self.Nstep)
+        answerTypeDemod = [(name, 'float64') for steps in names
+                           for pair in steps for name in pair] or 'f'
+        if self.average:
+            answerDemod = np.zeros(1, dtype=answerTypeDemod)
+        else:
+            answerDemod = np.zeros(self.recordsPerCapture,
+                                   dtype=answerTypeDemod)
+
+        for i in range(Ndemod):
+            if self.average:
+                mean = self.accumulators[i] / float(self.recordsPerCapture)
+                mean = mean.reshape((self.Nstep[i], -1))
+                res = (scale*np.einsum('sl,slc->sc', mean, self.weights[i]) -
+                       self.offsets[i])
+            else:
+                res = self.accumulators[i]
+            for j, (nameI, nameQ) in enumerate(names[i]):
+                answerDemod[nameI] = res[..., j, 0]
+                answerDemod[nameQ] = res[..., j, 1]
+
+        if self.average:
+            for i, name in enumerate(self.trace_names):
+                mean = (self.accumulators[Ndemod + i] /
+                        float(self.recordsPerCapture))
+                self.answerTrace[name][:mean.shape[0]] = (mean/CODE - 1) * \
+                    CHANNEL_RANGE
+
+        return answerDemod, self.answerTrace
+
+    def _trace_names(self):
+        """Names of the fields of the traces answer.
+
+        """
+        NtraceA, NtraceB = self.NtraceA, self.NtraceB
+        zerosTraceA = 1 + int(np.floor(np.log10(NtraceA))) if NtraceA else 0
+        zerosTraceB = 1 + int(np.floor(np.log10(NtraceB))) if NtraceB else 0
+        return (['A' + str(i).zfill(zerosTraceA) for i in range(NtraceA)] +
+                ['B' + str(i).zfill(zerosTraceB) for i in range(NtraceB)])
+
+
 class Alazar935x(DllInstrument):
 
     library = 'ATSApi.dll'
 
+    #: Counters of the last acquisition (AcquisitionStats).
+    acquisition_stats = None
+
     def __init__(self, connection_info, caching_allowed=True,
                  caching_permissions={}, auto_open=True):
 
@@ -186,12 +484,21 @@ class Alazar935x(DllInstrument):
                                  0)
 
     def get_demod(self, startaftertrig, duration, recordsPerCapture,
-                  recordsPerBuffer, timestep, freq, average, NdemodA, NdemodB, NtraceA, NtraceB):
+                  recordsPerBuffer, timestep, freq, average, NdemodA, NdemodB,
+                  NtraceA, NtraceB, workers=0, queue_size=4):
+        """Acquire and demodulate the signals of channels A and B.
+
+        The workers and queue_size arguments control the threaded
+        acquisition mode (see alazar_acquisition), by default the buffers are
+        processed in the calling thread. The counters of the acquisition are
+        stored in the acquisition_stats attribute.
+
+        """
 
         board = self._dll.GetBoardBySystemID(1, 1)()
 
         # Number of samples per record: must be divisible by 32
-        samplesPerSec = 500000000.0
+        samplesPerSec = SAMPLES_PER_SEC
         samplesPerTrace = int(samplesPerSec * np.max(np.array(startaftertrig) + np.array(duration)))
         if samplesPerTrace % 32 == 0:
             samplesPerRecord = int(samplesPerTrace)
@@ -211,13 +518,12 @@ class Alazar935x(DllInstrument):
         bytesPerRecord = bytesPerSample * samplesPerRecord
         bytesPerBuffer = int(bytesPerRecord * recordsPerBuffer*channel_number)
 
-        # For converting data into volts
-        channelRange = 0.4 # Volts
-        bitsPerSample = 12
-        bitShift = 4
-        code = (1 << (bitsPerSample - 1)) - 0.5
+        # Calculate the number of buffers in the acquisition
+        buffersPerAcquisition = recordsPerCapture // recordsPerBuffer
 
-        bufferCount = int(round(recordsPerCapture / recordsPerBuffer))
+        # Buffers are reposted as soon as they have been processed so only a
+        # limited number of them is needed.
+        bufferCount = min(buffersPerAcquisition, MAX_DMA_BUFFERS)
         buffers = []
         for i in range(bufferCount):
             buffers.append(DMABuffer(bytesPerSample, bytesPerBuffer))
@@ -229,9 +535,6 @@ class Alazar935x(DllInstrument):
         acquisition_timeout_sec = 10
         self._dll.SetRecordCount(board, int(recordsPerCapture))
 
-        # Calculate the number of buffers in the acquisition
-        buffersPerAcquisition = round(recordsPerCapture / recordsPerBuffer)
-
         channelSelect = 1 if not (NdemodB or NtraceB) else (2 if not (NdemodA or NtraceA) else 3)
         self._dll.BeforeAsyncRead(board, channelSelect,  # Channels A & B
                                   0,
@@ -254,195 +557,34 @@ class Alazar935x(DllInstrument):
             raise Exception("Error: Capture timeout. Verify trigger")
             time.sleep(10e-3)
 
-        # Preparation of the tables for the demodulation
-
-        startSample = []
-        samplesPerDemod = []
-        samplesPerBlock = []
-        NumberOfBlocks = []
-        samplesMissing = []
-        data = []
-        dataExtended = []
-
-        for i in range(NdemodA + NdemodB):
-            startSample.append( int(samplesPerSec * startaftertrig[i]) )
-            samplesPerDemod.append( int(samplesPerSec * duration[i]) )
-
-            if timestep[i]:
-                samplesPerBlock.append( samplesPerDemod[i] )
-            else:
-                # Check wheter it is possible to cut each record in blocks of size equal
-                # to an integer number of periods
-                periodsPerBlock = 1
-                while (periodsPerBlock * samplesPerSec < freq[i] * samplesPerDemod[i]
-                       and periodsPerBlock * samplesPerSec % freq[i]):
-                    periodsPerBlock += 1
-                samplesPerBlock.append( int(np.minimum(periodsPerBlock * samplesPerSec / freq[i],
-                                                      samplesPerDemod[i])) )
-
-            NumberOfBlocks.append( np.divide(samplesPerDemod[i], samplesPerBlock[i]) )
-            samplesMissing.append( (-samplesPerDemod[i]) % samplesPerBlock[i] )
-            # Makes the table that will contain the data
-            data.append( np.empty((recordsPerCapture, samplesPerBlock[i])) )
-            dataExtended.append( np.zeros((recordsPerBuffer, samplesPerDemod[i] + samplesMissing[i]),
-                                          dtype='uint16') )
+        # Preparation of the demodulation tables and of the accumulators.
+        pipeline = DemodPipeline(startaftertrig, duration, timestep, freq,
+                                 NdemodA, NdemodB, NtraceA, NtraceB,
+                                 recordsPerCapture, recordsPerBuffer,
+                                 channel_number, average)
 
-        for i in (np.arange(NtraceA + NtraceB) + NdemodA + NdemodB):
-            startSample.append( int(samplesPerSec * startaftertrig[i]) )
-            samplesPerDemod.append( int(samplesPerSec * duration[i]) )
-            data.append( np.empty((recordsPerCapture, samplesPerDemod[i])) )
+        def process(index, raw, scratch):
+            pipeline.process(np.reshape(raw,
+                                        (recordsPerBuffer*channel_number, -1)),
+                             index, scratch)
 
-        start = time.clock()
+        acquisition = BufferAcquisition(self._dll, board, buffers, process,
+                                        workers, queue_size, 10000,
+                                        pipeline.new_scratch)
+        self.acquisition_stats = acquisition.stats
+        try:
+            acquisition.run(buffersPerAcquisition)
+        finally:
+            self._dll.AbortAsyncRead(board)
 
-        buffersCompleted = 0
-        while buffersCompleted < buffersPerAcquisition:
+            for i in range(bufferCount):
+                buffer = buffers[i]
+                buffer.__exit__()
 
-            # Wait for the buffer at the head of the list of available
-            # buffers to be filled by the board.
-            buffer = buffers[buffersCompleted % len(buffers)]
-            self._dll.WaitAsyncBufferComplete(board, buffer.addr, 10000)
-
-            # Process data
-
-            dataRaw = np.reshape(buffer.buffer, (recordsPerBuffer*channel_number, -1))
-            dataRaw = dataRaw >> bitShift
-
-            for i in np.arange(NdemodA):
-                dataExtended[i][:,:samplesPerDemod[i]] = dataRaw[:recordsPerBuffer,startSample[i]:startSample[i]+samplesPerDemod[i]]
-                dataBlock = np.reshape(dataExtended[i],(recordsPerBuffer,-1,samplesPerBlock[i]))
-                data[i][buffersCompleted*recordsPerBuffer:(buffersCompleted+1)*recordsPerBuffer] = np.sum(dataBlock, axis=1)
-
-            for i in (np.arange(NdemodB) + NdemodA):
-                dataExtended[i][:,:samplesPerDemod[i]] = dataRaw[(channel_number-1)*recordsPerBuffer:channel_number*recordsPerBuffer,startSample[i]:startSample[i]+samplesPerDemod[i]]
-                dataBlock = np.reshape(dataExtended[i],(recordsPerBuffer,-1,samplesPerBlock[i]))
-                data[i][buffersCompleted*recordsPerBuffer:(buffersCompleted+1)*recordsPerBuffer] = np.sum(dataBlock, axis=1)
-
-            for i in (np.arange(NtraceA) + NdemodB + NdemodA):
-                data[i][buffersCompleted*recordsPerBuffer:(buffersCompleted+1)*recordsPerBuffer] = dataRaw[:recordsPerBuffer,startSample[i]:startSample[i]+samplesPerDemod[i]]
-
-            for i in (np.arange(NtraceB) + NtraceA + NdemodB + NdemodA):
-                data[i][buffersCompleted*recordsPerBuffer:(buffersCompleted+1)*recordsPerBuffer] = dataRaw[(channel_number-1)*recordsPerBuffer:channel_number*recordsPerBuffer,startSample[i]:startSample[i]+samplesPerDemod[i]]
-
-            buffersCompleted += 1
-
-            self._dll.PostAsyncBuffer(board, buffer.addr, buffer.size_bytes)
-
-        self._dll.AbortAsyncRead(board)
-
-        for i in range(bufferCount):
-            buffer = buffers[i]
-            buffer.__exit__()
-
-        print time.clock() - start
-
-        # Normalize the np.sum and convert data into Volts
-        for i in range(NdemodA + NdemodB):
-            normalisation = 1 if samplesMissing[i] else 0
-            data[i][:,:samplesPerBlock[i]-samplesMissing[i]] /= NumberOfBlocks[i] + normalisation
-            data[i][:,samplesPerBlock[i]-samplesMissing[i]:] /= NumberOfBlocks[i]
-            data[i] = (data[i] / code - 1) * channelRange
-        for i in (np.arange(NtraceA + NtraceB) + NdemodA + NdemodB):
-            data[i] = (data[i] / code - 1) * channelRange
-
-        # calculate demodulation tables
-        coses=[]
-        sines=[]
-        for i in range(NdemodA+NdemodB):
-            dem = np.arange(samplesPerBlock[i])
-            coses.append(np.cos(2. * math.pi * dem * freq[i] / samplesPerSec))
-            sines.append(np.sin(2. * math.pi * dem * freq[i] / samplesPerSec))
-
-        # prepare the structure of the answered array
-
-        if (NdemodA or NdemodB):
-            answerTypeDemod = []
-            Nstep = [(samplesPerDemod[i]/int(samplesPerSec*timestep[i]) if timestep[i] else 1) for i in range(NdemodA+NdemodB)]
-            for i in range(NdemodA+NdemodB):
-                if i<NdemodA:
-                    chanLetter = 'A'
-                    zerosDemod = 1 + int(np.floor(np.log10(NdemodA)))
-                    index = str(i).zfill(zerosDemod)
-                else:
-                    chanLetter = 'B'
-                    zerosDemod = 1 + int(np.floor(np.log10(NdemodB)))
-                    index = str(i-NdemodA).zfill(zerosDemod)
-                zerosStep = 1 + int(np.floor(np.log10(Nstep[i])))
-                for j in range(Nstep[i]):
-                    if Nstep[i]>1:
-                        iindex = index + '_' + str(j).zfill(zerosStep)
-                    else:
-                        iindex = index
-                    answerTypeDemod += [(chanLetter + 'I' + iindex, str(data[0].dtype)),
-                                        (chanLetter + 'Q' + iindex, str(data[0].dtype))]
-        else:
-            answerTypeDemod = 'f'
-
-        if (NtraceA or NtraceB):
-            zerosTraceA = 1 + int(np.floor(np.log10(NtraceA))) if NtraceA else 0
-            zerosTraceB = 1 + int(np.floor(np.log10(NtraceB))) if NtraceB else 0
-            answerTypeTrace = ( [('A' + str(i).zfill(zerosTraceA), str(data[0].dtype)) for i in range(NtraceA)]
-                              + [('B' + str(i).zfill(zerosTraceB), str(data[0].dtype)) for i in range(NtraceB)] )
-            biggerTrace = np.max(samplesPerDemod[NdemodA+NdemodB:])
-        else:
-            answerTypeTrace = 'f'
-            biggerTrace = 0
-
-        if average:
-            answerDemod = np.zeros(1, dtype=answerTypeDemod)
-            answerTrace = np.zeros(biggerTrace, dtype=answerTypeTrace)
-        else:
-            answerDemod = np.zeros(recordsPerCapture, dtype=answerTypeDemod)
-            answerTrace = np.zeros((recordsPerCapture, biggerTrace), dtype=answerTypeTrace)
-
-        # Demodulate the data, average them if asked and return the result
-
-        for i in np.arange(NdemodA+NdemodB):
-            if i<NdemodA:
-                chanLetter = 'A'
-                zerosDemod = 1 + int(np.floor(np.log10(NdemodA)))
-                index = str(i).zfill(zerosDemod)
-            else:
-                chanLetter = 'B'
-                zerosDemod = 1 + int(np.floor(np.log10(NdemodB)))
-                index = str(i-NdemodA).zfill(zerosDemod)
-            zerosStep = 1 + int(np.floor(np.log10(Nstep[i])))
-            angle = 2 * np.pi * freq[i] * startSample[i] / samplesPerSec
-            if average:
-                data[i] = np.mean(data[i], axis=0)
-                ansI = 2 * np.mean((data[i]*coses[i]).reshape(Nstep[i], -1), axis=1)
-                ansQ = 2 * np.mean((data[i]*sines[i]).reshape(Nstep[i], -1), axis=1)
-                for j in range(Nstep[i]):
-                    if Nstep[i]>1:
-                        iindex = index + '_' + str(j).zfill(zerosStep)
-                    else:
-                        iindex = index
-                    answerDemod[chanLetter + 'I' + iindex] = ansI[j] * np.cos(angle) - ansQ[j] * np.sin(angle)
-                    answerDemod[chanLetter + 'Q' + iindex] = ansI[j] * np.sin(angle) + ansQ[j] * np.cos(angle)
-            else:
-                ansI = 2 * np.mean((data[i]*coses[i]).reshape(recordsPerCapture, Nstep[i], -1), axis=2)
-                ansQ = 2 * np.mean((data[i]*sines[i]).reshape(recordsPerCapture, Nstep[i], -1), axis=2)
-                for j in range(Nstep[i]):
-                    if Nstep[i]>1:
-                        iindex = index + '_' + str(j).zfill(zerosStep)
-                    else:
-                        iindex = index
-                    answerDemod[chanLetter + 'I' + iindex] = ansI[:,j] * np.cos(angle) - ansQ[:,j] * np.sin(angle)
-                    answerDemod[chanLetter + 'Q' + iindex] = ansI[:,j] * np.sin(angle) + ansQ[:,j] * np.cos(angle)
-
-        for i in (np.arange(NtraceA+NtraceB) + NdemodB+NdemodA):
-            if i<NdemodA+NdemodB+NtraceA:
-                Tracestring = 'A' + str(i-NdemodA-NdemodB).zfill(zerosTraceA)
-            else:
-                Tracestring = 'B' + str(i-NdemodA-NdemodB-NtraceA).zfill(zerosTraceB)
-            if average:
-                answerTrace[Tracestring][:samplesPerDemod[i]] = np.mean(data[i], axis=0)
-            else:
-                answerTrace[Tracestring][:,:samplesPerDemod[i]] = data[i]
-
-        return answerDemod, answerTrace
+        return pipeline.result()
 
     def get_traces(self, timeaftertrig, recordsPerCapture,
-                   recordsPerBuffer, average):
+                   recordsPerBuffer, average, workers=0, queue_size=4):
 
         board = self._dll.GetBoardBySystemID(1, 1)()
 
@@ -479,7 +621,8 @@ class Alazar935x(DllInstrument):
         self._dll.SetRecordCount(board, recordsPerCapture)
 
         # Calculate the number of buffers in the acquisition
-        buffersPerAcquisition = math.ceil(recordsPerCapture / recordsPerBuffer)
+        buffersPerAcquisition = int(math.ceil(recordsPerCapture /
+                                              float(recordsPerBuffer)))
 
         self._dll.BeforeAsyncRead(board, 3,  # Channels A & B
                                   0,
@@ -506,24 +649,23 @@ class Alazar935x(DllInstrument):
         dataA = np.empty((recordsPerCapture, samplesPerRecord))
         dataB = np.empty((recordsPerCapture, samplesPerRecord))
 
-        buffersCompleted = 0
-        while buffersCompleted < buffersPerAcquisition:
-            # Wait for the buffer at the head of the list of available
-            # buffers to be filled by the board.
-            buffer = buffers[buffersCompleted % len(buffers)]
-            self._dll.WaitAsyncBufferComplete(board, buffer.addr, 500)
-
-            data = np.reshape(buffer.buffer, (recordsPerBuffer*channel_number, -1))
-            dataA[buffersCompleted*recordsPerBuffer:(buffersCompleted+1)*recordsPerBuffer] = data[:recordsPerBuffer]
-            dataB[buffersCompleted*recordsPerBuffer:(buffersCompleted+1)*recordsPerBuffer] = data[recordsPerBuffer:]
-            buffersCompleted += 1
-
-            self._dll.PostAsyncBuffer(board, buffer.addr, buffer.size_bytes)
-
-        self._dll.AbortAsyncRead(board)
-
-        for buffer in buffers:
-            buffer.__exit__()
+        def process(index, raw, scratch):
+            data = np.reshape(raw, (recordsPerBuffer*channel_number, -1))
+            records = slice(index*recordsPerBuffer,
+                            (index + 1)*recordsPerBuffer)
+            dataA[records] = data[:recordsPerBuffer]
+            dataB[records] = data[recordsPerBuffer:]
+
+        acquisition = BufferAcquisition(self._dll, board, buffers, process,
+                                        workers, queue_size, 500)
+        self.acquisition_stats = acquisition.stats
+        try:
+            acquisition.run(buffersPerAcquisition)
+        finally:
+            self._dll.AbortAsyncRead(board)
+
+            for buffer in buffers:
+                buffer.__exit__()
 
         # Re-shaping of the data for demodulation and demodulation
         dataA = dataA[:,1:samplesPerTrace + 1]
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : alazar_acquisition.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Acquisition loop shared by the Alazar drivers.
+
+The board fills the DMA buffers in the order in which they were posted and
+stops the acquisition if it runs out of buffers. In the sequential mode the
+data of a buffer is processed before the buffer is posted again, so a slow
+processing directly delays the reposting. In the threaded mode the calling
+thread only waits on the buffers, copies them into a staging array and posts
+them again, the processing being done by a pool of worker threads fed through
+a bounded queue. The copy is cheap compared to the processing and keeps the
+DMA buffers in the strict order expected by the board.
+
+"""
+import logging
+from inspect import cleandoc
+from threading import Thread, Event
+from timeit import default_timer
+from Queue import Queue, Empty
+
+import numpy as np
+
+from ..driver_tools import InstrIOError
+
+
+class AcquisitionStats(object):
+    """Counters describing the last acquisition.
+
+    Attributes
+    ----------
+    buffers : int
+        Number of buffers acquired.
+
+    overruns : int
+        Number of times the board reported that it ran out of buffers.
+
+    backpressure : int
+        Number of times the acquisition thread had to wait for a worker to
+        release a staging array (threaded mode only).
+
+    max_queue_depth : int
+        Maximal number of buffers waiting to be processed.
+
+    wait_time : float
+        Time spent waiting for the board (in s).
+
+    process_time : float
+        Time spent processing the buffers (in s), summed over the workers.
+
+    """
+
+    def __init__(self):
+        self.buffers = 0
+        self.overruns = 0
+        self.backpressure = 0
+        self.max_queue_depth = 0
+        self.wait_time = 0.0
+        self.process_time = 0.0
+
+    def as_dict(self):
+        """Counters as a dictionary.
+
+        """
+        return dict(self.__dict__)
+
+
+class BufferAcquisition(object):
+    """Wait on the DMA buffers filled by the board and process them.
+
+    Parameters
+    ----------
+    dll : CLibrary
+        Library used to communicate with the board.
+
+    board : int
+        Handle of the board.
+
+    buffers : list(DMABuffer)
+        Buffers already posted to the board.
+
+    process : callable
+        Function called with the index of the buffer in the acquisition, the
+        content of the buffer (flat array) and the scratch space of the
+        worker. In threaded mode the calls happen concurrently and are not
+        ordered, so the function must only write to locations depending on
+        the index or protect its accumulations.
+
+    workers : int, optional
+        Number of worker threads. 0 processes the buffers in the calling
+        thread.
+
+    queue_size : int, optional
+        Maximal number of buffers waiting to be processed.
+
+    timeout : int, optional
+        Timeout (in ms) used when waiting for a buffer.
+
+    scratch_factory : callable, optional
+        Function creating the scratch space of a worker. In sequential mode
+        None is passed as scratch.
+
+    """
+
+    def __init__(self, dll, board, buffers, process, workers=0, queue_size=4,
+                 timeout=10000, scratch_factory=None):
+        self.dll = dll
+        self.board = board
+        self.buffers = buffers
+        self.process = process
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.scratch_factory = scratch_factory
+        self.stats = AcquisitionStats()
+
+    def run(self, count):
+        """Acquire and process a given number of buffers.
+
+        Returns
+        -------
+        stats : AcquisitionStats
+            Counters of the acquisition (also accessible through the stats
+            attribute while the acquisition is running).
+
+        """
+        if self.workers:
+            self._run_threaded(count)
+        else:
+            self._run_sequential(count)
+        return self.stats
+
+    def _run_sequential(self, count):
+        """Process each buffer in the calling thread before reposting it.
+
+        """
+        stats = self.stats
+        for index in xrange(count):
+            buffer = self.buffers[index % len(self.buffers)]
+            self._wait(buffer)
+            tic = default_timer()
+            self.process(index, buffer.buffer, None)
+            stats.process_time += default_timer() - tic
+            self._post(buffer)
+
+    def _run_threaded(self, count):
+        """Hand the buffers to the workers and repost them immediately.
+
+        """
+        stats = self.stats
+        free = Queue()
+        for i in range(self.queue_size + self.workers):
+            free.put(np.empty_like(self.buffers[0].buffer))
+        pending = Queue(self.queue_size)
+        abort = Event()
+        errors = []
+        times = [0.0]*self.workers
+
+        def work(worker):
+            scratch = self.scratch_factory() if self.scratch_factory else None
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                index, raw = item
+                # Once an error occurred the remaining buffers are dropped.
+                if not abort.is_set():
+                    tic = default_timer()
+                    try:
+                        self.process(index, raw, scratch)
+                    except Exception as e:
+                        logger = logging.getLogger(__name__)
+                        logger.exception('Failed to process buffer %d', index)
+                        errors.append(e)
+                        abort.set()
+                    times[worker] += default_timer() - tic
+                free.put(raw)
+
+        threads = [Thread(target=work, args=(i,),
+                          name='AlazarWorker-{}'.format(i))
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            for index in xrange(count):
+                if abort.is_set():
+                    break
+                buffer = self.buffers[index % len(self.buffers)]
+                self._wait(buffer)
+                try:
+                    staging = free.get_nowait()
+                except Empty:
+                    stats.backpressure += 1
+                    staging = free.get()
+                staging[...] = buffer.buffer
+                self._post(buffer)
+                pending.put((index, staging))
+                stats.max_queue_depth = max(stats.max_queue_depth,
+                                            pending.qsize())
+        finally:
+            for thread in threads:
+                pending.put(None)
+            for thread in threads:
+                thread.join()
+            stats.process_time += sum(times)
+
+        if errors:
+            raise errors[0]
+
+    def _wait(self, buffer):
+        """Wait for a buffer to be filled and check the returned code.
+
+        """
+        stats = self.stats
+        tic = default_timer()
+        ret = self.dll.WaitAsyncBufferComplete(self.board, buffer.addr,
+                                               self.timeout)()
+        stats.wait_time += default_timer() - tic
+        if ret == self.dll.ApiBufferOverflow:
+            stats.overruns += 1
+            raise InstrIOError(cleandoc('''The board ran out of buffers after
+                {} buffers, the processing is too slow.'''.format(
+                stats.buffers)))
+        elif ret != self.dll.ApiSuccess:
+            raise InstrIOError(self.dll.AlazarErrorToText(ret)())
+        stats.buffers += 1
+
+    def _post(self, buffer):
+        """Give back a buffer to the board.
+
+        """
+        self.dll.PostAsyncBuffer(self.board, buffer.addr, buffer.size_bytes)
@@ -23,6 +23,9 @@ the VISA library.
     instrument_properties :
         subclass of property allowing to cache a property on certain condition,
         and to reset the cache.
+    InstrumentMeta :
+        metaclass of `BaseInstrument` indexing the instrument properties of
+        each driver class when it is created.
     secure_communication :
         decorator making sure that a communication error cannot simply be
         resolved by attempting again to send a message.
@@ -32,6 +35,7 @@ from textwrap import fill
 from inspect import cleandoc
 import inspect
 from functools import wraps
+from timeit import default_timer
 
 
 class InstrError(Exception):
@@ -72,12 +76,17 @@ class instrument_property(property):
             name = self.name
             if name in obj._caching_permissions:
                 try:
-                    return obj._cache[name]
+                    value = obj._cache[name]
                 except KeyError:
-                    aux = super(instrument_property, self).__get__(obj,
-                                                                   objtype)
-                    obj._cache[name] = aux
-                    return aux
+                    pass
+                else:
+                    if obj._is_fresh(name):
+                        obj.cache_hits += 1
+                        return value
+                obj.cache_misses += 1
+                aux = super(instrument_property, self).__get__(obj, objtype)
+                obj._store(name, aux)
+                return aux
             else:
                 return super(instrument_property, self).__get__(obj, objtype)
 
@@ -90,15 +99,25 @@ class instrument_property(property):
         name = self.name
         if name in obj._caching_permissions:
             try:
-                if obj._cache[name] == value:
+                if obj._cache[name] == value and obj._is_fresh(name):
                     return
             except KeyError:
                 pass
             super(instrument_property, self).__set__(obj, value)
-            obj._cache[name] = value
+            obj._store(name, value)
+            # The command may only be queued, remember the cached value is
+            # not yet the instrument one.
+            pending = obj._pending_settings()
+            if pending is not None:
+                pending.append((obj, name))
         else:
             super(instrument_property, self).__set__(obj, value)
 
+        # The instrument setting changed, so might have the ones depending on
+        # it.
+        if name in obj._cache_dependents:
+            obj._discard(obj._cache_dependents[name])
+
 
 def secure_communication(max_iter=2):
     """Decorator making sure that a communication error cannot simply be
@@ -136,6 +155,51 @@ def secure_communication(max_iter=2):
     return decorator
 
 
+class InstrumentMeta(type):
+    """Metaclass indexing the instrument properties of a driver class.
+
+    The names of the instrument properties are collected once when the class
+    is created (instead of each time the cache is cleared or checked) and the
+    `cache_dependencies` declared by the class are expanded so that changing
+    a property invalidates all the properties depending on it, directly or
+    not.
+
+    """
+
+    def __init__(cls, name, bases, dct):
+        super(InstrumentMeta, cls).__init__(name, bases, dct)
+        test = lambda obj: isinstance(obj, instrument_property)
+        props = frozenset(n for n, _ in inspect.getmembers(cls, test))
+        cls._instrument_properties = props
+
+        for prop in cls.cache_timeouts:
+            if prop not in props:
+                mess = '{} has no instrument property {} (cache_timeouts)'
+                raise ValueError(mess.format(name, prop))
+
+        dependencies = cls.cache_dependencies
+        for prop, dependents in dependencies.iteritems():
+            for aux in (prop,) + tuple(dependents):
+                if aux not in props:
+                    mess = ('{} has no instrument property {} '
+                            '(cache_dependencies)')
+                    raise ValueError(mess.format(name, aux))
+
+        closure = {}
+        for prop in dependencies:
+            dependents = set()
+            to_visit = list(dependencies[prop])
+            while to_visit:
+                aux = to_visit.pop()
+                if aux not in dependents:
+                    dependents.add(aux)
+                    to_visit.extend(dependencies.get(aux, ()))
+            dependents.discard(prop)
+            if dependents:
+                closure[prop] = frozenset(dependents)
+        cls._cache_dependents = closure
+
+
 class BaseInstrument(object):
     """Base class for all drivers
 
@@ -157,6 +221,18 @@ class BaseInstrument(object):
     ----------
     caching_permissions : dict(str : bool)
         Dict specifying which instrument properties can be cached.
+    cache_dependencies : dict(str : iterable(str))
+        Dict specifying for an instrument property the properties whose cached
+        value becomes invalid when it is set (or its cache cleared). The
+        dependencies are transitive.
+    cache_timeouts : dict(str : float)
+        Dict specifying the time (in s) after which the cached value of an
+        instrument property is considered outdated and queried again.
+    cache_hits : int
+        Number of reads of an instrument property answered by the cache.
+    cache_misses : int
+        Number of reads of a cached instrument property which required to
+        query the instrument.
     secure_com_except : tuple(Exception)
         Tuple of the exceptions to be catched by the `secure_communication`
         decorator
@@ -180,7 +256,11 @@ class BaseInstrument(object):
         Clear the cache of some or all instrument properties
 
     """
+    __metaclass__ = InstrumentMeta
+
     caching_permissions = {}
+    cache_dependencies = {}
+    cache_timeouts = {}
     secure_com_except = (InstrIOError)
     owner = ''
 
@@ -196,6 +276,9 @@ class BaseInstrument(object):
         else:
             self._caching_permissions = set([])
         self._cache = {}
+        self._cache_expiry = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def open_connection(self):
         """Open a connection to an instrument
@@ -254,18 +337,21 @@ class BaseInstrument(object):
         Parameters
         ----------
         properties : iterable of str, optionnal
-            Name of the properties whose cache should be cleared. All caches
-            will be cleared if not specified.
+            Name of the properties whose cache should be cleared (along with
+            the cache of the properties depending on them). All caches will be
+            cleared if not specified.
 
         """
-        test = lambda obj: isinstance(obj, instrument_property)
-        cache = self._cache
         if properties:
-            for name, instr_prop in inspect.getmembers(self.__class__, test):
-                if name in properties and name in cache:
-                    del cache[name]
+            names = set(self._instrument_properties.intersection(properties))
+            dependents = self._cache_dependents
+            for name in list(names):
+                if name in dependents:
+                    names.update(dependents[name])
+            self._discard(names)
         else:
             self._cache = {}
+            self._cache_expiry = {}
 
     def check_cache(self, properties=None):
         """Return the value of the cache of the instruments
@@ -283,13 +369,48 @@ class BaseInstrument(object):
             None will be returned for the field with no cached value.
 
         """
-        test = lambda obj: isinstance(obj, instrument_property)
         cache = {}
         if properties:
-            for name, instr_prop in inspect.getmembers(self.__class__, test):
-                if name in properties:
+            for name in self._instrument_properties.intersection(properties):
+                if self._is_fresh(name):
                     cache[name] = self._cache.get(name)
+                else:
+                    cache[name] = None
         else:
-            cache = self._cache.copy()
+            cache = dict((name, value) for name, value
+                         in self._cache.iteritems() if self._is_fresh(name))
 
         return cache
+
+    def _store(self, name, value):
+        """Cache the value of an instrument property.
+
+        """
+        self._cache[name] = value
+        if name in self.cache_timeouts:
+            self._cache_expiry[name] = (default_timer() +
+                                        self.cache_timeouts[name])
+
+    def _pending_settings(self):
+        """List in which to record the properties set while the commands are
+        queued rather than sent (None when commands are sent immediately).
+
+        """
+        return None
+
+    def _is_fresh(self, name):
+        """Check that the cached value of a property has not expired.
+
+        """
+        expiry = self._cache_expiry.get(name)
+        return expiry is None or default_timer() < expiry
+
+    def _discard(self, names):
+        """Remove the cached values of the specified properties.
+
+        """
+        cache = self._cache
+        expiry = self._cache_expiry
+        for name in names:
+            cache.pop(name, None)
+            expiry.pop(name, None)
@@ -23,6 +23,12 @@ class InstrUser(Declarative):
         or not the operation succeeded. The released_profiles command must
         not be called by the release_method.
 
+    invalidate_method : callable, optional
+        Callable called when profiles previously used by this user (and
+        released since) are given to another user. It will be passed the
+        workbench and the list of profiles. Users keeping connections open
+        after releasing a profile should close them.
+
     default_policy:
         Does by default the user allows the manager to get the profile back
         when needed.
@@ -30,4 +36,6 @@ class InstrUser(Declarative):
     """
     release_method = d_(Callable())
 
+    invalidate_method = d_(Callable())
+
     default_policy = d_(Enum('releasable', 'unreleasable'))
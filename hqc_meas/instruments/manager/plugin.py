@@ -93,6 +93,7 @@ class InstrManagerPlugin(HasPrefPlugin):
         self._forms.clear()
         self._profiles_map.clear()
         self._used_profiles.clear()
+        self._last_users.clear()
 
     def driver_types_request(self, driver_types):
         """ Give access to the driver type implementation
@@ -231,6 +232,20 @@ class InstrManagerPlugin(HasPrefPlugin):
         used = {prof: new_owner for prof in profiles}
         self._used_profiles.update(used)
 
+        # Let the previous users of the profiles know that they should not
+        # keep using the connections they may have kept open.
+        to_invalidate = defaultdict(list)
+        for prof in profiles:
+            last_user = self._last_users.get(prof)
+            if last_user and last_user != new_owner:
+                to_invalidate[last_user].append(prof)
+        self._last_users.update(used)
+
+        for user_id, profs in to_invalidate.iteritems():
+            decl = self._users.get(user_id)
+            if decl and decl.invalidate_method:
+                decl.invalidate_method(self.workbench, profiles=profs)
+
         mapping = self._profiles_map
         profile_objects = {prof: open_profile(mapping[prof])
                            for prof in profiles}
@@ -410,6 +425,10 @@ class InstrManagerPlugin(HasPrefPlugin):
     # Mapping between profile names and user id.
     _used_profiles = Dict(Unicode(), Unicode())
 
+    # Mapping between profile names and id of the last user (kept after the
+    # profiles are released).
+    _last_users = Dict(Unicode(), Unicode())
+
     # Mapping between plugin_id and InstrUser declaration.
     _users = Dict(Unicode(), Typed(InstrUser))
 
@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : simulated_visa.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Simulated VISA instruments allowing to run the VISA drivers without
+hardware.
+
+A `SimulatedInstrument` mimics a PyVisa `Instrument` : it answers the queries
+using canned responses and the values previously set, and waits (if asked to)
+as a real instrument would because of the latency of the bus and of its limited
+bandwidth. It is plugged into a driver through the `visa_backend` attribute of
+`VisaInstrument` using a `SimulatedBackend` (see `open_simulated_driver`).
+
+The program messages are split into their units (commands and queries
+separated by ';', binary blocks being skipped) and :
+
+- a query is answered by the matching canned response if any, otherwise by
+  the last value written using the same header (or the initial settings),
+  otherwise it is not answered (reading the answer will time out).
+- a command with arguments records its value, numbers followed by a frequency
+  or time suffix being converted to base units ('5 GHz' is read back as
+  '5000000000.0').
+
+The headers are compared case insensitively but the short and long forms of
+the SCPI mnemonics are not matched together.
+
+:Contains:
+    SimulatedInstrument :
+        Object mimicking a PyVisa Instrument.
+    SimulatedBackend :
+        Factory opening sessions to simulated instruments.
+    open_simulated_driver :
+        Create a VISA driver connected to a simulated instrument.
+    binary_block :
+        Format bytes as an IEEE-488.2 definite length block.
+    simulated_pna, simulated_awg, simulated_lecroy, simulated_psa :
+        Simulated instruments providing the answers the corresponding drivers
+        need to transfer data.
+
+"""
+import re
+import struct
+import time
+
+import numpy as np
+
+from .visa_tools import VisaIOError, parse_binary_block
+
+
+#: VISA error codes used to signal a timeout, an unknown resource and a closed
+#: session.
+VI_ERROR_TMO = -1073807339
+VI_ERROR_RSRC_NFOUND = -1073807343
+VI_ERROR_INV_OBJECT = -1073807346
+
+#: Multipliers of the suffixes accepted after a numeric value.
+SUFFIXES = {'GHZ': 1e9, 'MHZ': 1e6, 'KHZ': 1e3, 'HZ': 1.,
+            'S': 1., 'MS': 1e-3, 'US': 1e-6, 'NS': 1e-9}
+
+# Characters requiring a special treatment when splitting a program message.
+_SPECIAL = re.compile('[;#\'"]')
+
+
+def binary_block(payload):
+    """Format bytes as an IEEE-488.2 definite length block.
+
+    """
+    length = str(len(payload))
+    return '#{}{}{}'.format(len(length), length, payload)
+
+
+def _split_message(message):
+    """Split a program message into its units.
+
+    Returns
+    -------
+    units : list
+        Tuples (text, has_block), the content of the binary blocks being
+        removed from the text.
+
+    """
+    units = []
+    start = pos = 0
+    block = None
+    while True:
+        match = _SPECIAL.search(message, pos)
+        if match is None:
+            break
+        char = match.group()
+        pos = match.end()
+        if char == ';':
+            end = pos - 1 if block is None else block
+            units.append((message[start:end], block is not None))
+            start = pos
+            block = None
+        elif char == '#':
+            digits = message[pos:pos+1]
+            if not digits.isdigit():
+                continue
+            if block is None:
+                block = pos - 1
+            if digits == '0':
+                # Indefinite length block : lasts until the end.
+                pos = len(message)
+            else:
+                header_end = pos + 1 + int(digits)
+                try:
+                    pos = header_end + int(message[pos+1:header_end])
+                except ValueError:
+                    pos = header_end
+        else:
+            end = message.find(char, pos)
+            pos = end + 1 if end >= 0 else len(message)
+
+    units.append((message[start:block], block is not None))
+    return [(text.strip(), has_block) for text, has_block in units
+            if text.strip() or has_block]
+
+
+def _normalize(header):
+    """Normalize a header (or a query) to compare it with others.
+
+    """
+    return ' '.join(header.lstrip(':').upper().split())
+
+
+def _normalize_value(value):
+    """Convert a value followed by a suffix to base units.
+
+    """
+    parts = value.split()
+    if len(parts) == 2 and parts[1].upper() in SUFFIXES:
+        try:
+            return repr(float(parts[0])*SUFFIXES[parts[1].upper()])
+        except ValueError:
+            pass
+    return value.strip()
+
+
+class SimulatedInstrument(object):
+    """Object mimicking a PyVisa Instrument.
+
+    Parameters
+    ----------
+    responses : dict, optional
+        Canned answers to the queries. The values can be strings or callables
+        taking the instrument and the query as arguments and returning the
+        answer.
+
+    settings : dict, optional
+        Initial values of the settings, by header (ie 'FREQ:CENT' answers the
+        query 'FREQ:CENT?').
+
+    latency : float, optional
+        Time (in s) needed by the instrument to process a message and to
+        answer.
+
+    latencies : dict, optional
+        Additional processing time (in s) of some commands, by header.
+
+    bandwidth : float, optional
+        Bandwidth of the connection in bytes per second. The transfer is
+        instantaneous if not specified.
+
+    record : bool, optional
+        Whether to keep the messages written to the instrument in `written`.
+
+    Attributes
+    ----------
+    written : list(str)
+        Messages written to the instrument (only if record is True).
+
+    messages : int
+        Number of messages exchanged with the instrument.
+
+    commands : int
+        Number of commands and queries sent to the instrument.
+
+    bytes_written : int
+        Number of bytes sent to the instrument.
+
+    bytes_read : int
+        Number of bytes read from the instrument.
+
+    The following attributes reflect the ones of a PyVisa Instrument :
+    timeout, send_end, delay, term_chars, values_format, chunk_size
+
+    """
+
+    def __init__(self, responses=None, settings=None, latency=0.,
+                 latencies=None, bandwidth=None, record=False):
+        responses = responses or {}
+        self.responses = dict((_normalize(k), v)
+                              for k, v in responses.iteritems())
+        settings = settings or {}
+        self.settings = dict((_normalize(k), v)
+                             for k, v in settings.iteritems())
+        latencies = latencies or {}
+        self.latencies = dict((_normalize(k), v)
+                              for k, v in latencies.iteritems())
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.record = record
+        self.closed = True
+        self.timeout = 10
+        self.send_end = True
+        self.delay = 0
+        self.term_chars = None
+        self.values_format = 0
+        self.chunk_size = 20*1024
+        self._output = ''
+        self.reset_stats()
+
+    def open(self, **para):
+        """Open a new session, the parameters being the ones of a PyVisa
+        Instrument.
+
+        """
+        for name, value in para.iteritems():
+            setattr(self, name, value)
+        self.closed = False
+        self._output = ''
+
+    def reset_stats(self):
+        """Reset the counters (and the record) of the messages exchanged.
+
+        """
+        self.written = []
+        self.messages = 0
+        self.commands = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def write(self, message):
+        """Process a message sent to the instrument.
+
+        """
+        self._check_open()
+        if self.record:
+            self.written.append(message)
+        units = _split_message(message)
+        self.messages += 1
+        self.commands += len(units)
+        self.bytes_written += len(message)
+
+        answers = []
+        duration = 0.
+        for text, has_block in units:
+            parts = text.split(None, 1)
+            header = _normalize(parts[0]) if parts else ''
+            duration += self.latencies.get(header, 0.)
+            if header.endswith('?'):
+                answer = self._answer(text, header)
+                if answer is not None:
+                    answers.append(answer)
+            elif len(parts) == 2 and not has_block:
+                self.settings[header] = _normalize_value(parts[1])
+
+        self._wait(len(message), duration)
+        self._output = ';'.join(answers) + '\n' if answers else ''
+
+    def read_raw(self):
+        """Read the answer of the instrument, including the termination.
+
+        """
+        self._check_open()
+        output, self._output = self._output, ''
+        if not output:
+            raise VisaIOError(VI_ERROR_TMO)
+        self.messages += 1
+        self.bytes_read += len(output)
+        self._wait(len(output))
+        return output
+
+    def read(self):
+        """Read the answer of the instrument.
+
+        """
+        output = self.read_raw()
+        return output[:-1] if output.endswith('\n') else output
+
+    def read_values(self, format=None):
+        """Read the answer of the instrument and convert it to values.
+
+        """
+        if format is None:
+            format = self.values_format
+        if not format:
+            values = re.split(r'[,;\s]+', self.read())
+            return [float(value) for value in values if value]
+
+        dtype = '>' if format & 4 else '<'
+        dtype += 'f8' if format & 3 == 3 else 'f4'
+        return parse_binary_block(self.read_raw(), dtype).tolist()
+
+    def ask(self, message):
+        """Send a query and read the answer.
+
+        """
+        self.write(message)
+        return self.read()
+
+    def ask_for_values(self, message, format=None):
+        """Send a query and convert the answer to values.
+
+        """
+        self.write(message)
+        return self.read_values(format)
+
+    def clear(self):
+        """Discard the pending answer.
+
+        """
+        self._check_open()
+        self._output = ''
+
+    def trigger(self):
+        """Send a trigger.
+
+        """
+        self._check_open()
+        self.messages += 1
+        self._wait(0)
+
+    def close(self):
+        """Close the session.
+
+        """
+        self.closed = True
+
+    # --- Private API ---------------------------------------------------------
+
+    def _answer(self, query, header):
+        """Get the answer to a query (None if the query is unknown).
+
+        """
+        answer = self.responses.get(_normalize(query))
+        if answer is None and query.split()[0] == query:
+            answer = self.settings.get(header[:-1])
+        if callable(answer):
+            answer = answer(self, query)
+        return answer
+
+    def _wait(self, size, duration=0.):
+        """Wait for a message to be processed and transferred.
+
+        """
+        duration += self.latency
+        if self.bandwidth:
+            duration += size/float(self.bandwidth)
+        if duration > 0:
+            time.sleep(duration)
+
+    def _check_open(self):
+        """Raise an error if the session is closed.
+
+        """
+        if self.closed:
+            raise VisaIOError(VI_ERROR_INV_OBJECT)
+
+
+class SimulatedBackend(object):
+    """Factory opening sessions to simulated instruments.
+
+    An instance can be used as the `visa_backend` of a `VisaInstrument`.
+
+    Parameters
+    ----------
+    instruments : dict
+        Simulated instruments by VISA resource name (ie 'GPIB::1::INSTR').
+
+    """
+
+    def __init__(self, instruments):
+        self.instruments = instruments
+
+    def __call__(self, resource_name, **para):
+        try:
+            instrument = self.instruments[resource_name]
+        except KeyError:
+            raise VisaIOError(VI_ERROR_RSRC_NFOUND)
+        instrument.open(**para)
+        return instrument
+
+
+def open_simulated_driver(driver_class, instrument, **kwargs):
+    """Create a VISA driver connected to a simulated instrument.
+
+    Parameters
+    ----------
+    driver_class : type
+        Subclass of VisaInstrument to use.
+
+    instrument : SimulatedInstrument
+        Simulated instrument the driver should talk to.
+
+    kwargs :
+        Additional keyword arguments passed to the driver.
+
+    """
+    info = {'connection_type': 'GPIB', 'address': '1',
+            'additionnal_mode': 'INSTR'}
+    # The backend must be set before calling __init__ as some drivers talk to
+    # the instrument when initialised.
+    driver = driver_class.__new__(driver_class)
+    driver.visa_backend = SimulatedBackend({'GPIB::1::INSTR': instrument})
+    driver.__init__(info, **kwargs)
+    return driver
+
+
+def simulated_pna(points=1001, channel=1, data_format='REAL,32', **kwargs):
+    """Simulated PNA holding a single trace of complex data.
+
+    The keyword arguments are passed to the SimulatedInstrument.
+
+    """
+    dtype = {'REAL,32': '<f4', 'REAL,64': '<f8'}.get(data_format, '<f4')
+    trace = np.random.rand(2*points).astype(dtype)
+    if data_format in ('REAL,32', 'REAL,64'):
+        data = binary_block(trace.tostring())
+    else:
+        data = ','.join(repr(float(x)) for x in trace)
+    responses = {'CALCulate{}:DATA? SDATA'.format(channel): data,
+                 'CALC{}:PARameter:SELect?'.format(channel): '"CH1_S21_1"'}
+    settings = {'FORMAT:DATA': data_format,
+                'SENSe{}:SWEep:TYPE'.format(channel): 'LIN',
+                'SENSe{}:SWEep:POINts'.format(channel): str(points),
+                'SENSe{}:BANDwidth'.format(channel): '1000'}
+    return SimulatedInstrument(responses, settings, **kwargs)
+
+
+def simulated_awg(**kwargs):
+    """Simulated Tektronix AWG, accepting waveforms.
+
+    The keyword arguments are passed to the SimulatedInstrument.
+
+    """
+    settings = {'SEQuence:LENGth': '0', 'AWGControl:RMODe': 'CONT'}
+    return SimulatedInstrument({'*OPC?': '1'}, settings, **kwargs)
+
+
+def lecroy_waveform(channel, values, hires=False, gain=1e-3, offset=0.,
+                    interval=1e-9):
+    """Build the answer of a LeCroy oscilloscope to the query <channel>:WF?.
+
+    Parameters
+    ----------
+    channel : str
+        Name of the trace as used in the query (ie 'C1').
+
+    values : array
+        Raw values of the points (int8 or int16 if hires is True).
+
+    """
+    data = np.asarray(values, '<i2' if hires else 'i1').tostring()
+    desc = bytearray(346)
+    struct.pack_into('<b', desc, 32, 1 if hires else 0)  # COMM_TYPE
+    struct.pack_into('<b', desc, 34, 1)  # COMM_ORDER (little endian)
+    struct.pack_into('<i', desc, 36, len(desc))  # WAVE_DESCRIPTOR
+    struct.pack_into('<i', desc, 60, len(data))  # WAVE_ARRAY_1
+    struct.pack_into('<i', desc, 116, len(data)//(2 if hires else 1))
+    struct.pack_into('<ff', desc, 156, gain, offset)
+    struct.pack_into('<fd', desc, 176, interval, 0.)
+    payload = bytes(desc) + data
+    return '{}:WF ALL,#9{:09d}{}'.format(channel, len(payload), payload)
+
+
+def simulated_lecroy(points=10000, channel='1', **kwargs):
+    """Simulated LeCroy oscilloscope holding a waveform on one channel.
+
+    The keyword arguments are passed to the SimulatedInstrument.
+
+    """
+    name = 'C' + channel if len(channel) == 1 else channel
+    waveforms = {}
+    for hires in (False, True):
+        bits = 16 if hires else 8
+        values = np.random.randint(-2**(bits-1), 2**(bits-1), points)
+        waveforms[hires] = lecroy_waveform(name, values, hires)
+
+    def waveform(instrument, query):
+        return waveforms['WORD' in instrument.settings['CFMT']]
+
+    def data_format(instrument, query):
+        return 'CFMT ' + instrument.settings['CFMT']
+
+    responses = {name + ':WF?': waveform, 'CFMT?': data_format}
+    return SimulatedInstrument(responses, {'CFMT': 'DEF9,BYTE,BIN'},
+                               **kwargs)
+
+
+def simulated_psa(points=1001, **kwargs):
+    """Simulated Agilent PSA in spectrum analyser mode holding a trace.
+
+    The keyword arguments are passed to the SimulatedInstrument.
+
+    """
+    values = -50 - 10*np.random.rand(points)
+    trace = ','.join(repr(float(x)) for x in values)
+    settings = {'INST:SEL': 'SA', 'SWEEP:TIME': '0.01', 'FREQ:STAR': '1e9',
+                'FREQ:STOP': '2e9', 'FREQ:CENT': '1.5e9', 'FREQ:SPAN': '1e9',
+                'BWIDTH': '1e6', 'BAND:VID': '1e6',
+                'SENSe:SWEep:POINts': str(points), 'AVERage:COUNt': '1'}
+    responses = dict(('trace? trace{}'.format(i), trace) for i in (1, 2, 3))
+    return SimulatedInstrument(responses, settings, **kwargs)
@@ -18,15 +18,13 @@ from inspect import cleandoc
 import numpy as np
 
 try:
-    from visa import ascii, single, double
+    from visa import ascii
 except ImportError:
     ascii = 0
-    single = 1
-    double = 3
 
 from ..driver_tools import (BaseInstrument, InstrIOError, InstrError,
                             secure_communication, instrument_property)
-from ..visa_tools import VisaInstrument
+from ..visa_tools import VisaInstrument, BINARY_FORMATS
 
 
 FORMATTING_DICT = {'PHAS': lambda x: np.angle(x, deg=True),
@@ -69,6 +67,12 @@ class AgilentPNAChannel(BaseInstrument):
         """
         self._pna.reopen_connection()
 
+    def _pending_settings(self):
+        """The commands are queued by the batches of the PNA.
+
+        """
+        return self._pna._pending_settings()
+
     @secure_communication()
     def read_formatted_data(self, meas_name=''):
         """ Read formatted data for a measure.
@@ -92,17 +96,15 @@ class AgilentPNAChannel(BaseInstrument):
             meas_name = self.selected_measure
 
         data_request = 'CALCulate{}:DATA? FDATA'.format(self._channel)
-        if self._pna.data_format == 'REAL,32':
-            data = self._pna.ask_for_values(data_request, single)
-
-        elif self._pna.data_format == 'REAL,64':
-            data = self._pna.ask_for_values(data_request, double)
+        binary_format = BINARY_FORMATS.get(self._pna.data_format)
+        if binary_format:
+            data = self._pna.ask_for_binary_block(data_request, binary_format)
 
         else:
-            data = self._pna.ask_for_values(data_request, ascii)
+            data = np.array(self._pna.ask_for_values(data_request, ascii))
 
-        if data:
-            return np.array(data)
+        if len(data):
+            return data
         else:
             raise InstrIOError(cleandoc('''Agilent PNA did not return the
                 channel {} formatted data for meas {}'''.format(
@@ -129,21 +131,21 @@ class AgilentPNAChannel(BaseInstrument):
             self.selected_measure = meas_name
 
         data_request = 'CALCulate{}:DATA? SDATA'.format(self._channel)
-        if self._pna.data_format == 'REAL,32':
-            data = self._pna.ask_for_values(data_request, single)
-
-        elif self._pna.data_format == 'REAL,64':
-            data = self._pna.ask_for_values(data_request, double)
+        binary_format = BINARY_FORMATS.get(self._pna.data_format)
+        if binary_format:
+            # Real and imaginary parts are interleaved.
+            data = self._pna.ask_for_binary_block(data_request, binary_format,
+                                                  as_complex=True)
 
         else:
-            data = self._pna.ask_for_values(data_request, ascii)
+            aux = np.array(self._pna.ask_for_values(data_request, ascii))
+            data = aux[::2] + 1j*aux[1::2]
 
         if not meas_name:
             meas_name = self.selected_measure
 
-        if data:
-            aux = np.array(data)
-            return aux[::2] + 1j*aux[1::2]
+        if len(data):
+            return data
         else:
             raise InstrIOError(cleandoc('''Agilent PNA did not return the
                 channel {} formatted data for meas {}'''.format(
@@ -543,15 +545,14 @@ class AgilentPNAChannel(BaseInstrument):
         """
         """
         self._pna.write('SENSe{}:BANDwidth {}'.format(self._channel, value))
-        result = self._pna.ask_for_values('SENSe{}:BANDwidth?'.format(
-                                          self._channel))
-        if result:
-            if abs(result[0] > value) > 10**-12:
+
+        def check(answer):
+            if float(answer) > value:
                 raise InstrIOError(cleandoc('''PNA did not set correctly the
                     channel {} IF bandwidth'''.format(self._channel)))
-        else:
-            raise InstrIOError(cleandoc('''PNA did not set correctly the
-                    channel {} IF bandwidth'''.format(self._channel)))
+
+        self._pna.verify('SENSe{}:BANDwidth?'.format(self._channel), check,
+                         'if_bandwidth', self)
 
     @instrument_property
     @secure_communication()
@@ -595,11 +596,14 @@ class AgilentPNAChannel(BaseInstrument):
         """
         """
         self._pna.write('SENSe{}:SWEep:TYPE {}'.format(self._channel, value))
-        result = self._pna.ask('SENSe{}:SWEep:TYPE?'.format(self._channel))
 
-        if result.lower() != value.lower()[:len(result)]:
-            raise InstrIOError(cleandoc('''PNA did not set correctly the
-                channel {} sweep type'''.format(self._channel)))
+        def check(result):
+            if result.lower() != value.lower()[:len(result)]:
+                raise InstrIOError(cleandoc('''PNA did not set correctly the
+                    channel {} sweep type'''.format(self._channel)))
+
+        self._pna.verify('SENSe{}:SWEep:TYPE?'.format(self._channel), check,
+                         'sweep_type', self)
 
     @instrument_property
     @secure_communication()
@@ -620,15 +624,14 @@ class AgilentPNAChannel(BaseInstrument):
         """
         """
         self._pna.write('SENSe{}:SWEep:POINts {}'.format(self._channel, value))
-        result = self._pna.ask_for_values('SENSe{}:SWEep:POINts?'.format(
-                                          self._channel))
-        if result:
-            if result[0] != value:
+
+        def check(answer):
+            if float(answer) != value:
                 raise InstrIOError(cleandoc('''PNA did not set correctly the
                     channel {} sweep point number'''.format(self._channel)))
-        else:
-            raise InstrIOError(cleandoc('''PNA did not set correctly the
-                    channel {} sweep point number'''.format(self._channel)))
+
+        self._pna.verify('SENSe{}:SWEep:POINts?'.format(self._channel), check,
+                         'sweep_points', self)
 
     @instrument_property
     @secure_communication()
@@ -13,6 +13,7 @@ This module defines drivers for agilent PSA.
 
 """
 from inspect import cleandoc
+from contextlib import contextmanager
 import numpy as np
 from ..driver_tools import (InstrIOError, secure_communication,
                             instrument_property)
@@ -28,6 +29,36 @@ DATA_FORMATTING_DICT = {'raw I/Q data': 0,
                         'average of mag vs freq in Vrms': 12}
 
 
+def _value_check(value, setting, scale=1):
+    """Build a check for `VisaInstrument.verify` testing that the answer is
+    equal to `value` (once divided by `scale`).
+
+    """
+    def check(answer):
+        try:
+            result = float(answer)/scale
+        except ValueError:
+            result = None
+        if result is None or abs(result - value) > abs(value)*10**-12:
+            raise InstrIOError('PSA did not set correctly the ' + setting)
+    return check
+
+
+def _bandwidth_check(value, setting):
+    """Build a check for `VisaInstrument.verify` testing that the answer is
+    not larger than `value`.
+
+    """
+    def check(answer):
+        try:
+            result = float(answer)
+        except ValueError:
+            result = None
+        if result is None or result > value:
+            raise InstrIOError('PSA did not set correctly the ' + setting)
+    return check
+
+
 class SpecDescriptor():
     def __init__(self):
         self.initialized = False
@@ -57,6 +88,7 @@ class AgilentPSA(VisaInstrument):
                                          caching_allowed,
                                          caching_permissions,
                                          auto_open)
+        self._batch_mode = None
         self.write("ROSC:SOURCE EXT")  # 10 MHz clock bandwidth external
         self.write("ROSC:OUTP ON")  # 10 MHz clock bandwidth internal ON
         self.write("FORM:DATA ASCii")  # lots of data must be read in
@@ -65,6 +97,27 @@ class AgilentPSA(VisaInstrument):
         self.mode = self.mode  # initialize PSA properly if SPEC or WAV mode
         self.spec_header = SpecDescriptor()
 
+    @contextmanager
+    def batch(self):
+        """Group the commands sent to the instrument.
+
+        The mode of the PSA, on which most of the settings depend, is queried
+        only once before opening the batch so that the setters do not have to
+        send the queued commands to query it.
+
+        """
+        if self._batch_mode is not None:
+            with super(AgilentPSA, self).batch():
+                yield
+            return
+
+        self._batch_mode = self.mode
+        try:
+            with super(AgilentPSA, self).batch():
+                yield
+        finally:
+            self._batch_mode = None
+
     @secure_communication(2)
     def get_spec_header(self):
         """
@@ -231,6 +284,10 @@ class AgilentPSA(VisaInstrument):
             self.write("INIT:IMM")
         else:
             self.write('INST:SEL SA')
+            value = 'SA'
+
+        if self._batch_mode is not None:
+            self._batch_mode = value
 
     @instrument_property
     @secure_communication()
@@ -261,16 +318,12 @@ class AgilentPSA(VisaInstrument):
     def start_frequency_SA(self, value):
         """Start frequency setter method
         """
-        if self.mode == 'SA':
+        mode = self._current_mode()
+        if mode == 'SA':
             self.write('FREQ:STAR {} GHz'.format(value))
-            result = self.ask_for_values('FREQ:STAR?')
-            if result:
-                if abs(result[0]/1e9 - value)/value > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the start frequency'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    start frequency'''))
+            self.verify('FREQ:STAR?',
+                        _value_check(value, 'start frequency', 1e9),
+                        'start_frequency_SA')
         else:
             raise '''PSA is not in the appropriate mode to set correctly the
                     start frequency'''
@@ -298,16 +351,12 @@ class AgilentPSA(VisaInstrument):
         """Stop frequency setter method
 
         """
-        if self.mode == 'SA':
+        mode = self._current_mode()
+        if mode == 'SA':
             self.write('FREQ:STOP {} GHz'.format(value))
-            result = self.ask_for_values('FREQ:STOP?')
-            if result:
-                if abs(result[0]/1e9 - value)/value > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the stop frequency'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    stop frequency'''))
+            self.verify('FREQ:STOP?',
+                        _value_check(value, 'stop frequency', 1e9),
+                        'stop_frequency_SA')
         else:
             raise '''PSA is not in the appropriate mode to set correctly the
                     stop frequency'''
@@ -334,14 +383,9 @@ class AgilentPSA(VisaInstrument):
         """
 
         self.write('FREQ:CENT {} GHz'.format(value))
-        result = self.ask_for_values('FREQ:CENT?')
-        if result:
-            if abs(result[0]/1e9 - value)/value > 10**-12:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    center frequency'''))
-        else:
-            raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    center frequency'''))
+        self.verify('FREQ:CENT?',
+                    _value_check(value, 'center frequency', 1e9),
+                    'center_frequency')
 
     @instrument_property
     @secure_communication()
@@ -374,27 +418,18 @@ class AgilentPSA(VisaInstrument):
     def span_frequency(self, value):
         """span frequency setter method
         """
-        if self.mode == 'SA':
+        mode = self._current_mode()
+        if mode == 'SA':
             self.write('FREQ:SPAN {} GHz'.format(value))
-            result = self.ask_for_values('FREQ:SPAN?')
-            if result:
-                if abs(result[0]/1e9 - value)/value > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the span frequency'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    span frequency'''))
+            self.verify('FREQ:SPAN?',
+                        _value_check(value, 'span frequency', 1e9),
+                        'span_frequency')
 
-        elif self.mode == 'SPEC':
+        elif mode == 'SPEC':
             self.write('SENS:SPEC:FREQ:SPAN {} GHz'.format(value))
-            result = self.ask_for_values('SENS:SPEC:FREQ:SPAN?')
-            if result:
-                if abs(result[0]/1e9 - value)/value > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the span frequency'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    span frequency'''))
+            self.verify('SENS:SPEC:FREQ:SPAN?',
+                        _value_check(value, 'span frequency', 1e9),
+                        'span_frequency')
 
         else:
             raise '''PSA is not in the appropriate mode to set correctly the
@@ -429,8 +464,8 @@ class AgilentPSA(VisaInstrument):
     def sweep_time(self, value):
         """sweep time setter method
         """
-
-        if self.mode == 'WAV':
+        mode = self._current_mode()
+        if mode == 'WAV':
             self.write('SENS:WAV:SWEEP:TIME {}'.format(value))
             result = self.ask_for_values('SENS:WAV:SWEEP:TIME?')
             if result:
@@ -440,7 +475,7 @@ class AgilentPSA(VisaInstrument):
             else:
                 raise InstrIOError(cleandoc('''PSA did not set correctly the
                     sweep time'''))
-        elif self.mode == 'SA':
+        elif mode == 'SA':
             self.write('SWEEP:TIME {}'.format(value))
             result = self.ask_for_values('SWEEP:TIME?')
             if result:
@@ -486,37 +521,23 @@ class AgilentPSA(VisaInstrument):
     def RBW(self, value):
         """
         """
-        if self.mode == 'WAV':
+        mode = self._current_mode()
+        if mode == 'WAV':
             self.write('SENS:WAV:BWIDTH {}'.format(value))
-            result = self.ask_for_values('SENS:WAV:BWIDTH?')
-            if result:
-                if abs(result[0] > value) > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the channel Resolution bandwidth'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    channel Resolution bandwidth'''))
+            self.verify('SENS:WAV:BWIDTH?',
+                        _bandwidth_check(value, 'resolution bandwidth'),
+                        'RBW')
 
-        elif self.mode == 'SPEC':
+        elif mode == 'SPEC':
             self.write('SENS:SPEC:BWIDTH {}'.format(value))
-            result = self.ask_for_values('SENS:SPEC:BWIDTH?')
-            if result:
-                if abs(result[0] > value) > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the channel Resolution bandwidth'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    channel Resolution bandwidth'''))
+            self.verify('SENS:SPEC:BWIDTH?',
+                        _bandwidth_check(value, 'resolution bandwidth'),
+                        'RBW')
         else:
             self.write('BAND {}'.format(value))
-            result = self.ask_for_values('BWIDTH?')
-            if result:
-                if abs(result[0] > value) > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the channel Resolution bandwidth'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    channel Resolution bandwidth'''))
+            self.verify('BWIDTH?',
+                        _bandwidth_check(value, 'resolution bandwidth'),
+                        'RBW')
 
     @instrument_property
     @secure_communication()
@@ -540,22 +561,18 @@ class AgilentPSA(VisaInstrument):
     def VBW_SA(self, value):
         """
         """
-        if self.mode == 'WAV':
+        mode = self._current_mode()
+        if mode == 'WAV':
             raise InstrIOError(cleandoc('''PSA did not set correctly the
                     channel Resolution bandwidth'''))
-        elif self.mode == 'SPEC':
+        elif mode == 'SPEC':
             raise InstrIOError(cleandoc('''PSA did not set correctly the
                     channel Resolution bandwidth'''))
         else:
             self.write('BAND:VID {}'.format(value))
-            result = self.ask_for_values('BAND:VID?')
-            if result:
-                if abs(result[0] > value) > 10**-12:
-                    raise InstrIOError(cleandoc('''PSA did not set correctly
-                    the channel Video bandwidth'''))
-            else:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    channel Video bandwidth'''))
+            self.verify('BAND:VID?',
+                        _bandwidth_check(value, 'video bandwidth'),
+                        'VBW_SA')
 
     @instrument_property
     @secure_communication()
@@ -575,14 +592,9 @@ class AgilentPSA(VisaInstrument):
         """
         """
         self.write('SENSe:SWEep:POINts {}'.format(value))
-        result = self.ask_for_values('SENSe:SWEep:POINts?')
-        if result:
-            if result[0] != value:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    sweep point number'''))
-        else:
-            raise InstrIOError(cleandoc('''PSA did not set correctly the
-                    sweep point number'''))
+        self.verify('SENSe:SWEep:POINts?',
+                    _value_check(value, 'sweep point number'),
+                    'sweep_points_SA')
 
     @instrument_property
     @secure_communication()
@@ -602,14 +614,9 @@ class AgilentPSA(VisaInstrument):
         """
         """
         self.write('AVERage:COUNt {}'.format(value))
-        result = self.ask_for_values('AVERage:COUNt?')
-        if result:
-            if result[0] != value:
-                raise InstrIOError(cleandoc('''PSA did not set correctly the
-                     average count'''))
-        else:
-            raise InstrIOError(cleandoc('''PSA did not set correctly the
-                     average count'''))
+        self.verify('AVERage:COUNt?',
+                    _value_check(value, 'average count'),
+                    'average_count_SA')
 
     @instrument_property
     @secure_communication()
@@ -647,6 +654,13 @@ class AgilentPSA(VisaInstrument):
             raise InstrIOError(cleandoc('''Agilent PSA did not return the
                     Y unit'''))
 
+    def _current_mode(self):
+        """Mode of the PSA, using the one known for the current batch if any.
+
+        """
+        if self._batch_mode is not None:
+            return self._batch_mode
+        return self.mode
 
 
 DRIVERS = {'AgilentPSA': AgilentPSA}
@@ -18,15 +18,13 @@ from inspect import cleandoc
 import numpy as np
 
 try:
-    from visa import ascii, single, double
+    from visa import ascii
 except ImportError:
     ascii = 0
-    single = 1
-    double = 3
 
 from ..driver_tools import (BaseInstrument, InstrIOError, InstrError,
                             secure_communication, instrument_property)
-from ..visa_tools import VisaInstrument
+from ..visa_tools import VisaInstrument, BINARY_FORMATS
 
 
 FORMATTING_DICT = {'PHAS': lambda x: np.angle(x, deg=True),
@@ -92,17 +90,15 @@ class AgilentPNAChannel(BaseInstrument):
             meas_name = self.selected_measure
 
         data_request = 'CALCulate{}:DATA? FDATA'.format(self._channel)
-        if self._pna.data_format == 'REAL,32':
-            data = self._pna.ask_for_values(data_request, single)
-
-        elif self._pna.data_format == 'REAL,64':
-            data = self._pna.ask_for_values(data_request, double)
+        binary_format = BINARY_FORMATS.get(self._pna.data_format)
+        if binary_format:
+            data = self._pna.ask_for_binary_block(data_request, binary_format)
 
         else:
-            data = self._pna.ask_for_values(data_request, ascii)
+            data = np.array(self._pna.ask_for_values(data_request, ascii))
 
-        if data:
-            return np.array(data)
+        if len(data):
+            return data
         else:
             raise InstrIOError(cleandoc('''Agilent PNA did not return the
                 channel {} formatted data for meas {}'''.format(
@@ -126,18 +122,18 @@ class AgilentPNAChannel(BaseInstrument):
         channel = measname[0]
         trace = measname[1]
         data_request = 'CALCulate{}:TRAC{}:DATA:SDATA?'.format(channel, trace)
-        if self._pna.data_format == 'REAL,32':
-            data = self._pna.ask_for_values(data_request, single)
-
-        elif self._pna.data_format == 'REAL,64':
-            data = self._pna.ask_for_values(data_request, double)
+        binary_format = BINARY_FORMATS.get(self._pna.data_format)
+        if binary_format:
+            # Real and imaginary parts are interleaved.
+            data = self._pna.ask_for_binary_block(data_request, binary_format,
+                                                  as_complex=True)
 
         else:
-            data = self._pna.ask_for_values(data_request, ascii)
+            aux = np.array(self._pna.ask_for_values(data_request, ascii))
+            data = aux[::2] + 1j*aux[1::2]
 
-        if data:
-            aux = np.array(data)
-            return aux[::2] + 1j*aux[1::2]
+        if len(data):
+            return data
         else:
             raise InstrIOError(cleandoc('''Keysight ENA did not return the
                 channel {} formatted data for trace {}'''.format(
@@ -18,15 +18,13 @@ import re
 from textwrap import fill
 
 try:
-    from visa import ascii, single, double
+    from visa import ascii
 except ImportError:
     ascii = 2
-    single = 1
-    double = 3
 
 from ..driver_tools import (BaseInstrument, InstrIOError, InstrError,
                             secure_communication, instrument_property)
-from ..visa_tools import VisaInstrument
+from ..visa_tools import VisaInstrument, BINARY_FORMATS
 from visa import VisaTypeError
 
 
@@ -90,17 +88,15 @@ class ZNB20Channel(BaseInstrument):
             meas_name = self.selected_measure
 
         data_request = 'CALCulate{}:DATA? FDATA'.format(self._channel)
-        if self._pna.data_format == 'REAL,32':
-            data = self._pna.ask_for_values(data_request, single)
-
-        elif self._pna.data_format == 'REAL,64':
-            data = self._pna.ask_for_values(data_request, double)
+        binary_format = BINARY_FORMATS.get(self._pna.data_format)
+        if binary_format:
+            data = self._pna.ask_for_binary_block(data_request, binary_format)
 
         else:
-            data = self._pna.ask_for_values(data_request, ascii)
+            data = np.array(self._pna.ask_for_values(data_request, ascii))
 
-        if data:
-            return np.array(data)
+        if len(data):
+            return data
         else:
             raise InstrIOError(cleandoc('''ZNB20 did not return the
                 channel {} formatted data for meas {}'''.format(
@@ -125,21 +121,21 @@ class ZNB20Channel(BaseInstrument):
             self.selected_measure = meas_name
 
         data_request = 'CALCulate{}:DATA? SDATA'.format(self._channel)
-        if self._pna.data_format == 'REAL,32':
-            data = self._pna.ask_for_values(data_request, single)
-
-        elif self._pna.data_format == 'REAL,64':
-            data = self._pna.ask_for_values(data_request, double)
+        binary_format = BINARY_FORMATS.get(self._pna.data_format)
+        if binary_format:
+            # Real and imaginary parts are interleaved.
+            data = self._pna.ask_for_binary_block(data_request, binary_format,
+                                                  as_complex=True)
 
         else:
-            data = self._pna.ask_for_values(data_request, ascii)
+            aux = np.array(self._pna.ask_for_values(data_request, ascii))
+            data = aux[::2] + 1j*aux[1::2]
 
         if not meas_name:
             meas_name = self.selected_measure
 
-        if data:
-            aux = np.array(data)
-            return aux[::2] + 1j*aux[1::2]
+        if len(data):
+            return data
         else:
             raise InstrIOError(cleandoc('''ZNB20 did not return the
                 channel {} formatted data for meas {}'''.format(
@@ -135,7 +135,9 @@ class TaborAWG(VisaInstrument):
 
     @secure_communication()
     def to_send(self, waveform, ch_id):
-        """Command to send to the instrument. waveform = string of a bytearray
+        """Command to send to the instrument. waveform can be any object
+        exposing the bytes to send through the buffer protocol (bytearray,
+        memoryview).
 
         """
         numbyte = len(waveform)
@@ -143,7 +145,7 @@ class TaborAWG(VisaInstrument):
         self.write('TRAC:MODE SING')
         numApresDiese = len('{}'.format(numbyte))
         header = "TRAC#{}{}".format(numApresDiese, numbyte)
-        self.write('{}{}'.format(header, waveform))
+        self.write(header + memoryview(waveform).tobytes())
 
     @instrument_property
     @secure_communication()
@@ -22,6 +22,7 @@ from ..visa_tools import VisaInstrument, VisaIOError
 from visa import VisaTypeError
 from textwrap import fill
 from inspect import cleandoc
+from hashlib import sha1
 import re
 import time
 
@@ -394,17 +395,52 @@ class AWGChannel(BaseInstrument):
 
 
 class AWG(VisaInstrument):
-    """
+    """Driver for the Tektronix AWG5014.
+
+    The driver remembers the content of the waveforms it transferred into the
+    instrument WLIST (see upload_waveform) so that identical waveforms are
+    sent only once, waveforms which are no longer used by the sequence being
+    overwritten when their name is reused. This registry is forgotten when the
+    connection is (re)opened or closed, when the sequence or the whole cache
+    are cleared, as the content of the WLIST can then no longer be trusted.
+
+    Attributes
+    ----------
+    upload_stats : dict
+        Counters of the transfers done through upload_waveform : 'uploads'
+        (number of waveforms sent), 'hits' (number of waveforms found in the
+        WLIST), 'bytes_sent' and 'bytes_saved'.
+
     """
     caching_permissions = {'defined_channels': True}
 
     def __init__(self, connection_info, caching_allowed=True,
                  caching_permissions={}, auto_open=True):
+        # Must exist before the connection is opened.
+        self._waveforms = {}
+        self._waveform_names = {}
+        self._referenced_names = set()
+        self.upload_stats = dict.fromkeys(('uploads', 'hits', 'bytes_sent',
+                                           'bytes_saved'), 0)
         super(AWG, self).__init__(connection_info, caching_allowed,
                                   caching_permissions, auto_open)
         self.channels = {}
         self.lock = Lock()
 
+    def open_connection(self, **para):
+        """Open the connection and forget about the waveforms transferred.
+
+        """
+        self.forget_waveforms()
+        super(AWG, self).open_connection(**para)
+
+    def close_connection(self):
+        """Close the connection and forget about the waveforms transferred.
+
+        """
+        self.forget_waveforms()
+        return super(AWG, self).close_connection()
+
     def reopen_connection(self):
         """Clear buffer on connection reseting.
 
@@ -432,11 +468,17 @@ class AWG(VisaInstrument):
 
     @secure_communication()
     def to_send(self, name, waveform, initialized):
-        """Command to send to the instrument. waveform = string of a bytearray
+        """Command to send to the instrument. waveform can be any object
+        exposing the bytes to send through the buffer protocol (bytearray,
+        memoryview).
 
         """
         numbyte = len(waveform)
         looplength = numbyte//2
+        # The content of a waveform we replace can no longer be reused.
+        key = self._waveform_names.pop(name, None)
+        if key is not None:
+            del self._waveforms[key]
         if not initialized:
             self.write("WLIST:WAVEFORM:DELETE '{}'".format(name))
             self.write("WLIST:WAVEFORM:NEW '{}' , {}, INTeger" .format(name,
@@ -447,13 +489,92 @@ class AWG(VisaInstrument):
         header = "WLIS:WAV:DATA '{}',0,{},#{}{}".format(name, looplength,
                                                         numApresDiese,
                                                         numbyte)
-        self.write('{}{}'.format(header, waveform))
+        self.write(header + memoryview(waveform).tobytes())
         self.write('*WAI')
 
         return initialized
 
+    def upload_waveform(self, name, waveform):
+        """Transfer a waveform unless the same content is already in the
+        WLIST.
+
+        Parameters
+        ----------
+        name : str
+            Name under which to create the waveform if it must be sent.
+
+        waveform : bytearray or memoryview
+            Bytes to send (see to_send).
+
+        Returns
+        -------
+        name : str
+            Name of the waveform holding this content in the WLIST. When the
+            waveform has to be sent and the name is already used by a waveform
+            returned since the sequence was last cleared (and hence possibly
+            referenced by the sequence) a suffix is appended to it. Otherwise
+            the waveform previously stored under this name is replaced.
+
+        """
+        data = memoryview(waveform).tobytes()
+        key = sha1(data).digest()
+        stats = self.upload_stats
+        referenced = self._referenced_names
+        if key in self._waveforms:
+            stats['hits'] += 1
+            stats['bytes_saved'] += len(data)
+            name = self._waveforms[key]
+            referenced.add(name)
+            return name
+
+        unique, i = name, 1
+        while unique in referenced:
+            unique = '{}_{}'.format(name, i)
+            i += 1
+        name = unique
+
+        self.to_send(name, data, False)
+        self._waveforms[key] = name
+        self._waveform_names[name] = key
+        referenced.add(name)
+        stats['uploads'] += 1
+        stats['bytes_sent'] += len(data)
+        return name
+
+    def forget_waveforms(self):
+        """Forget the content of the waveforms transferred into the WLIST.
+
+        """
+        self._waveforms.clear()
+        self._waveform_names.clear()
+        self._referenced_names.clear()
+
+    def clear_cache(self, properties=None):
+        """Clear the cache of the properties, and forget about the waveforms
+        transferred if it is entirely cleared (the state of the instrument can
+        then no longer be trusted).
+
+        """
+        if not properties:
+            self.forget_waveforms()
+        super(AWG, self).clear_cache(properties)
+
     @secure_communication()
-    def clear_sequence(self):
+    def clear_sequence(self, keep_waveforms=False):
+        """Empty the sequence.
+
+        Parameters
+        ----------
+        keep_waveforms : bool, optional
+            Keep considering the waveforms previously transferred as present
+            in the WLIST. This should only be used when the WLIST cannot have
+            been modified by another mean since the transfer.
+
+        """
+        if not keep_waveforms:
+            self.forget_waveforms()
+        # The waveforms are no longer used by the sequence.
+        self._referenced_names.clear()
         self.write("SEQuence:LENGth 0")
 
     @secure_communication()
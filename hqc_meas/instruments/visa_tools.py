@@ -7,7 +7,90 @@ except Exception:
     from pyvisa.legacy.visa import Instrument, VisaIOError
     from pyvisa.errors import VisaTypeError
 
-from .driver_tools import BaseInstrument, InstrIOError
+from contextlib import contextmanager
+import numpy as np
+
+from .driver_tools import BaseInstrument, InstrError, InstrIOError
+
+
+#: Numpy types corresponding to the SCPI binary data formats (the byte order
+#: being the one used by default by pyvisa, ie little-endian).
+BINARY_FORMATS = {'REAL,32': '<f4', 'REAL,64': '<f8'}
+
+
+def parse_binary_block(raw, dtype):
+    """Decode an IEEE-488.2 binary block into an array.
+
+    Both definite length blocks (#<n><length><data>) and indefinite length
+    blocks (#0<data>, ended by the end of the message) are supported. The
+    array is built directly on top of the received message, hence without
+    copy, and is read only.
+
+    Parameters
+    ----------
+    raw : str
+        Message received from the instrument.
+
+    dtype : numpy.dtype
+        Type of the values in the block.
+
+    Raises
+    ------
+    InstrIOError :
+        If the message is not a valid block or is truncated.
+
+    """
+    start = raw.find('#')
+    if start < 0 or start + 2 > len(raw) or not raw[start+1].isdigit():
+        raise InstrIOError('Invalid binary block header: {!r}'.format(
+                           raw[:20]))
+
+    dtype = np.dtype(dtype)
+    digits = int(raw[start+1])
+    if digits:
+        offset = start + 2 + digits
+        length = int(raw[start+2:offset])
+        if offset + length > len(raw):
+            raise InstrIOError('Truncated binary block: expected {} bytes, '
+                               'got {}'.format(length, len(raw) - offset))
+    else:
+        # The block is terminated by a new line sent with END.
+        offset = start + 2
+        length = len(raw) - offset - raw.endswith('\n')
+    return np.frombuffer(raw, dtype, length // dtype.itemsize, offset)
+
+
+def join_commands(commands):
+    """Concatenate SCPI commands into a single program message.
+
+    Each command after the first is anchored at the root of the command tree
+    so that its header is not interpreted relatively to the one of the
+    previous command.
+
+    """
+    return ';'.join(commands[:1] +
+                    [c if c.startswith((':', '*')) else ':' + c
+                     for c in commands[1:]])
+
+
+class InstrBatchError(InstrIOError):
+    """Error raised when some settings sent in a batch were not applied.
+
+    Attributes
+    ----------
+    errors : dict(str: str)
+        Error message of each failed verification, keyed by the name of the
+        instrument property being set (or by the query when no property was
+        specified).
+
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        mess = '\n'.join('{} : {}'.format(k, v)
+                         for k, v in sorted(errors.items()))
+        super(InstrBatchError, self).__init__('Batched settings failed :\n' +
+                                              mess)
 
 
 class VisaInstrument(BaseInstrument):
@@ -38,6 +121,10 @@ class VisaInstrument(BaseInstrument):
         Tuple of the exceptions to be catched by the `secure_communication`
         decorator
     connection_str : VISA string uses to open the communication
+    visa_backend : callable
+        Class (or callable object) used to open the communication, called
+        like the PyVisa `Instrument` class. It can be replaced by a
+        `SimulatedBackend` to use simulated instruments (see simulated_visa).
 
     The following attributes simply reflects the attribute of a `PyVisa`
     `Instrument` object :
@@ -66,12 +153,18 @@ class VisaInstrument(BaseInstrument):
     read_values()
     ask(mess)
     ask_for_values()
+    ask_for_binary_block()
     clear()
     trigger()
     read_raw()
 
+    The following methods allow to group the commands sent to the instrument
+    batch()
+    verify(query, check, name=None, owner=None)
+
     """
     secure_com_except = (InstrIOError, VisaIOError)
+    visa_backend = Instrument
 
     def __init__(self, connection_info, caching_allowed=True,
                  caching_permissions={}, auto_open=True):
@@ -87,6 +180,9 @@ class VisaInstrument(BaseInstrument):
                 str(connection_info['connection_type']
                     + '::' + connection_info['address'])
         self._driver = None
+        self._batch = None
+        self._checks = None
+        self._settings = None
         if auto_open:
             self.open_connection()
 
@@ -94,7 +190,7 @@ class VisaInstrument(BaseInstrument):
         """Open the connection to the instr using the `connection_str`
         """
         try:
-            self._driver = Instrument(self.connection_str, **para)
+            self._driver = self.visa_backend(self.connection_str, **para)
         except VisaIOError as er:
             self._driver = None
             raise InstrIOError(str(er))
@@ -131,9 +227,12 @@ class VisaInstrument(BaseInstrument):
         """Send the specified message to the instrument.
 
         Simply call the `write` method of the `Instrument` object stored in
-        the attribute `_driver`
+        the attribute `_driver`, inside a batch the message is queued instead.
         """
-        self._driver.write(message)
+        if self._batch is not None:
+            self._batch.append(message)
+        else:
+            self._driver.write(message)
 
     def read(self):
         """Read one line of the instrument's buffer.
@@ -141,6 +240,7 @@ class VisaInstrument(BaseInstrument):
         Simply call the `read` method of the `Instrument` object stored in
         the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.read()
 
     def read_values(self, format=None):
@@ -149,6 +249,7 @@ class VisaInstrument(BaseInstrument):
         Simply call the `read_values` method of the `Instrument` object
         stored in the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.read_values(format=format)
 
     def ask(self, message):
@@ -157,6 +258,7 @@ class VisaInstrument(BaseInstrument):
         Simply call the `ask` method of the `Instrument` object stored in
         the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.ask(message)
 
     def ask_for_values(self, message, format=None):
@@ -166,14 +268,51 @@ class VisaInstrument(BaseInstrument):
         Simply call the `ask_for_values` method of the `Instrument` object
         stored in the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.ask_for_values(message, format)
 
+    def ask_for_binary_block(self, message, dtype='<f4', as_complex=False):
+        """Send a query and decode the IEEE-488.2 binary block answered.
+
+        Contrary to `ask_for_values` this does not build a list of floats:
+        the values are read straight from the received message (see
+        `parse_binary_block`).
+
+        Parameters
+        ----------
+        message : str
+            Query to send to the instrument.
+
+        dtype : numpy.dtype, optional
+            Type of the values sent by the instrument.
+
+        as_complex : bool, optional
+            Whether the values are pairs of real and imaginary parts, in which
+            case they are viewed (without copy) as complex numbers.
+
+        Returns
+        -------
+        data : numpy.ndarray
+            Read only array of the values.
+
+        """
+        self._send_pending()
+        self._driver.write(message)
+        data = parse_binary_block(self._driver.read_raw(), dtype)
+        if as_complex:
+            # Drop an incomplete pair rather than failing to create the view.
+            data = data[:len(data) - len(data) % 2]
+            real = data.dtype
+            data = data.view('{}c{}'.format(real.str[0], 2*real.itemsize))
+        return data
+
     def clear(self):
         """Resets the device (highly bus dependent).
 
         Simply call the `clear` method of the `Instrument` object stored in
         the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.clear()
 
     def trigger(self):
@@ -182,6 +321,7 @@ class VisaInstrument(BaseInstrument):
         Simply call the `trigger` method of the `Instrument` object stored
         in the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.trigger()
 
     def read_raw(self):
@@ -191,8 +331,153 @@ class VisaInstrument(BaseInstrument):
         Simply call the `read_raw` method of the `Instrument` object stored
         in the attribute `_driver`
         """
+        self._send_pending()
         return self._driver.read_raw()
 
+    @contextmanager
+    def batch(self):
+        """Group the commands sent to the instrument.
+
+        Inside the context the written commands are queued and the
+        verification queries registered through `verify` are deferred. When
+        leaving the context everything is sent as a single program message
+        (commands being separated by ';') and the answers are dispatched to
+        the checks. Queued commands are sent before any read so that queries
+        performed inside the context remain correct. Nested batches are merged
+        into the outermost one.
+
+        If an exception occurs inside the context or while sending the
+        commands, the commands which were not sent are dropped and the cache
+        of the properties set by them is cleared.
+
+        Raises
+        ------
+        InstrBatchError :
+            If some checks failed. The cache of the corresponding properties
+            is cleared.
+
+        """
+        if self._batch is not None:
+            yield
+            return
+
+        self._batch, self._checks, self._settings = [], [], []
+        try:
+            yield
+        except Exception:
+            checks, settings = self._checks, self._settings
+            self._batch = self._checks = self._settings = None
+            self._clear_checked_cache(checks)
+            self._clear_settings_cache(settings)
+            raise
+        self._flush_batch()
+
+    def verify(self, query, check, name=None, owner=None):
+        """Check a setting, deferring the query when inside a batch.
+
+        Setters of instrument properties opt in batching by verifying the
+        value through this method instead of querying it directly.
+
+        Parameters
+        ----------
+        query : str
+            Query returning the value to check.
+
+        check : callable
+            Function called with the answer to the query which should raise
+            an InstrError if the value is not the expected one (a ValueError
+            raised when parsing the answer is treated alike in a batch).
+
+        name : str, optional
+            Name of the instrument property being set, used to report errors
+            and to clear its cache if the check fails.
+
+        owner : BaseInstrument, optional
+            Driver holding the property if it is not this one (channel for
+            example).
+
+        """
+        if self._checks is None:
+            check(self.ask(query))
+        else:
+            self._checks.append((query, check, name, owner or self))
+
+    def _send_pending(self):
+        """Send the commands queued in the current batch.
+
+        """
+        if self._batch:
+            commands, self._batch = self._batch, []
+            self._driver.write(join_commands(commands))
+            # The settings sent so far are no longer pending.
+            self._settings = []
+
+    def _flush_batch(self):
+        """Send the content of the batch and run the deferred checks.
+
+        """
+        commands, checks, settings = self._batch, self._checks, self._settings
+        self._batch = self._checks = self._settings = None
+        if not checks:
+            if commands:
+                try:
+                    self._driver.write(join_commands(commands))
+                except Exception:
+                    self._clear_settings_cache(settings)
+                    raise
+            return
+
+        queries = [c[0] for c in checks]
+        try:
+            answers = self._driver.ask(join_commands(commands + queries))
+        except Exception:
+            self._clear_checked_cache(checks)
+            self._clear_settings_cache(settings)
+            raise
+        answers = answers.strip().split(';')
+
+        errors = {}
+        if len(answers) != len(checks):
+            mess = 'Expected {} answers, got : {}'.format(len(checks),
+                                                          ';'.join(answers))
+            errors = {name or query: mess
+                      for query, _, name, _ in checks}
+        else:
+            for answer, (query, check, name, _) in zip(answers, checks):
+                try:
+                    check(answer)
+                except (InstrError, ValueError) as e:
+                    errors[name or query] = str(e)
+
+        if errors:
+            self._clear_checked_cache([c for c in checks
+                                       if (c[2] or c[0]) in errors])
+            raise InstrBatchError(errors)
+
+    @staticmethod
+    def _clear_checked_cache(checks):
+        """Clear the cache of the properties whose check did not succeed.
+
+        """
+        for _, _, name, owner in checks:
+            if name:
+                owner.clear_cache([name])
+
+    @staticmethod
+    def _clear_settings_cache(settings):
+        """Clear the cache of the properties set by commands which were not
+        sent.
+
+        """
+        for owner, name in settings:
+            owner.clear_cache([name])
+
+    def _pending_settings(self):
+        """Properties set by the commands queued in the current batch.
+
+        """
+        return self._settings
+
     def _timeout(self):
         return self._driver.timeout
 
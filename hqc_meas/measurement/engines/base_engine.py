@@ -6,7 +6,7 @@
 # =============================================================================
 
 from atom.api import (Atom, Event, Callable, Bool, Unicode, ForwardTyped,
-                      Signal, Tuple)
+                      Signal, Tuple, Int)
 from enaml.core.declarative import Declarative, d_
 from inspect import cleandoc
 
@@ -36,6 +36,12 @@ class BaseEngine(Atom):
     #: infos of the measure being processed.
     measure_status = Tuple()
 
+    #: Maximal number of measures the engine can perform at the same time.
+    #: Engines performing several measures append the name of the measure to
+    #: the values of done and measure_status, and accept calls to
+    #: prepare_to_run and run while other measures are running.
+    max_concurrent_measures = Int(1)
+
     def prepare_to_run(self, name, root, monitored_entries, build_deps):
         """ Make the engine ready to perform a measure.
 
@@ -69,31 +75,50 @@ class BaseEngine(Atom):
         mes = cleandoc('''''')
         raise NotImplementedError(mes)
 
-    def pause(self):
+    def news_source(self, name):
+        """ Get the object whose news signal carries the news of a measure.
+
+        Parameters
+        ----------
+        name : str
+            Name of the measure whose monitors should be connected.
+
+        """
+        return self
+
+    def pause(self, name=None):
         """ Ask the engine to pause the current measure.
 
         This method should not wait for the measure to pause to return.
         When the pause is effective the engine should add pause to the plugin
         flags.
 
+        Parameters
+        ----------
+        name : str, optional
+            Name of the measure to pause. Only meaningful for engines
+            performing several measures at the same time.
+
         """
         mes = cleandoc('''''')
         raise NotImplementedError(mes)
 
-    def resume(self):
+    def resume(self, name=None):
         """ Ask the engine to resume the currently paused measure.
 
         This method should not wait for the measure to resume.
         Thsi method should remove the 'paused' flag from the plugin flags.
+        See pause for the meaning of name.
 
         """
         mes = cleandoc('''''')
         raise NotImplementedError(mes)
 
-    def stop(self):
+    def stop(self, name=None):
         """ Ask the engine to stop the current measure.
 
-        This method should not wait for the measure to stop.
+        This method should not wait for the measure to stop. See pause for
+        the meaning of name.
 
         """
         mes = cleandoc('''''')
@@ -110,11 +135,11 @@ class BaseEngine(Atom):
         mes = cleandoc('''''')
         raise NotImplementedError(mes)
 
-    def force_stop(self):
+    def force_stop(self, name=None):
         """ Force the engine to stop the current measure.
 
         This method should stop the measure no matter what is going on. It can
-        block.
+        block. See pause for the meaning of name.
 
         """
         mes = cleandoc('''''')
@@ -130,6 +155,24 @@ class BaseEngine(Atom):
         mes = cleandoc('''''')
         raise NotImplementedError(mes)
 
+    def invalidate_sessions(self, profiles):
+        """ Ask the engine to close the connections it kept open to the
+        instruments of some profiles.
+
+        Engines keeping the instruments connected between measures must not
+        reuse those connections as the profiles are going to be used by
+        someone else. This method should return only once the connections are
+        closed (or after a short timeout) so that the new user of the profiles
+        does not open a second connection to the instruments.
+
+        Parameters
+        ----------
+        profiles : iterable(str)
+            Names of the profiles whose connections should be closed.
+
+        """
+        pass
+
 
 class Engine(Declarative):
     """ Extension for the 'engines' extension point of a MeasurePlugin.
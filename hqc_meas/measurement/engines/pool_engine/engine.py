@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : engine.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+""" Engine performing several measures at the same time.
+
+Each measure is sent to a worker which is a ProcessEngine with its own
+process, events, log and monitor queues. The plugin is in charge of only
+running concurrently measures which do not conflict (ie do not use the same
+instrument profiles).
+
+"""
+from atom.api import Typed, Int, Float, Dict, List, Str, set_default
+from enaml.workbench.api import Workbench
+
+from ..base_engine import BaseEngine
+from ..process_engine.engine import ProcessEngine
+
+
+class PoolEngine(BaseEngine):
+    """ An engine executing measures in a pool of processes.
+
+    """
+
+    # --- Public API ----------------------------------------------------------
+
+    #: Reference to the workbench got at __init__
+    workbench = Typed(Workbench)
+
+    #: Number of worker processes, ie number of measures which can be
+    #: performed at the same time.
+    max_concurrent_measures = set_default(2)
+
+    #: Number of task hierarchies each worker keeps around to reuse them.
+    build_cache_size = Int(4)
+
+    #: Time (in s) during which each worker keeps open an unused instrument
+    #: connection.
+    session_timeout = Float(600.)
+
+    def prepare_to_run(self, name, root, monitored_entries, build_deps):
+        if name in self._running:
+            raise ValueError('A measure named {} is already running'.format(
+                name))
+
+        worker = self._get_idle_worker()
+        self._running[name] = worker
+        self._prepared = name
+
+        # The other workers must not keep a connection to the instruments
+        # this measure is going to use.
+        profiles = root.run_time.get('profiles', {}).keys()
+        if profiles:
+            for other in self._workers:
+                if other is not worker:
+                    other.invalidate_sessions(profiles)
+
+        worker.prepare_to_run(name, root, monitored_entries, build_deps)
+
+    def run(self):
+        worker = self._running[self._prepared]
+        self._prepared = ''
+        worker.run()
+        self.active = True
+
+    def news_source(self, name):
+        return self._running.get(name, self)
+
+    def pause(self, name=None):
+        for worker in self._selected_workers(name):
+            worker.pause()
+
+    def resume(self, name=None):
+        for worker in self._selected_workers(name):
+            worker.resume()
+
+    def stop(self, name=None):
+        for worker in self._selected_workers(name):
+            worker.stop()
+
+    def exit(self):
+        for worker in self._workers:
+            if worker.active:
+                worker.exit()
+
+    def force_stop(self, name=None):
+        for worker in self._selected_workers(name):
+            worker.force_stop()
+
+    def force_exit(self):
+        for worker in self._workers:
+            if worker.active:
+                worker.force_exit()
+        self.active = False
+
+    def invalidate_sessions(self, profiles):
+        for worker in self._workers:
+            worker.invalidate_sessions(profiles)
+
+    # --- Private API ---------------------------------------------------------
+
+    #: Workers created so far.
+    _workers = List()
+
+    #: Workers currently performing a measure keyed by the measure name.
+    _running = Dict()
+
+    #: Name of the measure prepared but not yet started.
+    _prepared = Str()
+
+    def _get_idle_worker(self):
+        """ Get a worker not performing any measure, creating it if needed.
+
+        """
+        busy = self._running.values()
+        for worker in self._workers:
+            if worker not in busy:
+                return worker
+
+        if len(self._workers) >= self.max_concurrent_measures:
+            raise RuntimeError('No idle worker available')
+
+        name = 'MeasureProcess-{}'.format(len(self._workers) + 1)
+        worker = ProcessEngine(workbench=self.workbench, process_name=name,
+                               build_cache_size=self.build_cache_size,
+                               session_timeout=self.session_timeout)
+        worker.observe('done', self._worker_done)
+        worker.observe('measure_status', self._worker_status)
+        worker.observe('active', self._worker_active)
+        self._workers.append(worker)
+        return worker
+
+    def _selected_workers(self, name):
+        """ Get the worker running a measure or all the running workers.
+
+        """
+        if name is None:
+            return self._running.values()
+        return [self._running[name]] if name in self._running else []
+
+    def _measure_name(self, worker):
+        """ Get the name of the measure performed by a worker.
+
+        """
+        for name, running in self._running.iteritems():
+            if running is worker:
+                return name
+
+    def _worker_done(self, change):
+        """ Forward the done notification of a worker adding the measure name.
+
+        """
+        worker = change['object']
+        name = self._measure_name(worker)
+        if name is None:
+            return
+
+        # Disconnect the monitors and make the worker available before
+        # notifying the plugin which may start a new measure right away.
+        worker.unobserve('news')
+        del self._running[name]
+        self.done = tuple(change['value']) + (name,)
+
+    def _worker_status(self, change):
+        """ Forward the status of a worker adding the measure name.
+
+        """
+        name = self._measure_name(change['object'])
+        if name is not None:
+            self.measure_status = tuple(change['value']) + (name,)
+
+    def _worker_active(self, change):
+        """ The engine is active as long as one worker is.
+
+        """
+        self.active = any(worker.active for worker in self._workers)
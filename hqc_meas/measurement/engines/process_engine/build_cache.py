@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : build_cache.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Cache of the task hierarchies built by the measure process.
+
+Rebuilding a task hierarchy from its config is costly and measures enqueued
+one after the other are often identical save for a few values. The cache
+identifies a hierarchy by a hash of its structure (sections, task and
+interface classes, task names, access exceptions and set of preferences) and
+keeps the last built tree for each structure. When a measure with a known
+structure is received, the cached tree is reset and only the preferences whose
+values differ are updated.
+
+"""
+import logging
+from collections import OrderedDict
+from hashlib import md5
+
+from hqc_meas.utils.atom_util import tagged_members, member_from_str
+from hqc_meas.tasks.base_tasks import BaseTask
+from hqc_meas.tasks.task_interface import TaskInterface
+from hqc_meas.tasks.manager.building import build_task_from_config
+
+
+#: Keys of the config whose values are part of the structure of a hierarchy.
+STRUCTURE_KEYS = ('task_class', 'interface_class', 'task_name', 'access_exs')
+
+
+def analyse_config(config):
+    """ Split a config into its structure key and its preferences values.
+
+    Parameters
+    ----------
+    config : Section
+        Section describing a task hierarchy. It is not modified.
+
+    Returns
+    -------
+    key : str
+        Hash of the structure of the hierarchy.
+
+    values : dict
+        Values of the preferences not part of the structure keyed by the path
+        (tuple of section names followed by the preference name) to the
+        preference.
+
+    """
+    structure = []
+    values = {}
+
+    def walk(section, path):
+        for name in section.scalars:
+            if name in STRUCTURE_KEYS:
+                structure.append((path, name, section[name]))
+            else:
+                structure.append((path, name))
+                values[path + (name,)] = section[name]
+        for name in section.sections:
+            walk(section[name], path + (name,))
+
+    walk(config, ())
+    return md5(repr(structure)).hexdigest(), values
+
+
+def apply_preferences(root, values):
+    """ Update the preferences of a task hierarchy.
+
+    Parameters
+    ----------
+    root : RootTask
+        Root of the hierarchy to update.
+
+    values : dict
+        New values of the preferences as returned by analyse_config.
+
+    Raises
+    ------
+    ValueError :
+        If a path does not correspond to a known preference of a task or of
+        an interface (the objects built along a task, such as a pulse
+        sequence, cannot be updated in place).
+
+    """
+    for path, value in values.iteritems():
+        obj = root
+        for name in path[:-1]:
+            if obj.get_member(name) is not None:
+                obj = getattr(obj, name)
+            else:
+                # Children stored in lists are saved as member_i.
+                member, _, index = name.rpartition('_')
+                obj = getattr(obj, member)[int(index)]
+            if not isinstance(obj, (BaseTask, TaskInterface)):
+                raise ValueError('Cannot update {}'.format('/'.join(path)))
+
+        prefs = tagged_members(obj, 'pref')
+        if path[-1] not in prefs:
+            raise ValueError('Unknown preference {}'.format('/'.join(path)))
+        setattr(obj, path[-1], member_from_str(prefs[path[-1]], value))
+
+
+class BuildCache(object):
+    """ Least recently used cache of built task hierarchies.
+
+    A tree is removed from the cache while it is in use and must be given
+    back using store once the measure is over (if it can be reused).
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum number of trees kept in the cache. 0 disables the caching.
+
+    Attributes
+    ----------
+    hits : int
+        Number of measures for which a cached tree was reused.
+
+    misses : int
+        Number of measures for which the tree had to be built.
+
+    """
+
+    def __init__(self, max_size=4):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._trees = OrderedDict()
+        self._in_use = {}
+
+    def get_root(self, config, build_deps):
+        """ Get a task hierarchy ready to be run.
+
+        Parameters
+        ----------
+        config : Section
+            Section describing the hierarchy.
+
+        build_deps : dict
+            Build dependencies of the hierarchy.
+
+        Returns
+        -------
+        root : RootTask
+            Root of the hierarchy, built or taken from the cache.
+
+        reused : bool
+            Whether or not the tree was taken from the cache.
+
+        """
+        key, values = analyse_config(config)
+        root = None
+        if key in self._trees:
+            old_values, root = self._trees.pop(key)
+            diff = {path: val for path, val in values.iteritems()
+                    if old_values.get(path) != val}
+            try:
+                root.task_database.restore_edition_mode()
+                root.clean_runtime_state()
+                apply_preferences(root, diff)
+            except ValueError:
+                # Some preferences cannot be updated in place.
+                root = None
+            except Exception:
+                logger = logging.getLogger(__name__)
+                logger.exception('Failed to reuse cached task hierarchy')
+                root = None
+
+        reused = root is not None
+        if reused:
+            self.hits += 1
+        else:
+            self.misses += 1
+            root = build_task_from_config(config, build_deps, True)
+
+        if self.max_size:
+            self._in_use[id(root)] = (key, values)
+        return root, reused
+
+    def store(self, root):
+        """ Give back a tree after its execution so that it can be reused.
+
+        """
+        infos = self._in_use.pop(id(root), None)
+        if infos is None:
+            return
+        key, values = infos
+        self._trees[key] = (values, root)
+        while len(self._trees) > self.max_size:
+            self._trees.popitem(last=False)
+
+    def discard(self, root):
+        """ Forget about a tree which should not be reused.
+
+        """
+        self._in_use.pop(id(root), None)
+
+    def clear(self):
+        """ Empty the cache.
+
+        """
+        self._trees.clear()
+        self._in_use.clear()
@@ -4,7 +4,7 @@
 # author : Matthieu Dartiailh
 # license : MIT license
 # =============================================================================
-from atom.api import Typed, Value, Tuple, Bool
+from atom.api import Typed, Value, Tuple, Bool, Float, Int, Dict, Str
 from enaml.workbench.api import Workbench
 from enaml.application import deferred_call
 from multiprocessing import Pipe
@@ -12,15 +12,27 @@ from multiprocessing.queues import Queue
 from multiprocessing.synchronize import Event
 from threading import Thread
 from threading import Event as tEvent
+from tempfile import mkstemp
+import os
 import logging
 
 from hqc_meas.utils.log.tools import QueueLoggerThread
 
 from ..base_engine import BaseEngine
 from ..tools import ThreadMeasureMonitor
+from ..shared_arrays import ArrayRingBuffer
 from .subprocess import TaskProcess
 
 
+#: Maximal number of updates waiting to be processed by the monitors. Once
+#: reached new updates are dropped.
+MONITOR_QUEUE_SIZE = 1000
+
+#: Time (in s) to wait for the process to close the connections to the
+#: instruments whose profiles were invalidated.
+SESSION_CLOSING_TIMEOUT = 5.
+
+
 class ProcessEngine(BaseEngine):
     """ An engine executing the measurement it is sent in a different process.
 
@@ -31,6 +43,44 @@ class ProcessEngine(BaseEngine):
     #: Reference to the workbench got at __init__
     workbench = Typed(Workbench)
 
+    #: Name of the worker process (used to filter the log records).
+    process_name = Str('MeasureProcess')
+
+    #: Whether to send only the last value of each monitored entry at a fixed
+    #: rate rather than every single update.
+    monitor_coalesce = Bool(True)
+
+    #: Rate (in Hz) at which the monitored entries are updated when
+    #: coalescing.
+    monitor_rate = Float(20.0)
+
+    #: Size in bytes above which monitored arrays are transferred through
+    #: shared memory (or replaced by a summary if they do not fit in it). 0
+    #: means never.
+    monitor_max_array_size = Int(2**20)
+
+    #: Size in bytes of the ring buffer used to transfer large arrays to the
+    #: monitors (0 disables the use of shared memory).
+    monitor_shared_size = Int(64*2**20)
+
+    #: Statistics about the monitored entries updates of the last measure
+    #: (updates, coalesced and dropped counts).
+    monitor_stats = Dict()
+
+    #: Number of task hierarchies the measure process keeps around to reuse
+    #: them in later measures with the same structure (0 disables it).
+    build_cache_size = Int(4)
+
+    #: Duration (in s) of the phases of the processing of the last measure
+    #: (receive, build, prepare, check, perform).
+    measure_timings = Dict()
+
+    #: Time (in s) during which the measure process keeps open an unused
+    #: connection to an instrument so that the next measure using the same
+    #: profile can reuse it (0 means connections are closed after each
+    #: measure).
+    session_timeout = Float(600.)
+
     def prepare_to_run(self, name, root, monitored_entries, build_deps):
 
         runtime_deps = root.run_time
@@ -40,8 +90,13 @@ class ProcessEngine(BaseEngine):
         config = root.task_preferences
 
         # Make infos tuple to send to the subprocess.
+        spy_config = {'coalesce': self.monitor_coalesce,
+                      'flush_rate': self.monitor_rate,
+                      'max_array_size': self.monitor_max_array_size}
         self._temp = (name, config, build_deps, runtime_deps,
-                      monitored_entries)
+                      monitored_entries, spy_config)
+        self.monitor_stats = {}
+        self.measure_timings = {}
 
         # Clear all the flags.
         self._meas_pause.clear()
@@ -54,20 +109,38 @@ class ProcessEngine(BaseEngine):
         # If the process does not exist or is dead create a new one.
         if not self._process or not self._process.is_alive():
             self._pipe, process_pipe = Pipe()
+            self._session_pipe, session_pipe = Pipe()
+
+            shared_path = None
+            if self.monitor_shared_size:
+                # Use a new file each time as the previous one may not have
+                # been removed yet (on Windows while still mapped).
+                fd, shared_path = mkstemp(prefix='hqc_meas_monitor_',
+                                          suffix='.buffer')
+                os.close(fd)
+                self._shared_buffer = ArrayRingBuffer(shared_path,
+                                                      self.monitor_shared_size)
+
             self._process = TaskProcess(process_pipe,
                                         self._log_queue,
                                         self._monitor_queue,
                                         self._meas_pause,
                                         self._meas_paused,
                                         self._meas_stop,
-                                        self._stop)
+                                        self._stop,
+                                        shared_path,
+                                        self.build_cache_size,
+                                        session_pipe,
+                                        self.session_timeout,
+                                        self.process_name)
             self._process.daemon = True
 
             self._log_thread = QueueLoggerThread(self._log_queue)
             self._log_thread.daemon = True
 
             self._monitor_thread = ThreadMeasureMonitor(self,
-                                                        self._monitor_queue)
+                                                        self._monitor_queue,
+                                                        self._shared_buffer)
             self._monitor_thread.daemon = True
 
             self._pause_thread = None
@@ -93,18 +166,18 @@ class ProcessEngine(BaseEngine):
 
         self.measure_status = ('RUNNING', 'Measure running.')
 
-    def pause(self):
+    def pause(self, name=None):
         self.measure_status = ('PAUSING', 'Waiting for measure to pause.')
         self._meas_pause.set()
 
         self._pause_thread = Thread(target=self._wait_for_pause)
         self._pause_thread.start()
 
-    def resume(self):
+    def resume(self, name=None):
         self._meas_pause.clear()
         self.measure_status = ('RUNNING', 'Measure have been resumed.')
 
-    def stop(self):
+    def stop(self, name=None):
         self._stop_requested = True
         self._meas_stop.set()
 
@@ -114,7 +187,7 @@ class ProcessEngine(BaseEngine):
         self._stop.set()
         # Everything else handled by the _com_thread and the process.
 
-    def force_stop(self):
+    def force_stop(self, name=None):
         self._stop_requested = True
         # Just in case the user calls this directly. Will signal all threads to
         # stop (save _com_thread).
@@ -130,6 +203,7 @@ class ProcessEngine(BaseEngine):
         self._log_thread.join()
         self._monitor_thread.join()
         self._com_thread.join()
+        self._close_shared_buffer()
         self.active = False
         if self._processing.is_set():
             self.done = ('INTERRUPTED', 'The user forced the system to stop')
@@ -138,11 +212,32 @@ class ProcessEngine(BaseEngine):
         # Discard the queues as they may have been corrupted when the process
         # was terminated.
         self._log_queue = Queue()
-        self._monitor_queue = Queue()
+        self._monitor_queue = Queue(MONITOR_QUEUE_SIZE)
 
     def force_exit(self):
         self.force_stop()
 
+    def invalidate_sessions(self, profiles):
+        if not self._process or not self._process.is_alive():
+            return
+
+        # Wait for the connections to be closed so that the new user of the
+        # profiles does not open a second one.
+        self._session_requests += 1
+        request = self._session_requests
+        pipe = self._session_pipe
+        try:
+            pipe.send((request, list(profiles)))
+            while pipe.poll(SESSION_CLOSING_TIMEOUT):
+                if pipe.recv() == request:
+                    return
+        except (EOFError, IOError):
+            pass
+
+        logger = logging.getLogger(__name__)
+        mess = 'Measure process did not confirm closing the connections to {}'
+        logger.warning(mess.format(', '.join(profiles)))
+
     # --- Private API ---------------------------------------------------------
 
     #: Flag indicating that the user requested the measure to stop.
@@ -192,12 +287,23 @@ class ProcessEngine(BaseEngine):
 
     #: Inter-process queue used by the subprocess to send the values of the
     #: observed database entries.
-    _monitor_queue = Typed(Queue, ())
+    _monitor_queue = Typed(Queue, (MONITOR_QUEUE_SIZE,))
 
     #: Thread in charge of collecting the values of the observed database
     #: entries.
     _monitor_thread = Typed(Thread)
 
+    #: Connection used to send to the subprocess the profiles whose
+    #: instrument connections should be closed and to wait for it to be done.
+    _session_pipe = Value()
+
+    #: Number of requests sent through the _session_pipe (used to identify
+    #: their acknowledgment).
+    _session_requests = Int()
+
+    #: Ring buffer used to receive large arrays from the subprocess.
+    _shared_buffer = Typed(ArrayRingBuffer)
+
     #: Thread in charge to notify the engine that the measure did pause after
     #: being asked to do so.
     _pause_thread = Typed(Thread)
@@ -255,8 +361,9 @@ class ProcessEngine(BaseEngine):
                     return
 
             # Here get message from process and react
-            meas_status, int_status, mess = self._pipe.recv()
+            meas_status, int_status, mess, timings = self._pipe.recv()
             logger.debug('Subprocess done performing measure')
+            deferred_call(setattr, self, 'measure_timings', timings)
 
             if int_status == 'STOPPING':
                 self._cleanup()
@@ -287,6 +394,7 @@ class ProcessEngine(BaseEngine):
         logger = logging.getLogger(__name__)
         logger.debug('Cleaning up')
         self._pipe.close()
+        self._session_pipe.close()
         if process:
             self._process.join()
             logger.debug('Subprocess joined')
@@ -294,11 +402,20 @@ class ProcessEngine(BaseEngine):
         logger.debug('Log thread joined')
         self._monitor_thread.join()
         logger.debug('Monitor thread joined')
+        self._close_shared_buffer()
         if self._pause_thread:
             self._pause_thread.join()
             logger.debug('Pause thread joined')
         self.active = False
 
+    def _close_shared_buffer(self):
+        """ Close and remove the ring buffer shared with the subprocess.
+
+        """
+        if self._shared_buffer:
+            self._shared_buffer.close(remove=True)
+            self._shared_buffer = None
+
     def _wait_for_pause(self):
         """ Wait for the task paused event to be set.
 
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : session_pool.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Pool of the instrument connections kept open by the measure process.
+
+Opening a connection to an instrument and refilling the cache of the driver
+can take seconds, which is significant for short measures enqueued one after
+the other. Instead of being closed at the end of a measure, the drivers are
+given back to the pool which hands them to the next measure using the same
+profile (with the same driver class and connection infos).
+
+Before being reused a driver goes through a health check : a driver which is
+not connected anymore or which fails to communicate is closed and replaced.
+As the instrument may have been modified in between (from its front panel for
+example) the cache of the driver is cleared before it is handed to the next
+measure, unless the check_connection method of the driver reported that the
+cache is still valid. The owner of the driver is always cleared. Drivers which were not used for longer than the
+idle timeout are closed, as are the ones whose profile was invalidated because
+another user of the instrument manager requested it.
+
+"""
+import logging
+from threading import Lock
+from timeit import default_timer
+
+
+class _Session(object):
+    """Driver kept open by the pool along with the infos used to create it.
+
+    """
+    __slots__ = ('driver', 'driver_class', 'config', 'released', 'checked',
+                 'stale')
+
+    def __init__(self, driver, driver_class, config):
+        self.driver = driver
+        self.driver_class = driver_class
+        self.config = config
+        self.released = default_timer()
+        self.checked = False
+        self.stale = False
+
+
+class SessionPool(object):
+    """ Instrument drivers kept connected between measures.
+
+    Parameters
+    ----------
+    idle_timeout : float, optional
+        Time (in s) after which a driver which was not used is closed.
+
+    Attributes
+    ----------
+    hits : int
+        Number of drivers reused.
+
+    misses : int
+        Number of drivers created.
+
+    """
+
+    def __init__(self, idle_timeout=600.):
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self._idle = {}
+        self._in_use = {}
+        self._lock = Lock()
+
+    def acquire(self, profile, driver_class, config):
+        """ Get a driver for a profile, reusing an open one if possible.
+
+        Parameters
+        ----------
+        profile : str
+            Name of the instrument profile.
+
+        driver_class : type
+            Class of the driver to use.
+
+        config : dict
+            Connection infos of the profile.
+
+        Returns
+        -------
+        driver : BaseInstrument
+            Driver connected to the instrument. It should be given back using
+            release once the measure is over.
+
+        """
+        with self._lock:
+            session = self._get_session(profile, driver_class, config)
+            if session is not None:
+                self.hits += 1
+                driver = session.driver
+                driver.owner = ''
+                if session.stale:
+                    driver.clear_cache()
+            else:
+                self.misses += 1
+                session = _Session(driver_class(config), driver_class,
+                                   dict(config))
+            session.checked = False
+            session.stale = False
+            self._in_use[profile] = session
+            return session.driver
+
+    def has_session(self, profile, driver_class, config):
+        """ Check whether a healthy driver is available for a profile.
+
+        This allows to skip the test of the connection performed by the
+        checks of the instrument tasks.
+
+        """
+        with self._lock:
+            session = self._get_session(profile, driver_class, config)
+            if session is None:
+                return False
+            self._idle[profile] = session
+            return True
+
+    def release(self, profile, driver, valid=True):
+        """ Give back a driver at the end of a measure.
+
+        Parameters
+        ----------
+        profile : str
+            Name of the profile used to get the driver.
+
+        driver : BaseInstrument
+            Driver obtained through acquire.
+
+        valid : bool, optional
+            Whether the state of the instrument is known. If False (measure
+            stopped or failed) the cache of the driver is cleared.
+
+        """
+        with self._lock:
+            session = self._in_use.pop(profile, None)
+            if (session is None or session.driver is not driver or
+                    session.driver_class is None):
+                self._close(driver)
+                return
+
+            if not valid:
+                driver.owner = ''
+                driver.clear_cache()
+
+            if not self.idle_timeout:
+                self._close(driver)
+                return
+
+            session.released = default_timer()
+            old = self._idle.pop(profile, None)
+            if old is not None:
+                self._close(old.driver)
+            self._idle[profile] = session
+
+    def invalidate(self, profiles):
+        """ Close the idle drivers of the specified profiles.
+
+        The drivers currently in use are closed when they are released.
+
+        """
+        with self._lock:
+            for profile in profiles:
+                session = self._idle.pop(profile, None)
+                if session is not None:
+                    self._close(session.driver)
+                if profile in self._in_use:
+                    # Prevent the driver from being kept when released.
+                    self._in_use[profile].driver_class = None
+
+    def prune(self):
+        """ Close the drivers which have been idle for too long.
+
+        """
+        with self._lock:
+            now = default_timer()
+            for profile, session in self._idle.items():
+                if now - session.released > self.idle_timeout:
+                    del self._idle[profile]
+                    self._close(session.driver)
+
+    def clear(self):
+        """ Close all the idle drivers.
+
+        """
+        with self._lock:
+            for session in self._idle.itervalues():
+                self._close(session.driver)
+            self._idle.clear()
+
+    # --- Private API ---------------------------------------------------------
+
+    def _get_session(self, profile, driver_class, config):
+        """ Remove from the idle drivers the one matching the profile if it is
+        healthy.
+
+        """
+        session = self._idle.pop(profile, None)
+        if session is None:
+            return None
+
+        if (session.driver_class is not driver_class or
+                session.config != config or
+                default_timer() - session.released > self.idle_timeout or
+                not (session.checked or self._check(session))):
+            self._close(session.driver)
+            return None
+
+        session.checked = True
+        return session
+
+    @staticmethod
+    def _check(session):
+        """ Check that a driver is still connected and can communicate.
+
+        The session is marked as stale if the driver cannot tell whether its
+        cache is still valid or reports that it may not be.
+
+        """
+        driver = session.driver
+        try:
+            if not driver.connected():
+                return False
+            try:
+                session.stale = bool(driver.check_connection())
+            except NotImplementedError:
+                session.stale = True
+        except Exception:
+            logger = logging.getLogger(__name__)
+            logger.exception('Health check of instrument driver failed')
+            return False
+
+        return True
+
+    @staticmethod
+    def _close(driver):
+        """ Close a driver, logging any error.
+
+        """
+        try:
+            driver.close_connection()
+        except Exception:
+            logger = logging.getLogger(__name__)
+            logger.exception('Failed to close connection to instr:')
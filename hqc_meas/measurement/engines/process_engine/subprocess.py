@@ -12,10 +12,18 @@ import sys
 # TODO write my own rotating file handler to work under windows
 from logging.handlers import RotatingFileHandler
 from multiprocessing import Process
+from threading import Thread
+from timeit import default_timer
 
 from hqc_meas.utils.log.tools import (StreamToLogRedirector)
-from hqc_meas.tasks.manager.building import build_task_from_config
-from ..tools import MeasureSpy
+from ..tools import MeasureSpy, put_last
+from ..shared_arrays import ArrayRingBuffer
+from .build_cache import BuildCache
+from .session_pool import SessionPool
+
+
+#: Phases of the processing of a measure which are timed.
+PHASES = ('receive', 'build', 'prepare', 'check', 'perform')
 
 
 class TaskProcess(Process):
@@ -25,12 +33,16 @@ class TaskProcess(Process):
     queue. It then redirects stdout and stderr to the logging system. Then as
     long as it is not stopped it waits for the main process to send a
     measures through the pipe. Upon reception of the `ConfigObj` object
-    describing the measure it rebuilds it, set up a logger for that specific
+    describing the measure it rebuilds it (or reuses a cached hierarchy with
+    the same structure), set up a logger for that specific
     measure and if necessary starts a spy transmitting the value of all
-    monitored entries to the main process. It finally run the checks of the
-    measure and run it. It can be interrupted by setting an event and upon
-    exit close the communication pipe and signal all listeners that it is
-    closing.
+    monitored entries to the main process (the spy being configured using the
+    dict sent along the measure). It finally run the checks of the
+    measure and run it. The duration of each phase is sent back along the
+    measure status. The connections to the instruments are kept open between
+    measures in a session pool. It can be interrupted by setting an event and
+    upon exit close the communication pipe and signal all listeners that it
+    is closing.
 
     Parameters
     ----------
@@ -51,6 +63,20 @@ class TaskProcess(Process):
         Event set when the user asked the running measurement to stop.
     process_stop : multiprocessing event
         Event set when the user asked the process to stop.
+    shared_buffer_path : unicode, optional
+        Path to the file backing the ring buffer used to transfer large
+        arrays to the main process.
+    build_cache_size : int, optional
+        Number of task hierarchies kept around to be reused by later measures.
+    session_pipe : multiprocessing connection, optional
+        Connection through which the main process sends the list of the
+        instrument profiles whose connections should not be kept anymore. The
+        process answers once the connections are closed.
+    session_timeout : float, optional
+        Time (in s) after which an unused instrument connection is closed (0
+        means the connections are closed after each measure).
+    name : str, optional
+        Name of the process, used to identify the origin of the log records.
 
     Attributes
     ----------
@@ -66,8 +92,14 @@ class TaskProcess(Process):
     """
 
     def __init__(self, pipe, log_queue, monitor_queue, task_pause, task_paused,
-                 task_stop, process_stop):
-        super(TaskProcess, self).__init__(name='MeasureProcess')
+                 task_stop, process_stop, shared_buffer_path=None,
+                 build_cache_size=4, session_pipe=None, session_timeout=600.,
+                 name='MeasureProcess'):
+        super(TaskProcess, self).__init__(name=name)
+        self.shared_buffer_path = shared_buffer_path
+        self.build_cache_size = build_cache_size
+        self.session_pipe = session_pipe
+        self.session_timeout = session_timeout
         self.daemon = True
         self.task_pause = task_pause
         self.task_paused = task_paused
@@ -97,6 +129,19 @@ class TaskProcess(Process):
         sys.stderr = redir_stderr
         logger.info('Logger parametrised')
 
+        shared_buffer = None
+        if self.shared_buffer_path:
+            shared_buffer = ArrayRingBuffer(self.shared_buffer_path)
+
+        cache = BuildCache(self.build_cache_size)
+        sessions = SessionPool(self.session_timeout)
+        if self.session_pipe is not None:
+            # The connections must be closed even while a measure runs.
+            session_thread = Thread(target=self._serve_invalidations,
+                                    args=(sessions,))
+            session_thread.daemon = True
+            session_thread.start()
+
         logger.info('Process running')
         self.pipe.send('READY')
         while not self.process_stop.is_set():
@@ -104,31 +149,42 @@ class TaskProcess(Process):
             # Prevent us from crash if the pipe is closed at the wrong moment.
             try:
 
-                # Wait for a measurement.
+                # Wait for a measurement, closing the instrument connections
+                # which are not needed anymore.
                 while not self.pipe.poll(2):
                     if self.process_stop.is_set():
                         break
+                    sessions.prune()
 
                 if self.process_stop.is_set():
                     break
 
                 # Get the measure.
-                name, config, build, runtime, mon_entries = self.pipe.recv()
+                timings = {}
+                tic = default_timer()
+                (name, config, build, runtime,
+                 mon_entries, spy_config) = self.pipe.recv()
+                tic = self._time_phase(timings, 'receive', tic)
 
-                # Build it by using the given build dependencies.
-                root = build_task_from_config(config, build, True)
+                # Build it by using the given build dependencies or reuse a
+                # previously built hierarchy.
+                root, reused = cache.get_root(config, build)
 
                 # Give all runtime dependencies to the root task.
                 root.run_time = runtime
+                sessions.prune()
+                root.session_pool = sessions
 
-                logger.info('Task built')
+                logger.info('Task reused' if reused else 'Task built')
+                tic = self._time_phase(timings, 'build', tic)
 
                 # There are entries in the database we are supposed to
                 # monitor start a spy to do it.
                 if mon_entries:
                     spy = MeasureSpy(
                         self.monitor_queue, mon_entries,
-                        root.task_database)
+                        root.task_database, shared_buffer=shared_buffer,
+                        **spy_config)
 
                 # Set up the logger for this specific measurement.
                 if self.meas_log_handler is not None:
@@ -156,33 +212,41 @@ class TaskProcess(Process):
                 root.paused = self.task_paused
                 root.should_stop = self.task_stop
                 root.task_database.prepare_for_running()
+                tic = self._time_phase(timings, 'prepare', tic)
 
                 # Perform the checks.
                 check, errors = root.check(test_instr=True)
+                tic = self._time_phase(timings, 'check', tic)
 
                 # They pass perform the measure.
                 if check:
                     logger.info('Check successful')
                     root.perform_(root)
-                    result = ['', '', '']
+                    self._time_phase(timings, 'perform', tic)
+                    result = ['', '', '', timings]
                     if self.task_stop.is_set():
                         result[0] = 'INTERRUPTED'
                         result[2] = 'Measure {} was stopped'.format(name)
+                        cache.discard(root)
                     else:
                         result[0] = 'COMPLETED'
                         result[2] = 'Measure {} succeeded'.format(name)
+                        cache.store(root)
 
                     if self.process_stop.is_set():
                         result[1] = 'STOPPING'
                     else:
                         result[1] = 'READY'
 
+                    self._log_timings(timings)
                     self.pipe.send(tuple(result))
 
                 # They fail, mark the measure as failed and go on.
                 else:
+                    cache.discard(root)
                     mes = 'Tests failed, see log for full records.'
-                    self.pipe.send(('FAILED', 'READY', mes))
+                    self._log_timings(timings)
+                    self.pipe.send(('FAILED', 'READY', mes, timings))
 
                     # Log the tests that failed.
                     fails = errors.iteritems()
@@ -193,6 +257,10 @@ class TaskProcess(Process):
                 # If a spy was started kill it
                 if mon_entries:
                     spy.close()
+                    stats = spy.get_stats()
+                    mess = ('Monitored entries : {updates} updates, '
+                            '{coalesced} coalesced, {dropped} dropped')
+                    logger.info(mess.format(**stats))
                     del spy
 
             except IOError:
@@ -204,12 +272,57 @@ class TaskProcess(Process):
 
         # Clean up before closing.
         logger.info('Process shuting down')
+        cache.clear()
+        sessions.clear()
         if self.meas_log_handler:
             self.meas_log_handler.close()
+        if shared_buffer:
+            shared_buffer.close()
+        # The monitor queue being bounded it may be full.
+        if not put_last(self.monitor_queue, (None, None)):
+            logger.error('Failed to signal the end of the monitoring')
         self.log_queue.put_nowait(None)
-        self.monitor_queue.put_nowait((None, None))
         self.pipe.close()
 
+    def _serve_invalidations(self, sessions):
+        """Close the instrument connections invalidated by the main process
+        and acknowledge it, so that the profiles are given to their new user
+        only once the connections are closed.
+
+        Executed by a background thread.
+
+        """
+        pipe = self.session_pipe
+        while True:
+            try:
+                request = pipe.recv()
+                if request is None:
+                    break
+                request_id, profiles = request
+                sessions.invalidate(profiles)
+                pipe.send(request_id)
+            except (EOFError, IOError):
+                break
+
+    @staticmethod
+    def _time_phase(timings, phase, start):
+        """Record the duration of a phase and return the current time.
+
+        """
+        now = default_timer()
+        timings[phase] = now - start
+        return now
+
+    @staticmethod
+    def _log_timings(timings):
+        """Log the duration of the phases of the processing of a measure.
+
+        """
+        logger = logging.getLogger()
+        mess = ', '.join('{} {:.3f} s'.format(phase, timings[phase])
+                         for phase in PHASES if phase in timings)
+        logger.info('Measure timings : ' + mess)
+
     def _config_log(self):
         """Configuring the logger for the process.
 
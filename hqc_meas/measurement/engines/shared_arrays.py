@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : shared_arrays.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Tools used to transfer large arrays between processes without pickling.
+
+The measure process copies the arrays into a memory mapped file used as a ring
+buffer and only sends a small descriptor through the monitor queue. The main
+process maps the same file and builds array views on it without copying.
+
+The beginning of the file holds the position up to which the reader has
+consumed the arrays, so that the writer never overwrites data which was not
+read yet : when there is not enough free space the array is not stored.
+
+"""
+import os
+import mmap
+import atexit
+from collections import namedtuple
+from threading import Lock
+
+import numpy as np
+
+
+#: Descriptor of an array stored in a ring buffer. Offset is in bytes, shape
+#: is a tuple, dtype the description of the array dtype (its string
+#: representation or, for structured arrays, its descr) and end the position
+#: in the stream of written bytes up to which the buffer is used by the array.
+SharedArray = namedtuple('SharedArray', ['offset', 'shape', 'dtype', 'end'])
+
+#: Alignment (in bytes) of the arrays stored in the ring buffer.
+ALIGNMENT = 64
+
+#: Size (in bytes) of the header storing the read position.
+HEADER_SIZE = ALIGNMENT
+
+# Files which could not be removed because they were still mapped (this
+# happens on Windows when views on the buffer are still alive).
+_PENDING_REMOVALS = set()
+
+
+def _remove_pending():
+    """Try to remove the files which could not be removed previously.
+
+    """
+    for path in list(_PENDING_REMOVALS):
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+        except OSError:
+            continue
+        _PENDING_REMOVALS.discard(path)
+
+atexit.register(_remove_pending)
+
+
+class ArrayRingBuffer(object):
+    """Memory mapped file storing arrays one after the other.
+
+    When the end of the file is reached the writing position wraps around to
+    the beginning of the buffer. The reader signals which arrays it consumed
+    using release, and the writer refuses to store an array if it would
+    overwrite arrays which were not released yet. The views built by read are
+    only valid until the space they use is reused, user needing to keep the
+    data should copy it.
+
+    Parameters
+    ----------
+    path : unicode
+        Path to the file backing the buffer.
+
+    size : int, optional
+        Size of the buffer in bytes (including a small header). When provided
+        the file is created (or truncated) to this size, otherwise the file
+        must already exist.
+
+    """
+
+    def __init__(self, path, size=None):
+        _remove_pending()
+        self.path = path
+        if size is not None:
+            with open(path, 'wb') as f:
+                f.truncate(size)
+        self._file = open(path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self.size = len(self._mmap) - HEADER_SIZE
+        self._read_position = np.frombuffer(self._mmap, np.int64, 1)
+        self._position = 0
+        self._written = 0
+        self._previous = (0, 0)
+        self._lock = Lock()
+
+    def can_store(self, array):
+        """Check whether an array can be stored in the buffer (once it is
+        empty).
+
+        """
+        return not array.dtype.hasobject and array.nbytes <= self.size
+
+    def write(self, array):
+        """Copy an array into the buffer.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            Array to store, it must satisfy can_store.
+
+        Returns
+        -------
+        descriptor : SharedArray or None
+            Descriptor which can be passed to read to access the data, None if
+            there was not enough free space in the buffer.
+
+        """
+        array = np.ascontiguousarray(array)
+        nbytes = array.nbytes
+        with self._lock:
+            position = self._position
+            skipped = self.size - position if position + nbytes > self.size\
+                else 0
+            offset = 0 if skipped else position
+            used = min(-(-nbytes // ALIGNMENT) * ALIGNMENT, self.size - offset)
+            end = self._written + skipped + used
+            # The array overwrites the data written up to end - size, check
+            # none of it is still waiting to be read.
+            read = int(self._read_position[0])
+            if read < self._written and end - self.size > read:
+                return None
+            self._previous = (self._written, self._position)
+            self._written = end
+            self._position = (offset + used) % self.size
+
+        dest = np.frombuffer(self._mmap, np.uint8, nbytes,
+                             HEADER_SIZE + offset)
+        dest[:] = array.reshape(-1).view(np.uint8)
+        dtype = array.dtype
+        return SharedArray(offset, array.shape,
+                           dtype.descr if dtype.names else dtype.str, end)
+
+    def discard(self, descriptor):
+        """Free the space used by an array which will never be read (because
+        its descriptor could not be sent).
+
+        Only the last array written can be discarded, for the others the space
+        is freed once the reader releases a later array.
+
+        """
+        with self._lock:
+            if descriptor.end == self._written:
+                self._written, self._position = self._previous
+
+    def read(self, descriptor):
+        """Build an array view on the data described by a descriptor.
+
+        """
+        dtype = np.dtype(descriptor.dtype)
+        count = int(np.prod(descriptor.shape))
+        array = np.frombuffer(self._mmap, dtype, count,
+                              HEADER_SIZE + descriptor.offset)
+        return array.reshape(descriptor.shape)
+
+    def release(self, descriptor):
+        """Signal the writer that an array was consumed (along with all the
+        arrays written before it).
+
+        """
+        if descriptor.end > self._read_position[0]:
+            self._read_position[0] = descriptor.end
+
+    def close(self, remove=False):
+        """Unmap the buffer and optionally remove the backing file.
+
+        If the file cannot be removed yet (it is still mapped by views on
+        Windows) its removal is attempted again later.
+
+        """
+        # Views built by read keep a reference to the map, closing it
+        # explicitly would invalidate them so let the garbage collector do it.
+        self._mmap = None
+        self._read_position = None
+        self._file.close()
+        if remove:
+            _PENDING_REMOVALS.add(self.path)
+            _remove_pending()
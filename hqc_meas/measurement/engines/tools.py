@@ -5,60 +5,257 @@
 # license : MIT license
 #==============================================================================
 import logging
-from threading import Thread
-from Queue import Empty
+from threading import Thread, Lock
+from threading import Event as tEvent
+from timeit import default_timer
+from Queue import Empty, Full
 from multiprocessing.queues import Queue
-from atom.api import Atom, Coerced, Typed
+from atom.api import Atom, Coerced, Typed, Bool, Float, Int, Dict, Value
+import numpy as np
 from hqc_meas.tasks.tools.task_database import TaskDatabase
+from .shared_arrays import ArrayRingBuffer, SharedArray
+
+
+def summarize_array(array):
+    """ Build a short string describing an array.
+
+    Used to avoid pickling large arrays when sending them to the monitors.
+
+    """
+    summary = 'array(shape={}, dtype={}'.format(array.shape, array.dtype)
+    if array.size and np.isrealobj(array):
+        summary += ', min={}, max={}'.format(array.min(), array.max())
+    return summary + ')'
+
+
+def put_last(queue, item, timeout=10.):
+    """ Put a message ending a stream in a bounded queue.
+
+    If the queue is full the oldest messages are dropped to make room for it.
+    Blocking calls are used as the messages put in a multiprocessing queue
+    may still be in transit (and hence not retrievable yet) when the queue is
+    already full.
+
+    Parameters
+    ----------
+    queue : Queue
+        Queue in which to put the message.
+
+    item :
+        Message to send.
+
+    timeout : float, optional
+        Maximal time (in s) spent trying to send the message.
+
+    Returns
+    -------
+    sent : bool
+        Whether the message could be put in the queue.
+
+    """
+    deadline = default_timer() + timeout
+    while True:
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            if default_timer() > deadline:
+                return False
+            try:
+                queue.get(timeout=0.1)
+            except Empty:
+                pass
 
 
 class MeasureSpy(Atom):
     """ Spy observing a task database and sending values update into a queue.
 
+    The spy can work in two modes:
+    - a direct mode in which each update is sent as soon as it happens.
+    - a coalescing mode in which only the last value of each entry is kept
+      and the pending updates are sent at a fixed rate by a background thread.
+
+    In both modes, arrays whose size in bytes exceeds max_array_size (if
+    non zero) are copied into the shared buffer (if one is provided and has
+    enough free space) and only a descriptor is sent, or replaced by a summary
+    string.
+
     """
     observed_entries = Coerced(set)
     observed_database = Typed(TaskDatabase)
     queue = Typed(Queue)
 
-    def __init__(self, queue, observed_entries, observed_database):
+    #: Whether or not to coalesce updates.
+    coalesce = Bool()
+
+    #: Rate (in Hz) at which coalesced updates are sent.
+    flush_rate = Float(20.0)
+
+    #: Size in bytes above which arrays are not sent through the queue
+    #: (0 means never).
+    max_array_size = Int()
+
+    #: Ring buffer shared with the main process used to transfer large arrays.
+    shared_buffer = Typed(ArrayRingBuffer)
+
+    #: Number of updates of observed entries received.
+    updates_count = Int()
+
+    #: Number of updates which were replaced by a newer value before being
+    #: sent.
+    coalesced_count = Int()
+
+    #: Number of updates which could not be sent because the queue was full.
+    dropped_count = Int()
+
+    def __init__(self, queue, observed_entries, observed_database,
+                 coalesce=False, flush_rate=20.0, max_array_size=0,
+                 shared_buffer=None):
         super(MeasureSpy, self).__init__()
         self.queue = queue
+        self.shared_buffer = shared_buffer
         self.observed_entries = set(observed_entries)
+        self.coalesce = coalesce
+        self.flush_rate = flush_rate
+        self.max_array_size = max_array_size
+        if coalesce:
+            self._flush_thread = Thread(target=self._flush_loop)
+            self._flush_thread.daemon = True
+            self._flush_thread.start()
         self.observed_database = observed_database
         self.observed_database.observe('notifier', self.enqueue_update)
 
     def enqueue_update(self, change):
         new = change['value']
-        if new[0] in self.observed_entries:
-            self.queue.put_nowait(new)
+        # Several values set at once are notified as a list of updates.
+        updates = new if isinstance(new, list) else (new,)
+        observed = self.observed_entries
+        for update in updates:
+            if update[0] not in observed:
+                continue
+            with self._lock:
+                self.updates_count += 1
+                if self.coalesce:
+                    if update[0] in self._pending:
+                        self.coalesced_count += 1
+                    self._pending[update[0]] = update[1]
+                    continue
+            self._send(update)
+
+    def flush(self):
+        """ Send all pending updates (coalescing mode only).
+
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        for update in pending.iteritems():
+            self._send(update)
+
+    def get_stats(self):
+        """ Get the counters summarizing the activity of the spy.
+
+        """
+        with self._lock:
+            return {'updates': self.updates_count,
+                    'coalesced': self.coalesced_count,
+                    'dropped': self.dropped_count}
 
     def close(self):
+        # Stop the flushing thread and send any pending update.
+        if self._flush_thread:
+            self._stop_flush.set()
+            self._flush_thread.join()
+            self.flush()
+
+        self.observed_database.unobserve('notifier', self.enqueue_update)
+
         # Simply signal the queue the working thread that the spy won't send
-        # any more informations. But don't request the thread to exit this
-        # is the responsability of the engine.
-        self.queue.put(('', ''))
+        # any more informations (passing the spy statistics). But don't
+        # request the thread to exit this is the responsability of the
+        # engine.
+        put_last(self.queue, ('', self.get_stats()))
+
+    # --- Private API ---------------------------------------------------------
+
+    #: Lock protecting the pending updates and the counters.
+    _lock = Value(factory=Lock)
+
+    #: Last values of the entries updated since the last flush.
+    _pending = Dict()
+
+    #: Thread periodically sending the pending updates.
+    _flush_thread = Typed(Thread)
+
+    #: Event used to stop the flushing thread.
+    _stop_flush = Value(factory=tEvent)
+
+    def _send(self, update):
+        """ Put an update in the queue, handling large arrays.
+
+        """
+        value = update[1]
+        max_size = self.max_array_size
+        if max_size and isinstance(value, np.ndarray) and\
+                value.nbytes > max_size:
+            shared = self.shared_buffer
+            descriptor = None
+            if shared is not None and shared.can_store(value):
+                # None if the monitors did not consume the previous arrays.
+                descriptor = shared.write(value)
+            if descriptor is not None:
+                update = (update[0], descriptor)
+            else:
+                update = (update[0], summarize_array(value))
+        try:
+            self.queue.put_nowait(update)
+        except Full:
+            if isinstance(update[1], SharedArray):
+                self.shared_buffer.discard(update[1])
+            with self._lock:
+                self.dropped_count += 1
+
+    def _flush_loop(self):
+        """ Send the pending updates at the specified rate.
+
+        """
+        period = 1.0/self.flush_rate
+        while not self._stop_flush.wait(period):
+            self.flush()
 
 
 class ThreadMeasureMonitor(Thread):
     """ Thread sending a queue content to the news signal of a engine.
 
+    Arrays transferred through a shared buffer are copied out of it before
+    being passed to the engine so that their space can be released at once.
+
     """
 
-    def __init__(self, engine, queue):
+    def __init__(self, engine, queue, shared_buffer=None):
         super(ThreadMeasureMonitor, self).__init__()
         self.queue = queue
         self.engine = engine
+        self.shared_buffer = shared_buffer
 
     def run(self):
         while True:
             try:
                 news = self.queue.get()
-                if news not in [(None, None), ('', '')]:
+                if news[0]:
+                    if isinstance(news[1], SharedArray):
+                        shared = self.shared_buffer
+                        value = np.array(shared.read(news[1]))
+                        shared.release(news[1])
+                        news = (news[0], value)
                     # Here news is a Signal not Event hence the syntax.
                     self.engine.news(news)
-                elif news == ('', ''):
+                elif news[0] == '':
                     logger = logging.getLogger(__name__)
                     logger.debug('Spy closed')
+                    # The spy sends its statistics when closing.
+                    if news[1]:
+                        self.engine.monitor_stats = news[1]
                 else:
                     break
             except Empty:
@@ -70,6 +70,10 @@ class MeasurePlugin(HasPrefPlugin):
     # Currently run measure or last measure run.
     running_measure = Typed(Measure)
 
+    #: Measures currently performed by the engine keyed by name (can contain
+    #: several measures if the engine supports it).
+    running_measures = Dict(Unicode(), Typed(Measure))
+
     # Dict holding the contributed Engine declarations.
     engines = Dict(Unicode(), Typed(Engine))
 
@@ -103,6 +107,10 @@ class MeasurePlugin(HasPrefPlugin):
     # Internal flags.
     flags = ContainerList()
 
+    #: Names of the running measures the user already tried to stop (a
+    #: second attempt should force them to stop).
+    stop_attempts = ContainerList(Unicode())
+
     def start(self):
         """
         """
@@ -153,14 +161,18 @@ class MeasurePlugin(HasPrefPlugin):
         logger = logging.getLogger(__name__)
 
         # Discard old monitors if there is any remaining.
-        if self.running_measure:
-            for monitor in self.running_measure.monitors.values():
+        last = self.running_measure
+        if last and last.name not in self.running_measures:
+            for monitor in last.monitors.values():
                 monitor.stop()
 
         measure.enter_running_state()
         self.running_measure = measure
+        self.running_measures[measure.name] = measure
 
-        self.flags.append('processing')
+        # Concurrent measures share the flag (removed once processing stops).
+        if 'processing' not in self.flags:
+            self.flags.append('processing')
 
         instr_use_granted = 'profiles' not in measure.store
         # Checking build dependencies, if present simply request instr profiles
@@ -198,6 +210,7 @@ class MeasurePlugin(HasPrefPlugin):
             if not res[0]:
                 for id in res[1]:
                     logger.warn(res[1][id])
+                del self.running_measures[measure.name]
                 return False
 
             build_deps = res[1]
@@ -218,7 +231,8 @@ class MeasurePlugin(HasPrefPlugin):
             logger.info(mes.replace('\n', ' '))
 
             # Simulate a message coming from the engine.
-            done = {'value': ('SKIPPED', 'Failed to get requested profiles')}
+            done = {'value': ('SKIPPED', 'Failed to get requested profiles',
+                              measure.name)}
 
             # Break a potential high statck as this function would not exit
             # if a new measure is started.
@@ -241,7 +255,8 @@ class MeasurePlugin(HasPrefPlugin):
             logger.warn(mes.replace('\n', ' '))
 
             # Simulate a message coming from the engine.
-            done = {'value': ('FAILED', 'Failed to pass the built in tests')}
+            done = {'value': ('FAILED', 'Failed to pass the built in tests',
+                              measure.name)}
 
             # Break a potential high statck as this function would not exit
             # if a new measure is started.
@@ -273,38 +288,57 @@ class MeasurePlugin(HasPrefPlugin):
         # Get a ref to the main window.
         ui_plugin = self.workbench.get_plugin('enaml.workbench.ui')
         # Connect new monitors, and start them.
+        source = engine.news_source(measure.name)
         for monitor in measure.monitors.values():
-            engine.observe('news', monitor.process_news)
+            source.observe('news', monitor.process_news)
             monitor.start(ui_plugin.window)
 
         logger.info('''Starting measure {}.'''.format(measure.name))
         # Ask the engine to start the measure.
         engine.run()
 
-    def pause_measure(self):
+        # If the engine can perform more measures at once, look for a measure
+        # which does not conflict with the running ones.
+        if len(self.running_measures) < engine.max_concurrent_measures:
+            enaml.application.deferred_call(self._start_concurrent_measure)
+
+    def pause_measure(self, measure=None):
         """ Pause the currently active measure.
 
+        Parameters
+        ----------
+        measure : Measure, optional
+            Measure to pause, default to the running_measure.
+
         """
+        measure = measure or self.running_measure
         logger = logging.getLogger(__name__)
-        logger.info('Pausing measure {}.'.format(self.running_measure.name))
-        self.engine_instance.pause()
+        logger.info('Pausing measure {}.'.format(measure.name))
+        self.engine_instance.pause(measure.name)
 
-    def resume_measure(self):
+    def resume_measure(self, measure=None):
         """ Resume the currently paused measure.
 
+        See pause_measure for the meaning of measure.
+
         """
+        measure = measure or self.running_measure
         logger = logging.getLogger(__name__)
-        logger.info('Resuming measure {}.'.format(self.running_measure.name))
-        self.engine_instance.resume()
+        logger.info('Resuming measure {}.'.format(measure.name))
+        self.engine_instance.resume(measure.name)
 
-    def stop_measure(self):
+    def stop_measure(self, measure=None):
         """ Stop the currently active measure.
 
+        See pause_measure for the meaning of measure.
+
         """
+        measure = measure or self.running_measure
         logger = logging.getLogger(__name__)
-        logger.info('Stopping measure {}.'.format(self.running_measure.name))
-        self.flags.append('stop_attempt')
-        self.engine_instance.stop()
+        logger.info('Stopping measure {}.'.format(measure.name))
+        if measure.name not in self.stop_attempts:
+            self.stop_attempts.append(measure.name)
+        self.engine_instance.stop(measure.name)
 
     def stop_processing(self):
         """ Stop processing the enqueued measure.
@@ -318,13 +352,16 @@ class MeasurePlugin(HasPrefPlugin):
             self.flags.remove('processing')
         self.engine_instance.exit()
 
-    def force_stop_measure(self):
+    def force_stop_measure(self, measure=None):
         """ Force the engine to stop performing the current measure.
 
+        See pause_measure for the meaning of measure.
+
         """
+        measure = measure or self.running_measure
         logger = logging.getLogger(__name__)
-        logger.info('Exiting measure {}.'.format(self.running_measure.name))
-        self.engine_instance.force_stop()
+        logger.info('Exiting measure {}.'.format(measure.name))
+        self.engine_instance.force_stop(measure.name)
 
     def force_stop_processing(self):
         """ Force the engine to exit and stop processing measures.
@@ -340,6 +377,9 @@ class MeasurePlugin(HasPrefPlugin):
     def find_next_measure(self):
         """ Find the next runnable measure in the queue.
 
+        Measures conflicting with the running ones (same name or instrument
+        profiles in common) are skipped.
+
         Returns
         -------
         measure : Measure
@@ -348,13 +388,19 @@ class MeasurePlugin(HasPrefPlugin):
 
         """
         enqueued_measures = self.enqueued_measures
+        running = self.running_measures
+        used_profiles = set(prof for meas in running.itervalues()
+                            for prof in meas.store.get('profiles', ()))
         i = 0
         measure = None
         # Look for a measure not being currently edited. (Can happen if the
         # user is editing the second measure when the first measure ends).
         while i < len(enqueued_measures):
             measure = enqueued_measures[i]
-            if measure.status in INVALID_MEASURE_STATUS:
+            profiles = measure.store.get('profiles', ())
+            if (measure.status in INVALID_MEASURE_STATUS or
+                    measure.name in running or
+                    used_profiles.intersection(profiles)):
                 i += 1
                 measure = None
             else:
@@ -382,21 +428,53 @@ class MeasurePlugin(HasPrefPlugin):
     # Dict storing which extension declared which monitor.
     _monitor_extensions = Typed(defaultdict, (list,))
 
+    def _start_concurrent_measure(self):
+        """ Start the next measure if it does not conflict with the running
+        ones.
+
+        """
+        if 'processing' not in self.flags or 'stop_processing' in self.flags:
+            return
+
+        engine = self.engine_instance
+        if engine and len(self.running_measures) < \
+                engine.max_concurrent_measures:
+            meas = self.find_next_measure()
+            if meas is not None:
+                self.start_measure(meas)
+
+    def _measure_from_engine(self, value):
+        """ Get the measure to which a value sent by the engine refers.
+
+        Engines performing several measures append the measure name to the
+        value.
+
+        """
+        if len(value) > 2:
+            return self.running_measures.get(value[2])
+        return self.running_measure
+
     def _listen_to_engine(self, change):
         """ Observer for the engine notifications.
 
         """
-        status, infos = change['value']
-        self.running_measure.status = status
-        self.running_measure.infos = infos
+        measure = self._measure_from_engine(change['value'])
+        if measure is None:
+            return
+        status, infos = change['value'][:2]
+        measure.status = status
+        measure.infos = infos
+        self.running_measures.pop(measure.name, None)
+        if measure.name in self.stop_attempts:
+            self.stop_attempts.remove(measure.name)
 
         logger = logging.getLogger(__name__)
         mess = 'Measure {} processed, status : {}'.format(
-            self.running_measure.name, status)
+            measure.name, status)
         logger.info(mess)
 
         # Releasing instrument profiles.
-        profs = self.running_measure.store.get('profiles', set())
+        profs = measure.store.get('profiles', set())
         core = self.workbench.get_plugin('enaml.workbench.core')
 
         com = u'hqc_meas.instr_manager.profiles_released'
@@ -405,7 +483,18 @@ class MeasurePlugin(HasPrefPlugin):
         # Disconnect monitors.
         engine = self.engine_instance
         if engine:
-            engine.unobserve('news')
+            engine.news_source(measure.name).unobserve('news')
+
+        # The monitors of the last started measure are kept open.
+        if measure is not self.running_measure:
+            for monitor in measure.monitors.values():
+                monitor.stop()
+
+        # Measures still running will notify the plugin once done.
+        if self.running_measures:
+            if 'stop_processing' not in self.flags:
+                self._start_concurrent_measure()
+            return
 
         # If we are supposed to stop, stop.
         if engine and'stop_processing' in self.flags:
@@ -441,9 +530,10 @@ class MeasurePlugin(HasPrefPlugin):
         """
         new_vals = change['value']
 
-        running = self.running_measure
-        running.status = new_vals[0]
-        running.infos = new_vals[1]
+        running = self._measure_from_engine(new_vals)
+        if running:
+            running.status = new_vals[0]
+            running.infos = new_vals[1]
 
     def _register_manifest(self, path, manifest_name):
         """ Register a manifest given its module name and its name.
@@ -324,6 +324,7 @@ class MeasureSpace(Workspace):
                 return
 
         self.plugin.flags = []
+        self.plugin.stop_attempts = []
 
         measure = self.plugin.find_next_measure()
         if measure is not None:
@@ -342,36 +343,45 @@ class MeasureSpace(Workspace):
 
         """
         self.plugin.flags = []
+        self.plugin.stop_attempts = []
         self.plugin.flags.append('stop_processing')
 
         self.plugin.start_measure(measure)
 
-    def pause_current_measure(self):
+    def pause_current_measure(self, measure=None):
         """ Pause the currently active measure.
 
+        Parameters
+        ----------
+        measure : Measure, optional
+            Measure to pause when several measures are running, default to
+            the last started one.
+
         """
-        self.plugin.pause_measure()
+        self.plugin.pause_measure(measure)
 
-    def resume_current_measure(self):
+    def resume_current_measure(self, measure=None):
         """ Remuse the currently paused measure.
 
+        See pause_current_measure for the meaning of measure.
+
         """
-        self.plugin.resume_measure()
+        self.plugin.resume_measure(measure)
 
-    def stop_current_measure(self):
+    def stop_current_measure(self, measure=None):
         """
         """
-        self.plugin.stop_measure()
+        self.plugin.stop_measure(measure)
 
     def stop_processing_measures(self):
         """
         """
         self.plugin.stop_processing()
 
-    def force_stop_measure(self):
+    def force_stop_measure(self, measure=None):
         """
         """
-        self.plugin.force_stop_measure()
+        self.plugin.force_stop_measure(measure)
 
     def force_stop_processing(self):
         """
@@ -584,6 +584,12 @@ class RootSequence(Sequence):
     #: Reference to the executioner context of the sequence.
     context = Instance(BaseContext)
 
+    #: Informations about the last compilation using the context.
+    #: 'shape_timings' maps the index of each analogical pulse to the class of
+    #: its shape and the time spent computing it (0 if the waveform was
+    #: cached), 'shape_time' is the total time spent computing shapes.
+    compilation_report = Dict()
+
     index = set_default(0)
     name = set_default('Root')
 
@@ -663,7 +669,9 @@ class RootSequence(Sequence):
             kwargs = {}
             if self.time_constrained:
                 kwargs['sequence_duration'] = duration
-            return self.context.compile_sequence(pulses, **kwargs)
+            result = self.context.compile_sequence(pulses, **kwargs)
+            self._report_shapes(pulses)
+            return result
             
             
     def compile_loop(self, use_context=True):
@@ -735,7 +743,9 @@ class RootSequence(Sequence):
             kwargs = {}
             if self.time_constrained:
                 kwargs['sequence_duration'] = duration
-            return self.context.compile_loop(pulses, **kwargs)
+            result = self.context.compile_loop(pulses, **kwargs)
+            self._report_shapes(pulses)
+            return result
 
     def get_bindable_vars(self):
         """ Access the list of bindable vars for the sequence.
@@ -837,6 +847,16 @@ class RootSequence(Sequence):
 
     # --- Private API ---------------------------------------------------------
 
+    def _report_shapes(self, pulses):
+        """ Store the time spent computing the shapes in the report.
+
+        """
+        timings = {p.index: (p.shape.shape_class, p._shape_time)
+                   for p in pulses if p.kind == 'Analogical' and p.shape}
+        self.compilation_report = {'shape_timings': timings,
+                                   'shape_time': sum(t for _, t
+                                                     in timings.values())}
+
     def _answer(self, members, callables):
         """
 
@@ -12,6 +12,123 @@ import numpy as np
 from .base_context import BaseContext, TIME_CONVERSION
 
 
+#: Value of the 16 bits words corresponding to a null analogical value.
+ANALOG_ZERO = 2**13
+
+#: Factor converting the waveforms (between -1 and 1) into 14 bits values.
+ANALOG_SCALE = 8191
+
+#: Largest valid analogical value.
+ANALOG_MAX = 2**14 - 1
+
+#: Bits of the 16 bits words holding the markers.
+MARKER_BITS = {'M1': np.uint16(2**14), 'M2': np.uint16(2**15)}
+
+
+def pack_pulses(pulses, used_channels, sequence_length, time_to_index,
+                inverted_log_channels=()):
+    """ Pack pulses into one little endian 16 bits word buffer per channel.
+
+    The analogical waveforms are added in place into a single preallocated
+    buffer per channel, the markers being then set in bits 14 and 15 of the
+    same buffer so that no intermediate full length array is created.
+
+    Parameters
+    ----------
+    pulses : list(Pulse)
+        Pulses to pack.
+
+    used_channels : iterable
+        Names of the channels (Chi) used by the pulses.
+
+    sequence_length : int
+        Number of samples in the sequence.
+
+    time_to_index : float
+        Factor converting the start of a pulse into an index.
+
+    inverted_log_channels : iterable, optional
+        Marker channels (Chi_Mj) whose logic should be inverted.
+
+    Returns
+    -------
+    result : bool
+        Boolean indicating whether or not the packing succeeded.
+
+    to_send or traceback : dict
+        Dict of {channel number: memoryview} giving access without copy to
+        the bytes to send, or the traceback of the issues in case of failure.
+
+    """
+    analogical = []
+    logical = []
+    for pulse in pulses:
+        channeltype = pulse.channel[4:]
+        if channeltype == 'A' and pulse.kind == 'Analogical':
+            analogical.append(pulse)
+        elif channeltype in MARKER_BITS and pulse.kind == 'Logical':
+            logical.append(pulse)
+        else:
+            msg = 'Selected channel does not match kind for pulse {} ({}).'
+            return False, {'Kind issue':
+                           msg.format(pulse.index,
+                                      (pulse.kind, pulse.channel))}
+
+    buffers = {}
+    for channel in used_channels:
+        buffers[channel] = np.empty(sequence_length, dtype='<u2')
+        buffers[channel].fill(ANALOG_ZERO)
+
+    for pulse in analogical:
+        values = np.rint(ANALOG_SCALE*pulse.waveform).astype(np.int16)
+        start_index = int(round(pulse.start*time_to_index))
+        segment = buffers[pulse.channel[:3]][start_index:
+                                             start_index + len(values)]
+        # Negative values wrap around as they would in 16 bits arithmetic.
+        segment += values.view(np.uint16)
+
+    # Check the analogical overflows before touching the marker bits. Only
+    # the first issue of each channel is reported.
+    traceback = {}
+    for channel, buff in buffers.iteritems():
+        if buff.max() > ANALOG_MAX:
+            mes = 'Analogical values out of range.'
+            traceback['{}_A'.format(channel)] = mes
+
+    overflows = set()
+    for pulse in logical:
+        channel = pulse.channel[:3]
+        marker = pulse.channel[4:]
+        start_index = int(round(pulse.start*time_to_index))
+        segment = buffers[channel][start_index:
+                                   start_index + len(pulse.waveform)]
+        bit = MARKER_BITS[marker]
+        if (segment & bit).any():
+            overflows.add((channel, marker))
+        segment |= bit
+
+    for channel in used_channels:
+        if '{}_A'.format(channel) in traceback:
+            continue
+        for marker in ('M1', 'M2'):
+            if (channel, marker) in overflows:
+                mes = 'Overflow in marker {}.'.format(marker[-1])
+                traceback['{}_{}'.format(channel, marker)] = mes
+                break
+
+    if traceback:
+        return False, traceback
+
+    # Invert marked logical channels.
+    for i_ch in inverted_log_channels:
+        ch, m = i_ch.split('_')
+        if ch in buffers:
+            buffers[ch] ^= MARKER_BITS[m]
+
+    return True, {int(channel[-1]): memoryview(buff.view(np.uint8))
+                  for channel, buff in buffers.iteritems()}
+
+
 class AWGContext(BaseContext):
     """
     """
@@ -45,8 +162,9 @@ class AWGContext(BaseContext):
             Boolean indicating whether or not the compilation succeeded.
 
         to_send or traceback : dict
-            Dict of {channel: bytearray} to send to the AWG in case of success
-            or the traceback of the issues in case of failure.
+            Dict of {channel: memoryview} giving access to the bytes to send
+            to the AWG in case of success or the traceback of the issues in
+            case of failure.
 
         """
         sequence_duration = max([pulse.stop for pulse in pulses])
@@ -69,85 +187,8 @@ class AWGContext(BaseContext):
         # Length of the sequence
         sequence_length = int(round(sequence_duration * time_to_index))
 
-        # create 3 array for each used_channels
-        array_analog = {}
-        array_M1 = {}
-        array_M2 = {}
-        for channel in used_channels:
-            # numpy array for analog channels int16 init 2**13
-            array_analog[channel] = np.ones(sequence_length,
-                                            dtype=np.uint16)*(2**13)
-            # numpy array for marker1 init False. For AWG M1 = 0 = off
-            array_M1[channel] = np.zeros(sequence_length, dtype=np.int8)
-            # numpy array for marker2 init False. For AWG M2 = 0 = off
-            array_M2[channel] = np.zeros(sequence_length, dtype=np.int8)
-
-        for pulse in pulses:
-
-            waveform = pulse.waveform
-			# ZL
-			#waveform = np.ones(len(waveform), dtype=np.int8)
-            channel = pulse.channel[:3]
-            channeltype = pulse.channel[4:]
-
-            start_index = int(round(pulse.start*time_to_index))
-            stop_index = start_index + len(waveform)
-
-            if channeltype == 'A' and pulse.kind == 'Analogical':
-#                array_analog[channel][start_index:stop_index] +=\
-#                    np.rint(8191*waveform)
-                array_analog[channel][start_index:stop_index] +=\
-                    (np.rint(8191*waveform)).astype(np.uint16)
-            elif channeltype == 'M1' and pulse.kind == 'Logical':
-                array_M1[channel][start_index:stop_index] += waveform
-            elif channeltype == 'M2' and pulse.kind == 'Logical':
-                array_M2[channel][start_index:stop_index] += waveform
-            else:
-                msg = 'Selected channel does not match kind for pulse {} ({}).'
-                return False, {'Kind issue':
-                               msg.format(pulse.index,
-                                          (pulse.kind, pulse.channel))}
-
-        # Check the overflows
-        traceback = {}
-        for channel in used_channels:
-            analog = array_analog[channel]
-            if analog.max() > 16383 or analog.min() < 0:
-                mes = 'Analogical values out of range.'
-                traceback['{}_A'.format(channel)] = mes
-
-            elif array_M1[channel].max() > 1 or array_M1[channel].min() < 0:
-                mes = 'Overflow in marker 1.'
-                traceback['{}_M1'.format(channel)] = mes
-
-            elif array_M2[channel].max() > 1 or array_M2[channel].min() < 0:
-                mes = 'Overflow in marker 2.'
-                traceback['{}_M2'.format(channel)] = mes
-
-        if traceback:
-            return False, traceback
-
-        # Invert marked logical channels.
-        for i_ch in self.inverted_log_channels:
-            ch, m = i_ch.split('_')
-            if m == 'M1':
-                np.logical_not(array_M1[ch], array_M1[ch])
-            else:
-                np.logical_not(array_M2[ch], array_M2[ch])
-
-        # Byte arrays to send to the AWG
-        to_send = {}
-        for channel in used_channels:
-            # Convert to sixteen bits integers
-            array = array_analog[channel] +\
-                array_M1[channel]*(2**14) + array_M2[channel]*(2**15)
-            # Creating and filling a byte array for each channel.
-            aux = np.empty(2*sequence_length, dtype=np.uint8)
-            aux[::2] = array % 2**8
-            aux[1::2] = array // 2**8
-            to_send[int(channel[-1])] = bytearray(aux)
-
-        return True, to_send
+        return pack_pulses(pulses, used_channels, sequence_length,
+                           time_to_index, self.inverted_log_channels)
         
     def merge_intervals(self,intervals, sequence_length):
         if intervals[0][0] <= 256:
@@ -376,12 +417,12 @@ class AWGContext(BaseContext):
                     bytes[int(channel[-1])].append(added)
                     
                 else:
-                    waveform_new = array_analog[channel][i] + array_M1[channel][i]*(2**14) +\
-                    array_M2[channel][i]*(2**15)
-                    aux = np.empty(2*len(waveform_new), dtype=np.uint8)
-                    aux[::2] = waveform_new % 2**8
-                    aux[1::2] = waveform_new // 2**8
-                    byteadded = bytearray(aux)
+                    words = array_analog[channel][i].astype('<u2')
+                    words |= array_M1[channel][i].astype(np.bool_) * \
+                        MARKER_BITS['M1']
+                    words |= array_M2[channel][i].astype(np.bool_) * \
+                        MARKER_BITS['M2']
+                    byteadded = memoryview(words.view(np.uint8))
                     bytes[int(channel[-1])].append(byteadded)
                     already_added[addr] = byteadded
 
@@ -56,6 +56,95 @@ def eval_entry(string, seq_locals, missing_locals):
     return eval(expr, globals(), replacement_values)
 
 
+class RecordingNamespace(object):
+    """ Wrapper around a namespace keeping track of the variables used.
+
+    Reads of variables not previously written through the wrapper are
+    recorded in reads along with the value found, writes are forwarded to the
+    wrapped namespace and recorded in writes.
+
+    Parameters
+    ----------
+    namespace : dict
+        Namespace to wrap.
+
+    """
+    __slots__ = ('namespace', 'reads', 'writes')
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.reads = {}
+        self.writes = {}
+
+    def __contains__(self, key):
+        found = key in self.namespace
+        if found and key not in self.writes:
+            self.reads[key] = self.namespace[key]
+        return found
+
+    def __getitem__(self, key):
+        value = self.namespace[key]
+        if key not in self.writes:
+            self.reads[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self.namespace[key] = value
+        self.writes[key] = value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+#: Compiled entries keyed by (entry, mode).
+_COMPILED_ENTRIES = {}
+
+
+def compile_entry(string, mode='exec'):
+    """ Compile an entry once for all.
+
+    The references to variables ({name}) are replaced by tokens (_a0, _a1,
+    ...) whose values must be provided in the namespace used to run the
+    code.
+
+    Parameters
+    ----------
+    string : str
+        Entry to compile.
+
+    mode : {'exec', 'eval'}, optional
+        Mode passed to the builtin compile.
+
+    Returns
+    -------
+    code : code
+        Compiled code object.
+
+    names : tuple
+        Names of the variables referenced by the tokens, in order.
+
+    """
+    key = (string, mode)
+    compiled = _COMPILED_ENTRIES.get(key)
+    if compiled is None:
+        elements = [el for aux in string.split('{')
+                    for el in aux.split('}')]
+        names = tuple(elements[1::2])
+        tokens = ['_a{}'.format(i) for i in xrange(len(names))]
+        expr = elements[0] + ''.join(token + text for token, text
+                                     in zip(tokens, elements[2::2]))
+        compiled = (compile(expr, '<entry>', mode), names)
+        _COMPILED_ENTRIES[key] = compiled
+    return compiled
+
+
+def entry_globals():
+    """ Copy of the namespace in which the entries are evaluated.
+
+    """
+    return dict(globals())
+
+
 def exec_entry(string, seq_locals, missing_locals):
     """
 
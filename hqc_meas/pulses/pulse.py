@@ -4,15 +4,51 @@
 # author : Matthieu Dartiailh
 # license : MIT license
 # =============================================================================
-from atom.api import (Instance, Str, Enum, Typed, Property, set_default)
+from atom.api import (Instance, Str, Enum, Typed, Property, Value, Float,
+                      set_default)
+from timeit import default_timer
 import numpy as np
 
-from hqc_meas.utils.atom_util import member_from_str
+from hqc_meas.utils.atom_util import member_from_str, tagged_members
 from .shapes.base_shapes import AbstractShape
 from .shapes.modulation import Modulation
+from .entry_eval import RecordingNamespace
+from .waveform_cache import WAVEFORM_CACHE
 from item import Item
 
 
+#: Names of the preference members of each class, used to identify the
+#: definition of a pulse.
+_PREF_NAMES = {}
+
+
+def pref_values(obj):
+    """ Values of the preference members of an object.
+
+    Lists are converted to tuples so that later in place modifications are
+    detected when comparing the values.
+
+    """
+    cls = type(obj)
+    names = _PREF_NAMES.get(cls)
+    if names is None:
+        names = _PREF_NAMES[cls] = sorted(tagged_members(obj, 'pref'))
+    values = [getattr(obj, name) for name in names]
+    return tuple(tuple(v) if isinstance(v, list) else v for v in values)
+
+
+def same_value(old, new):
+    """ Check whether a variable kept its value between two compilations.
+
+    """
+    try:
+        return type(old) is type(new) and bool(old == new)
+    except Exception:
+        # Arrays and objects without a sensible comparison are assumed to
+        # have changed.
+        return False
+
+
 class Pulse(Item):
     """ Represent a pulse to perfom during a sequence.
 
@@ -39,6 +75,11 @@ class Pulse(Item):
     def eval_entries(self, root_vars, sequence_locals, missings, errors):
         """ Attempt to eval the string parameters of the pulse.
 
+        The variables used during the last successful evaluation are recorded
+        along with their values. If neither the definition of the pulse nor
+        those variables changed since, the previous results are reused and
+        the waveform is not recomputed.
+
         Parameters
         ----------
         root_vars : dict
@@ -61,17 +102,40 @@ class Pulse(Item):
             Boolean indicating whether or not the evaluation succeeded.
 
         """
-        success = super(Pulse, self).eval_entries(root_vars, sequence_locals,
+        self._shape_time = 0.0
+        definition = self._definition()
+        cache = self._eval_cache
+        if cache is not None and cache[0] == definition:
+            _, reads, writes = cache
+            unknown = [name for name in reads if name not in sequence_locals]
+            if unknown:
+                # The evaluation would fail in the same way.
+                missings.update(unknown)
+                return False
+
+            if all(same_value(value, sequence_locals[name])
+                   for name, value in reads.iteritems()):
+                root_vars.update(writes)
+                sequence_locals.update(writes)
+                return True
+
+        self._eval_cache = None
+        self._waveform_cache = None
+        namespace = RecordingNamespace(sequence_locals)
+        success = super(Pulse, self).eval_entries(root_vars, namespace,
                                                   missings, errors)
 
         if self.kind == 'Analogical':
-            success &= self.modulation.eval_entries(sequence_locals,
+            success &= self.modulation.eval_entries(namespace,
                                                     missings, errors,
                                                     self.index)
 
-            success &= self.shape.eval_entries(sequence_locals,
+            success &= self.shape.eval_entries(namespace,
                                                missings, errors, self.index)
 
+        if success:
+            self._eval_cache = (definition, namespace.reads, namespace.writes)
+
         return success
 
     @classmethod
@@ -132,6 +196,48 @@ class Pulse(Item):
 
     # --- Private API ---------------------------------------------------------
 
+    #: Definition of the pulse, variables read and values written during the
+    #: last successful evaluation of the entries.
+    _eval_cache = Value()
+
+    #: Last computed waveform along with the parameters used to compute it.
+    _waveform_cache = Value()
+
+    #: Time spent computing the shape since the last evaluation (in s).
+    _shape_time = Float()
+
+    def _definition(self):
+        """ Summarize all the parameters on which the evaluation depends.
+
+        """
+        context = self.root.context
+        shape = self.shape
+        return (self.index, pref_values(self), pref_values(self.modulation),
+                pref_values(shape) if shape else None, context,
+                context.sampling_time, context.rectify_time, context.tolerance)
+
+    def _shared_waveform_key(self, n_points, time_unit):
+        """ Key identifying the waveform in the cache shared by all pulses.
+
+        Returns None if the waveform should not be shared.
+
+        """
+        if self.kind == 'Logical':
+            return ('Logical', n_points)
+
+        shape = self.shape
+        shape_key = shape.cache_key()
+        if shape_key is None:
+            return None
+
+        mod_key = self.modulation.cache_key()
+        if mod_key or not shape.translation_invariant:
+            times = (self.start, self.stop)
+        else:
+            times = None
+        return ('Analogical', n_points, time_unit, times, mod_key, type(shape),
+                shape_key)
+
     def _answer(self, members, callables):
         """ Collect the answers for the walk method.
 
@@ -158,10 +264,32 @@ class Pulse(Item):
         """
         context = self.root.context
         n_points = context.len_sample(self.duration)
-        if self.kind == 'Analogical':
-            time = np.linspace(self.start, self.stop, n_points, False)
-            mod = self.modulation.compute(time, context.time_unit)
-            shape = self.shape.compute(time, context.time_unit)
-            return mod*shape
-        else:
-            return np.ones(n_points, dtype=np.int8)
+        key = (self.start, self.stop, n_points, context.time_unit)
+        cache = self._waveform_cache
+        if cache is not None and cache[0] == key:
+            return cache[1]
+
+        shared_key = self._shared_waveform_key(n_points, context.time_unit)
+        waveform = None
+        if shared_key is not None:
+            waveform = WAVEFORM_CACHE.get(shared_key)
+
+        if waveform is None:
+            if self.kind == 'Analogical':
+                time = np.linspace(self.start, self.stop, n_points, False)
+                mod = self.modulation.compute(time, context.time_unit)
+                tic = default_timer()
+                shape = self.shape.compute(time, context.time_unit)
+                self._shape_time += default_timer() - tic
+                waveform = mod*shape
+            else:
+                waveform = np.ones(n_points, dtype=np.int8)
+
+            # The waveform is shared between compilations and pulses so
+            # protect it.
+            waveform.flags.writeable = False
+            if shared_key is not None:
+                WAVEFORM_CACHE.put(shared_key, waveform)
+
+        self._waveform_cache = (key, waveform)
+        return waveform
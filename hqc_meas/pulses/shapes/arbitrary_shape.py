@@ -4,11 +4,14 @@
 # author : Matthieu Dartiailh
 # license : MIT license
 # =============================================================================
-from atom.api import (Str, Callable)
+from atom.api import (Str, Bool, Enum, Value)
+from collections import OrderedDict
+from threading import Lock
 from traceback import format_exc
+from math import pi
 import numpy as np
 
-from ..entry_eval import exec_entry
+from ..entry_eval import compile_entry, entry_globals
 from .base_shapes import AbstractShape
 
 
@@ -16,14 +19,115 @@ DEFAULT_FORMULA = \
 '''def c(self, time, unit):
     return 0.5*np.ones(len(time))'''
 
+#: Namespace available to the formulas in 'Expression' mode : the numpy
+#: ufuncs and a few constants only.
+UFUNC_NAMESPACE = {name: obj for name, obj in vars(np).items()
+                   if isinstance(obj, np.ufunc)}
+UFUNC_NAMESPACE.update({'pi': pi, 'Pi': pi, 'e': np.e,
+                        '__builtins__': {}})
+
+#: Maximal number of compiled shape functions kept in the cache.
+MAX_CACHED_FUNCTIONS = 256
+
+#: Size of the chunks used when validating the computed shapes.
+VALIDATION_CHUNK = 2**14
+
+_FUNCTIONS = OrderedDict()
+
+_FUNCTIONS_LOCK = Lock()
+
+
+def build_shape_function(formula, mode, values):
+    """ Build the function computing a shape from its formula.
+
+    The functions are cached so that a formula is executed only once for a
+    given set of values of the variables it references.
+
+    Parameters
+    ----------
+    formula : str
+        Formula of the shape.
+
+    mode : {'Function', 'Expression'}
+        Kind of formula.
+
+    values : tuple
+        Values of the variables referenced by the formula.
+
+    Returns
+    -------
+    function : callable
+        Function taking the shape, the times and the time unit as arguments.
+
+    """
+    key = (formula, mode, values)
+    try:
+        with _FUNCTIONS_LOCK:
+            function = _FUNCTIONS.pop(key)
+            _FUNCTIONS[key] = function
+        return function
+    except KeyError:
+        hashable = True
+    except TypeError:
+        # Arrays or other unhashable values, the function cannot be cached.
+        hashable = False
+
+    tokens = {'_a{}'.format(i): v for i, v in enumerate(values)}
+    if mode == 'Function':
+        code, _ = compile_entry(formula)
+        namespace = entry_globals()
+        namespace.update(tokens)
+        exec code in namespace
+        function = namespace['c']
+    else:
+        code, _ = compile_entry(formula, 'eval')
+        namespace = dict(UFUNC_NAMESPACE)
+        namespace.update(tokens)
+
+        def function(shape, time, unit):
+            return eval(code, namespace, {'time': time, 'unit': unit})
+
+    if hashable:
+        with _FUNCTIONS_LOCK:
+            _FUNCTIONS[key] = function
+            while len(_FUNCTIONS) > MAX_CACHED_FUNCTIONS:
+                _FUNCTIONS.popitem(last=False)
+    return function
+
+
+def check_amplitude(shape):
+    """ Check that the absolute value of a shape is strictly smaller than 1.
+
+    The array is processed by chunks so that the absolute value and the
+    maximum are computed in a single pass over the memory.
+
+    """
+    shape = np.asarray(shape).ravel()
+    scratch = np.empty(min(len(shape), VALIDATION_CHUNK))
+    peaks = []
+    for i in xrange(0, len(shape), VALIDATION_CHUNK):
+        chunk = shape[i:i+VALIDATION_CHUNK]
+        out = scratch[:len(chunk)]
+        np.absolute(chunk, out)
+        peaks.append(out.max())
+
+    # NaN compare as False and are rejected too.
+    if peaks and not np.max(peaks) < 1.0:
+        raise ValueError('The amplitude of an arbitrary shape must be '
+                         'strictly between -1 and 1.')
+
 
 class ArbitraryShape(AbstractShape):
     """ Shape defined entirely by the user.
 
     """
-    #: Formula used to compute the shape of the pulse. It is compiled as
-    #: a function using exec which must be of the following signature:
-    #: c(self, time, unit) and return the pulse amplitude as a numpy array.
+    #: Formula used to compute the shape of the pulse.
+    #: In 'Function' mode, it is compiled as a function using exec which must
+    #: be of the following signature: c(self, time, unit) and return the
+    #: pulse amplitude as a numpy array.
+    #: In 'Expression' mode, it is an expression of time and unit which can
+    #: only use the numpy ufuncs (sin, exp, ...) and is evaluated directly on
+    #: the arrays.
     #: 'time' is a numpy array which represents the times at which to compute
     #: the pulse
     #: 'unit' is the unit in which the time is expressed.
@@ -31,6 +135,12 @@ class ArbitraryShape(AbstractShape):
     #: (using the {} notation).
     formula = Str(DEFAULT_FORMULA).tag(pref=True)
 
+    #: Kind of formula.
+    mode = Enum('Function', 'Expression').tag(pref=True)
+
+    #: Whether to check that the computed amplitude is between -1 and 1.
+    validate = Bool(True).tag(pref=True)
+
     def eval_entries(self, sequence_locals, missing, errors, index):
         """ Evaluate the amplitude of the pulse.
 
@@ -83,28 +193,56 @@ class ArbitraryShape(AbstractShape):
 
         """
         shape = self._shape_factory(self, time, unit)
-        assert np.max(shape) < 1.0
-        assert np.min(shape) > -1.0
+        if np.shape(shape) != np.shape(time):
+            # Expressions not depending on the time give a scalar.
+            shape = shape*np.ones(len(time))
+        if self.validate:
+            check_amplitude(shape)
         return shape
 
     def build_compute_function(self, sequence_locals, missing):
         """Build the compute function from the formula.
 
         """
+        mode = 'exec' if self.mode == 'Function' else 'eval'
+        try:
+            _, names = compile_entry(self.formula, mode)
+        except Exception:
+            return False, {'exec_error': format_exc(limit=1)}
+
+        unknown = [name for name in names if name not in sequence_locals]
+        if unknown:
+            missing.update(unknown)
+            return False, {}
+
+        values = tuple(sequence_locals[name] for name in names)
         try:
-            loc = exec_entry(self.formula, sequence_locals, missing)
-            if not loc:
-                return False, {}
-            self._shape_factory = loc['c']
+            self._shape_factory = build_shape_function(self.formula,
+                                                       self.mode, values)
         except Exception:
             return False, {'exec_error': format_exc(limit=1)}
 
+        self._key = (self.formula, self.mode, values)
         return True, {}
 
+    def cache_key(self):
+        """ Identify the shape by its formula and the values it references.
+
+        """
+        key = self._key + (self.validate,)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
     # --- Private API ---------------------------------------------------------
 
     #: Runtime build shape computer.
-    _shape_factory = Callable()
+    _shape_factory = Value()
+
+    #: Formula, mode and values used to build the shape computer.
+    _key = Value(())
 
 
 SHAPES = [ArbitraryShape]
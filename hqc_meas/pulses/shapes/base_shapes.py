@@ -17,6 +17,10 @@ class AbstractShape(HasPrefAtom):
 
     shape_class = Str().tag(pref=True)
 
+    #: Whether the computed values only depend on the number of points and not
+    #: on the absolute times at which the shape is computed.
+    translation_invariant = False
+
     def eval_entries(self, sequence_locals, missing, errors, index):
         """ Evaluate the entries defining the shape.
 
@@ -62,6 +66,19 @@ class AbstractShape(HasPrefAtom):
         """
         raise NotImplementedError('')
 
+    def cache_key(self):
+        """ Identify the values computed by the shape.
+
+        Returns
+        -------
+        key : tuple or None
+            Evaluated parameters of the shape, two shapes of the same class
+            with the same key must compute the same values. None if the
+            computed values should not be shared with other pulses.
+
+        """
+        return None
+
     def _default_shape_class(self):
         return type(self).__name__
 
@@ -81,6 +98,8 @@ class SquareShape(AbstractShape):
 
     amplitude = Str('1.0').tag(pref=True)
 
+    translation_invariant = True
+
     def eval_entries(self, sequence_locals, missing, errors, index):
         """ Evaluate the amplitude of the pulse.
 
@@ -139,6 +158,12 @@ class SquareShape(AbstractShape):
         """
         return self._amplitude*np.ones(len(time))
 
+    def cache_key(self):
+        """ Identify the shape by its amplitude.
+
+        """
+        return (self._amplitude,)
+
     # --- Private API ---------------------------------------------------------
 
     _amplitude = FloatRange(-1.0, 1.0, 1.0)
@@ -215,6 +240,12 @@ class GaussianShape(AbstractShape):
         """
         return self._amplitude*np.exp(-np.square(time-(time[0]+time[-1])/2)/(2*self._width**2))
 
+    def cache_key(self):
+        """ Identify the shape by its amplitude and width.
+
+        """
+        return (self._amplitude, self._width)
+
     # --- Private API ---------------------------------------------------------
 
     _amplitude = FloatRange(-1.0, 1.0, 1.0)
@@ -297,6 +328,12 @@ class GaussianEdgeShape(AbstractShape):
         
         return self._amplitude*out
 
+    def cache_key(self):
+        """ Identify the shape by its amplitude and edge width.
+
+        """
+        return (self._amplitude, self._edge_width)
+
     # --- Private API ---------------------------------------------------------
 
     _amplitude = FloatRange(-1.0, 1.0, 1.0)
@@ -138,6 +138,21 @@ class Modulation(HasPrefAtom):
         else:
             return np.cos(unit_corr*self._frequency*time + phase)
 
+    def cache_key(self):
+        """ Identify the values computed by the modulation.
+
+        Returns
+        -------
+        key : tuple
+            Evaluated parameters of the modulation, empty if the modulation is
+            not activated (in which case it does not depend on the time).
+
+        """
+        if not self.activated:
+            return ()
+        return (self.kind, self._frequency, self.frequency_unit, self._phase,
+                self.phase_unit)
+
     # --- Private API ---------------------------------------------------------
 
     _frequency = Float()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : pulses/waveform_cache.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Cache of the waveforms computed by the pulses.
+
+Identical pulses are common in a sequence (the same pi pulse repeated, gates
+differing only by their start time, ...) and between the compilations of a
+loop. The pulses identify their waveform by the evaluated parameters of their
+modulation and shape, their number of points and the time unit, plus their
+start and stop when the waveform depends on the absolute time. Pulses sharing
+the same key share the same read-only array.
+
+"""
+from collections import OrderedDict
+from threading import Lock
+
+
+#: Default maximal size of the cache in bytes.
+DEFAULT_MAX_BYTES = 256*2**20
+
+
+class WaveformCache(object):
+    """ Least recently used cache of arrays bounded by their total size.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximal total size of the cached arrays in bytes. 0 disables the
+        caching.
+
+    Attributes
+    ----------
+    nbytes : int
+        Total size of the cached arrays.
+
+    hits : int
+        Number of lookups which found an array.
+
+    misses : int
+        Number of lookups which did not find an array.
+
+    evictions : int
+        Number of arrays removed to make room for new ones.
+
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._arrays = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """ Get the array stored under a key or None if it is not cached.
+
+        """
+        with self._lock:
+            array = self._arrays.pop(key, None)
+            if array is None:
+                self.misses += 1
+                return None
+            # Reinsert the array to mark it as the most recently used.
+            self._arrays[key] = array
+            self.hits += 1
+            return array
+
+    def put(self, key, array):
+        """ Store an array, evicting the least recently used ones if needed.
+
+        Arrays larger than the cache are not stored.
+
+        """
+        nbytes = array.nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._arrays.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._arrays[key] = array
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._arrays.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """ Empty the cache and reset the counters.
+
+        """
+        with self._lock:
+            self._arrays.clear()
+            self.nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._arrays)
+
+
+#: Cache shared by all the pulses.
+WAVEFORM_CACHE = WaveformCache()
@@ -21,7 +21,7 @@ from ..utils.atom_util import member_from_str, tagged_members
 from .tools.task_database import TaskDatabase
 from .tools.task_decorator import (make_parallel, make_wait, make_stoppable,
                                    smooth_crash)
-from .tools.string_evaluation import safe_eval
+from .tools.string_evaluation import safe_eval, compile_eval
 from .tools.shared_resources import SharedDict, SharedCounter
 
 
@@ -287,9 +287,9 @@ class BaseTask(Atom):
         """
         # If a cache evaluation of the string already exists use it.
         if string in self._eval_cache:
-            preformatted, ids = self._eval_cache[string]
+            evaluator, ids = self._eval_cache[string]
             vals = self.task_database.get_values_by_index(ids, PREFIX)
-            return safe_eval(preformatted, vals)
+            return evaluator(vals)
 
         # Otherwise if we are in running mode build a cache evaluation.
         elif self.task_database.running:
@@ -311,12 +311,15 @@ class BaseTask(Atom):
                         str_to_eval += elements[i]
 
                 indexes = database_indexes.values()
-                self._eval_cache[string] = (str_to_eval, indexes)
+                names = [PREFIX + str(i) for i in indexes]
+                evaluator = compile_eval(str_to_eval, names)
+                self._eval_cache[string] = (evaluator, indexes)
                 vals = self.task_database.get_values_by_index(indexes, PREFIX)
-                return safe_eval(str_to_eval, vals)
+                return evaluator(vals)
             else:
-                self._eval_cache[string] = (string, [])
-                return safe_eval(string)
+                evaluator = compile_eval(string)
+                self._eval_cache[string] = (evaluator, [])
+                return evaluator()
 
         # In edition mode simply perfom the evaluation as execution time is not
         # critical.
@@ -343,14 +346,29 @@ class BaseTask(Atom):
             else:
                 return safe_eval(string)
 
+    def clean_runtime_state(self):
+        """ Reset the state accumulated by the task during an execution.
+
+        All the members tagged as runtime are reset to their default value,
+        and the formatting and evaluation caches are emptied. This allows to
+        perform anew a task hierarchy which has already been executed. Members
+        set when building the task (such as a pulse sequence) should not be
+        tagged.
+
+        """
+        reset_runtime_members(self)
+        self._format_cache = {}
+        self._eval_cache = {}
+
     # --- Private API ---------------------------------------------------------
 
     #: Dictionary storing in infos necessary to perform fast formatting.
     #: Only used in running mode.
     _format_cache = Dict()
 
-    #: Dictionary storing in infos necessary to perform fast evaluation.
-    #: Only used in running mode.
+    #: Dictionary storing in infos necessary to perform fast evaluation, ie
+    #: the compiled expression and the indexes of the database entries it
+    #: uses. Only used in running mode.
     _eval_cache = Dict()
 
     def _default_task_class(self):
@@ -446,6 +464,23 @@ class SimpleTask(BaseTask):
         value_name = self.task_name + '_' + name
         return self.task_database.set_value(self.task_path, value_name, value)
 
+    def write_values_in_database(self, values):
+        """ Write several values to the right database entries at once.
+
+        In running mode this is cheaper than several calls to
+        write_in_database as the database is locked and notified only once.
+
+        Parameters
+        ----------
+        values : dict
+            Mapping between the simple names of the entries (ie no task name
+            required) and the values to give them.
+
+        """
+        prefix = self.task_name + '_'
+        named = {prefix + name: value for name, value in values.iteritems()}
+        return self.task_database.set_values(self.task_path, named)
+
     def get_from_database(self, full_name):
         """ Access to a database value using full name.
 
@@ -459,6 +494,24 @@ class SimpleTask(BaseTask):
         """
         return self.task_database.get_value(self.task_path, full_name)
 
+    def get_values_from_database(self, full_names):
+        """ Access to several database values using full names.
+
+        Parameters
+        ----------
+        full_names : iterable(str)
+            Full names of the database entries, ie task_name + '_' + entry,
+            where task_name is the name of the task that wrote the value in
+            the database.
+
+        Returns
+        -------
+        values : list
+            Values of the entries in the same order as the names.
+
+        """
+        return self.task_database.get_values(self.task_path, full_names)
+
     def remove_from_database(self, full_name):
         """ Delete a database entry using its full name.
 
@@ -616,6 +669,15 @@ class ComplexTask(BaseTask):
 
         return answer
 
+    def clean_runtime_state(self):
+        """ Reset the state accumulated by the task and all its children during
+        an execution.
+
+        """
+        super(ComplexTask, self).clean_runtime_state()
+        for child in self._gather_children_task():
+            child.clean_runtime_state()
+
     def write_in_database(self, name, value):
         """ Write a value to the right database entry.
 
@@ -636,6 +698,23 @@ class ComplexTask(BaseTask):
         value_name = self.task_name + '_' + name
         return self.task_database.set_value(self.task_path, value_name, value)
 
+    def write_values_in_database(self, values):
+        """ Write several values to the right database entries at once.
+
+        In running mode this is cheaper than several calls to
+        write_in_database as the database is locked and notified only once.
+
+        Parameters
+        ----------
+        values : dict
+            Mapping between the simple names of the entries (ie no task name
+            required) and the values to give them.
+
+        """
+        prefix = self.task_name + '_'
+        named = {prefix + name: value for name, value in values.iteritems()}
+        return self.task_database.set_values(self.task_path, named)
+
     def get_from_database(self, full_name):
         """ Access to a database value using full name.
 
@@ -649,6 +728,24 @@ class ComplexTask(BaseTask):
         """
         return self.task_database.get_value(self.task_path, full_name)
 
+    def get_values_from_database(self, full_names):
+        """ Access to several database values using full names.
+
+        Parameters
+        ----------
+        full_names : iterable(str)
+            Full names of the database entries, ie task_name + '_' + entry,
+            where task_name is the name of the task that wrote the value in
+            the database.
+
+        Returns
+        -------
+        values : list
+            Values of the entries in the same order as the names.
+
+        """
+        return self.task_database.get_values(self.task_path, full_names)
+
     def remove_from_database(self, full_name):
         """ Delete a database entry using its full name.
 
@@ -1312,27 +1409,33 @@ class RootTask(ComplexTask):
 
     #: Inter-Thread event signaling the main thread is done, handling the
     #: measure resuming.
-    resume = Value()
+    resume = Value().tag(runtime=True)
 
     #: Dict like object used to store references to all running threads.
     #: Keys are pools ids, values list of threads. Keys are never deleted.
-    threads = Typed(SharedDict, (list,))
+    threads = Typed(SharedDict, (list,)).tag(runtime=True)
 
     #: Dict like object used to store references to used instruments.
     #: Keys are instrument profile names, values instr instance. Keys are never
     #: deleted.
-    instrs = Typed(SharedDict, ())
+    instrs = Typed(SharedDict, ()).tag(runtime=True)
+
+    #: Pool keeping the instruments connected between measures (set by the
+    #: measure process). If None the instruments are closed at the end of the
+    #: measure.
+    session_pool = Value()
 
     #: Dict like object used to store file handle.
     #: Keys are file handle id as defined by the first user of the file.
     #: Keys can be deleted.
-    files = Typed(SharedDict, ())
+    files = Typed(SharedDict, ()).tag(runtime=True)
 
     #: Counter keeping track of the active threads.
-    active_threads_counter = Typed(SharedCounter, kwargs={'count': 1})
+    active_threads_counter = Typed(SharedCounter,
+                                   kwargs={'count': 1}).tag(runtime=True)
 
     #: Counter keeping track of the paused threads.
-    paused_threads_counter = Typed(SharedCounter, ())
+    paused_threads_counter = Typed(SharedCounter, ()).tag(runtime=True)
 
     # Setting default values for the root task.
     has_root = set_default(True)
@@ -1388,11 +1491,19 @@ class RootTask(ComplexTask):
                             mes = 'Failed to close join thread:'
                             log.exception(mes)
 
-            # Close connection to all instruments.
+            # Give back the instruments to the session pool or close the
+            # connections. If the measure did not complete the state of the
+            # instruments is unknown.
             instrs = self.instrs
+            pool = self.session_pool
+            valid = not self.should_stop.is_set()
             for instr_profile in instrs:
                 try:
-                    instrs[instr_profile].close_connection()
+                    if pool is not None:
+                        pool.release(instr_profile, instrs[instr_profile],
+                                     valid)
+                    else:
+                        instrs[instr_profile].close_connection()
                 except Exception:
                     log = logging.getLogger(__name__)
                     mes = 'Failed to close connection to instr:'
@@ -1490,6 +1601,19 @@ class RootTask(ComplexTask):
     def _default_resume(self):
         return tEvent()
 
+
+def reset_runtime_members(obj):
+    """ Reset to their default value the members storing runtime state.
+
+    Parameters
+    ----------
+    obj : Atom
+        Object whose members tagged as runtime should be reset.
+
+    """
+    for name in tagged_members(obj, 'runtime'):
+        delattr(obj, name)
+
 KNOWN_PY_TASKS = [ComplexTask]
 
 TASK_PACKAGES = ['tasks_util', 'tasks_logic']
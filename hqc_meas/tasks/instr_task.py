@@ -29,7 +29,7 @@ class InstrumentTask(SimpleTask):
     selected_driver = Str().tag(pref=True)
 
     #: Instance of instrument driver.
-    driver = Instance(BaseInstrument)
+    driver = Instance(BaseInstrument).tag(runtime=True)
 
     def check(self, *args, **kwargs):
         """
@@ -56,6 +56,12 @@ class InstrumentTask(SimpleTask):
             return False, traceback
 
         if kwargs.get('test_instr') and config:
+            # No need to test the connection if the measure process kept one
+            # open.
+            pool = self.root_task.session_pool
+            if pool is not None and pool.has_session(self.selected_profile,
+                                                     driver_class, config):
+                return True, traceback
             try:
                 instr = driver_class(config)
                 instr.close_connection()
@@ -70,15 +76,23 @@ class InstrumentTask(SimpleTask):
     def start_driver(self):
         """ Create an instance of the instrument driver and connect it.
 
+        If the measure process keeps the instruments connected between
+        measures, the driver is taken from its session pool.
+
         """
-        run_time = self.root_task.run_time
-        instrs = self.root_task.instrs
+        root = self.root_task
+        run_time = root.run_time
+        instrs = root.instrs
         if self.selected_profile in instrs:
             self.driver = instrs[self.selected_profile]
         else:
             config = run_time['profiles'][self.selected_profile]
             driver_class = run_time['drivers'][self.selected_driver]
-            self.driver = driver_class(config)
+            if root.session_pool is not None:
+                self.driver = root.session_pool.acquire(self.selected_profile,
+                                                        driver_class, config)
+            else:
+                self.driver = driver_class(config)
             instrs[self.selected_profile] = self.driver
 
     def stop_driver(self):
@@ -9,7 +9,7 @@
 from atom.api import Atom, ForwardInstance, Instance, Str, Dict
 
 from hqc_meas.utils.atom_util import HasPrefAtom
-from hqc_meas.tasks.base_tasks import BaseTask
+from hqc_meas.tasks.base_tasks import BaseTask, reset_runtime_members
 
 
 class InterfaceableTaskMixin(Atom):
@@ -105,6 +105,18 @@ class InterfaceableTaskMixin(Atom):
             answers.update(interface_answers)
         return answers
 
+    def clean_runtime_state(self):
+        """ Reset the state accumulated by the task and its interface during an
+        execution.
+
+        """
+        ancestors = type(self).mro()
+        i = ancestors.index(InterfaceableTaskMixin)
+        ancestors[i + 1].clean_runtime_state(self)
+
+        if self.interface:
+            self.interface.clean_runtime_state()
+
     def register_preferences(self):
         """ Register the task preferences into the preferences system.
 
@@ -212,6 +224,14 @@ class TaskInterface(HasPrefAtom):
         """
         raise NotImplementedError()
 
+    def clean_runtime_state(self):
+        """ Reset the state accumulated by the interface during an execution.
+
+        See BaseTask.clean_runtime_state.
+
+        """
+        reset_runtime_members(self)
+
     def answer(self, members, callables):
         """ Method used by to retrieve information about a task.
 
@@ -254,3 +274,4 @@ class TaskInterface(HasPrefAtom):
 
         """
         return type(self).__name__
+
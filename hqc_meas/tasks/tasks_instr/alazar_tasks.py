@@ -7,7 +7,7 @@
 """
 
 """
-from atom.api import (Str, Bool, Enum, set_default)
+from atom.api import (Str, Bool, Enum, Int, set_default)
 from inspect import cleandoc
 import numpy as np
 
@@ -53,6 +53,10 @@ class DemodAlazarTask(InstrumentTask):
     trigrange = Enum('2.5V','5V').tag(pref=True)
 
     triglevel = Str('0.3').tag(pref=True)
+
+    #: Number of threads processing the buffers while the next ones are
+    #: acquired (Alazar935x only). 0 processes them one after the other.
+    workers = Int(0).tag(pref=True)
     
     parallel = set_default({'activated': False, 'pool': 'acq'})
 
@@ -138,6 +142,11 @@ class DemodAlazarTask(InstrumentTask):
                 traceback[self.task_path + '/' + self.task_name + '-get_demod'] = \
                    cleandoc('''The "IQ time step" does not cover an integer number of demodulation periods.''')
 
+        if self.workers and self.selected_driver != 'Alazar935x':
+            test = False
+            traceback[self.task_path + '/' + self.task_name + '-workers'] = \
+                cleandoc('''Processing threads are only supported by the Alazar935x driver.''')
+
         return test, traceback
 
     def perform(self):
@@ -201,10 +210,13 @@ class DemodAlazarTask(InstrumentTask):
         freqB = self.format_string(self.freqB, 10**6, NdemodB)
         freq = freqA + freqB
 
+        # Only the Alazar935x driver accepts the workers argument.
+        kwargs = {'workers': self.workers} if self.workers else {}
         answerDemod, answerTrace = self.driver.get_demod(startaftertrig, duration,
                                        recordsPerCapture, recordsPerBuffer,
                                        timestep, freq, self.average,
-                                       NdemodA, NdemodB, NtraceA, NtraceB)
+                                       NdemodA, NdemodB, NtraceA, NtraceB,
+                                       **kwargs)
 
         self.write_in_database('Demod', answerDemod)
         self.write_in_database('Trace', answerTrace)
@@ -47,8 +47,7 @@ class LockInMeasureTask(InstrumentTask):
             self.write_in_database('y', value)
         elif self.mode == 'X&Y':
             value_x, value_y = self.driver.read_xy()
-            self.write_in_database('x', value_x)
-            self.write_in_database('y', value_y)
+            self.write_values_in_database({'x': value_x, 'y': value_y})
         elif self.mode == 'Amp':
             value = self.driver.read_amplitude()
             self.write_in_database('amplitude', value)
@@ -57,8 +56,8 @@ class LockInMeasureTask(InstrumentTask):
             self.write_in_database('phase', value)
         elif self.mode == 'Amp&Phase':
             amplitude, phase = self.driver.read_amp_and_phase()
-            self.write_in_database('amplitude', amplitude)
-            self.write_in_database('phase', phase)
+            self.write_values_in_database({'amplitude': amplitude,
+                                           'phase': phase})
 
     def _observe_mode(self, change):
         """ Update the database entries acording to the mode.
@@ -70,7 +70,7 @@ class PNASetRFFrequencyInterface(InstrTaskInterface):
     channel = Int(1).tag(pref=True)
 
     # Driver for the channel.
-    channel_driver = Value()
+    channel_driver = Value().tag(runtime=True)
 
     driver_list = ['AgilentPNA','RhodeandSchwarzVNA','KeysightENA']
 
@@ -110,7 +110,7 @@ class PNASetRFPowerInterface(InstrTaskInterface):
     channel = Int(1).tag(pref=True)
 
     # Driver for the channel.
-    channel_driver = Value()
+    channel_driver = Value().tag(runtime=True)
 
     # Port whose output power should be set.
     port = Int(1).tag(pref=True)
@@ -156,7 +156,7 @@ class SingleChannelPNATask(InstrumentTask):
     # Id of the channel to use.
     channel = Int(1).tag(pref=True)
 
-    channel_driver = Value()
+    channel_driver = Value().tag(runtime=True)
 
     def check(self, *args, **kwargs):
         """ Add checking for channels to the base tests.
@@ -358,16 +358,18 @@ class PNASweepTask(SingleChannelPNATask):
             points = self.format_and_eval_string(self.points)
         else:
             points = len(current_Xaxis)
-        if self.sweep_type:
-            self.channel_driver.prepare_sweep(self.sweep_type.upper(), start,
-                                              stop, points)
-        else:
-            if self.channel_driver.sweep_type.upper() == 'LIN':
-                self.channel_driver.prepare_sweep('FREQUENCY',
-                                                  start, stop, points)
-            elif self.channel_driver.sweep_type.upper() == 'POW':
-                 self.channel_driver.prepare_sweep('POWER',
+        # Send the sweep settings at once and check them afterwards.
+        with self.driver.batch():
+            if self.sweep_type:
+                self.channel_driver.prepare_sweep(self.sweep_type.upper(),
                                                   start, stop, points)
+            else:
+                if self.channel_driver.sweep_type.upper() == 'LIN':
+                    self.channel_driver.prepare_sweep('FREQUENCY',
+                                                      start, stop, points)
+                elif self.channel_driver.sweep_type.upper() == 'POW':
+                    self.channel_driver.prepare_sweep('POWER',
+                                                      start, stop, points)
 
         waiting_time = self.channel_driver.sweep_time
         self.driver.fire_trigger(self.channel)
@@ -118,46 +118,48 @@ class PSASetParam(InstrumentTask):
         if self.driver.owner != self.task_name:
             self.driver.owner = self.task_name
 
-        if self.mode == 'Start/Stop':
-            if self.start_freq:
-                self.driver.start_frequency_SA = \
-                    self.format_and_eval_string(self.start_freq)
-
-            if self.stop_freq:
-                self.driver.stop_frequency_SA = \
-                    self.format_and_eval_string(self.stop_freq)
-
-            # start_freq is set again in case the former value of stop
-            # prevented to do it
-            if self.start_freq:
-                self.driver.start_frequency_SA = \
-                    self.format_and_eval_string(self.start_freq)
-        else:
-            if self.center_freq:
-                self.driver.center_frequency = \
-                    self.format_and_eval_string(self.center_freq)
+        # Send all the settings at once and check them afterwards.
+        with self.driver.batch():
+            if self.mode == 'Start/Stop':
+                if self.start_freq:
+                    self.driver.start_frequency_SA = \
+                        self.format_and_eval_string(self.start_freq)
+
+                if self.stop_freq:
+                    self.driver.stop_frequency_SA = \
+                        self.format_and_eval_string(self.stop_freq)
+
+                # start_freq is set again in case the former value of stop
+                # prevented to do it
+                if self.start_freq:
+                    self.driver.start_frequency_SA = \
+                        self.format_and_eval_string(self.start_freq)
+            else:
+                if self.center_freq:
+                    self.driver.center_frequency = \
+                        self.format_and_eval_string(self.center_freq)
 
-            if self.span_freq:
-                self.driver.span_frequency = \
-                    self.format_and_eval_string(self.span_freq)
+                if self.span_freq:
+                    self.driver.span_frequency = \
+                        self.format_and_eval_string(self.span_freq)
 
-            # center_freq is set again in case the former value of span
-            # prevented to do it
-            if self.center_freq:
-                self.driver.center_frequency = \
-                    self.format_and_eval_string(self.center_freq)
+                # center_freq is set again in case the former value of span
+                # prevented to do it
+                if self.center_freq:
+                    self.driver.center_frequency = \
+                        self.format_and_eval_string(self.center_freq)
 
-        if self.average_nb:
-            self.driver.average_count_SA = \
-                self.format_and_eval_string(self.average_nb)
+            if self.average_nb:
+                self.driver.average_count_SA = \
+                    self.format_and_eval_string(self.average_nb)
 
-        if self.resolution_bandwidth:
-            self.driver.RBW = \
-                self.format_and_eval_string(self.resolution_bandwidth)
+            if self.resolution_bandwidth:
+                self.driver.RBW = \
+                    self.format_and_eval_string(self.resolution_bandwidth)
 
-        if self.video_bandwidth:
-            self.driver.VBW_SA = \
-                self.format_and_eval_string(self.video_bandwidth)
+            if self.video_bandwidth:
+                self.driver.VBW_SA = \
+                    self.format_and_eval_string(self.video_bandwidth)
 
         sweep_modes = {'SA': 'Spectrum Analyzer',
                        'SPEC': 'Basic Spectrum Analyzer',
@@ -170,7 +172,7 @@ class PSASetParam(InstrumentTask):
                      {}'''.format(d.start_frequency_SA, d.stop_frequency_SA,
                                   d.span_frequency, d.center_frequency,
                                   d.average_count_SA, d.RBW, d.VBW_SA,
-                                  d.sweep_points_SA, sweep_modes[self.mode])
+                                  d.sweep_points_SA, sweep_modes[d.mode])
 
         self.write_in_database('psa_config', psa_config)
 
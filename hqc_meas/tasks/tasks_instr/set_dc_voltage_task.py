@@ -147,7 +147,7 @@ class MultiChannelVoltageSourceInterface(InstrTaskInterface):
     channel = Int(1).tag(pref=True)
 
     #: Reference to the driver for the channel.
-    channel_driver = Value()
+    channel_driver = Value().tag(runtime=True)
 
     def perform(self, value=None):
         """
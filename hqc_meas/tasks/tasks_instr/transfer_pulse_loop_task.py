@@ -8,7 +8,10 @@
 """
 from traceback import format_exc
 from inspect import cleandoc
-from atom.api import (Value, Str, Bool, Unicode, Dict, set_default)
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from threading import local
+from atom.api import (Value, Str, Bool, Unicode, Dict, Int, set_default)
 import numpy as np
 
 from hqc_meas.tasks.api import (InstrumentTask, InterfaceableTaskMixin,
@@ -39,6 +42,14 @@ class TransferPulseLoopTask(InterfaceableTaskMixin, InstrumentTask):
     loop_stop = Str('1').tag(pref=True)
 
     loop_points = Str('1').tag(pref=True)
+
+    #: Number of threads used to compile the loop points. 0 compiles them
+    #: in the measure thread, one after the other, as they are transferred.
+    compile_workers = Int(0).tag(pref=True)
+
+    #: Maximal number of compiled loop points waiting to be transferred (or
+    #: being compiled) when using workers. Bounds the memory used.
+    compile_window = Int(4).tag(pref=True)
       
     def intricate_loops(self, var_count, variables):
         loop_points = np.array(self.format_and_eval_string(self.loop_points))
@@ -99,6 +110,11 @@ class TransferPulseLoopTask(InterfaceableTaskMixin, InstrumentTask):
             else:
                 test = False
                 traceback[err_path+'seq'] = 'No interface or sequence'
+
+        if self.compile_workers and self.compile_window < 1:
+            test = False
+            traceback[err_path+'window'] = \
+                'The compilation window must be at least 1.'
     
         return test, traceback
 
@@ -106,6 +122,14 @@ class TransferPulseLoopTask(InterfaceableTaskMixin, InstrumentTask):
         """Compile the sequence.
 
         """
+        self.sequence.external_vars.update(self.loop_vars(loop_names, value))
+        return self.sequence.compile_loop()
+
+    def loop_vars(self, loop_names, value):
+        """Evaluate the external variables of the sequence for a loop point.
+
+        """
+        external_vars = {}
         for k, v in self.sequence_vars.items():
             if np.size(value) == 1:
                 if loop_names[0] in v:
@@ -115,8 +139,61 @@ class TransferPulseLoopTask(InterfaceableTaskMixin, InstrumentTask):
                     if loop_names[p] in v:
                         v = v.replace(loop_names[p], value[p])
                         
-            self.sequence.external_vars[k] = self.format_and_eval_string(v)
-        return self.sequence.compile_loop()
+            external_vars[k] = self.format_and_eval_string(v)
+        return external_vars
+
+    def iter_compiled_loops(self, loop_names, variables):
+        """Compile the sequence for each loop point.
+
+        When compile_workers is non zero the points are compiled in a pool of
+        threads, each one working on its own copy of the sequence. The
+        results are yielded in the order of the points, as soon as they are
+        available, so that the transfer of a point overlaps the compilation of
+        the next ones. At most compile_window points are compiled in advance,
+        hence at most min(compile_window, compile_workers) are compiled at the
+        same time.
+
+        Parameters
+        ----------
+        loop_names : list(str)
+            Names of the loop variables.
+
+        variables : np.ndarray
+            Values of the loop variables, one row per point.
+
+        Returns
+        -------
+        results : generator
+            Generator yielding the results of compile_loop for each point.
+
+        """
+        if not self.compile_workers or self._pulses_dependencies is None:
+            for value in variables:
+                yield self.compile_loop(loop_names, value)
+            return
+
+        config = self.sequence.preferences_from_members()
+        config['external_vars'] = \
+            repr(dict.fromkeys(self.sequence.external_vars.keys()))
+        dependencies = {'pulses': self._pulses_dependencies}
+        window = self.compile_window
+        pool = ThreadPool(min(window, self.compile_workers), _init_compiler,
+                          (config, dependencies))
+        pending = deque()
+        try:
+            for value in variables:
+                external_vars = self.loop_vars(loop_names, value)
+                pending.append(pool.apply_async(_compile_point,
+                                                (external_vars,)))
+                if len(pending) >= window:
+                    yield pending.popleft().get()
+
+            while pending:
+                yield pending.popleft().get()
+
+        finally:
+            pool.terminate()
+            pool.join()
 
     def answer(self, members, callables):
         """Overriden method to take into account the presence of the sequence.
@@ -155,6 +232,8 @@ class TransferPulseLoopTask(InterfaceableTaskMixin, InstrumentTask):
         """
         builder = cls.mro()[1].build_from_config.__func__
         task = builder(cls, config, dependencies)
+        # Kept to rebuild the sequence in the compilation workers.
+        task._pulses_dependencies = dependencies.get('pulses')
         if 'sequence_path' in config:
             path = config['sequence_path']
             builder = dependencies['pulses']['RootSequence']
@@ -170,6 +249,33 @@ class TransferPulseLoopTask(InterfaceableTaskMixin, InstrumentTask):
 
         return task
 
+    # --- Private API ---------------------------------------------------------
+
+    #: Classes and configs used to build the sequence (None if the task was
+    #: not built from a config).
+    _pulses_dependencies = Value()
+
+
+#: Sequence rebuilt in each compilation worker (stored as sequence).
+_WORKER = local()
+
+
+def _init_compiler(config, dependencies):
+    """Rebuild the sequence in a compilation worker.
+
+    """
+    builder = dependencies['pulses']['RootSequence']
+    _WORKER.sequence = builder.build_from_config(config, dependencies)
+
+
+def _compile_point(external_vars):
+    """Compile the sequence of a worker for a loop point.
+
+    """
+    sequence = _WORKER.sequence
+    sequence.external_vars.update(external_vars)
+    return sequence.compile_loop()
+
 KNOWN_PY_TASKS = [TransferPulseLoopTask]
 
 
@@ -205,34 +311,35 @@ class AWGTransferLoopInterface(InstrTaskInterface):
         variables = np.empty((Nwaveforms, np.size(loop_names)))
         variables = task.intricate_loops(0, variables)
          
-        task.driver.clear_sequence()
+        # The waveforms transferred during previous runs are still in the
+        # WLIST, the driver only sends the ones whose content is new.
+        task.driver.clear_sequence(keep_waveforms=True)
         
         current_pos = 0        
-        for i in range(0, Nwaveforms):
-            seq_name = task.format_string(self.sequence_name) if self.sequence_name else 'Sequence'
-            seq_name_iter = seq_name + '_' + str(int(i))
-            res, byteseq, repeat = task.compile_loop(loop_names, variables[i])
-            if not res:
-                mess = 'Failed to compile the pulse sequence: missing {}, errs {}'
-                raise RuntimeError(mess.format(*byteseq))
+        compiled = task.iter_compiled_loops(loop_names, variables)
+        try:
+            for i, (res, byteseq, repeat) in enumerate(compiled):
+                seq_name = task.format_string(self.sequence_name) if self.sequence_name else 'Sequence'
+                seq_name_iter = seq_name + '_' + str(int(i))
+                if not res:
+                    mess = 'Failed to compile the pulse sequence: missing {}, errs {}'
+                    raise RuntimeError(mess.format(*byteseq))
     
-            already_added = {}            
-            for ch_id in task.driver.defined_channels:
-                if ch_id in byteseq:
-                    for pos,waveform in enumerate(byteseq[ch_id]):
-                        addr = id(waveform)
-                        if addr not in already_added:
+                for ch_id in task.driver.defined_channels:
+                    if ch_id in byteseq:
+                        for pos,waveform in enumerate(byteseq[ch_id]):
                             seq_name_transfered = seq_name_iter  + '_Ch{}'.format(ch_id) +\
                                                 '_' + str(pos)
-                            task.driver.to_send(seq_name_transfered, waveform, False)
-                            already_added[addr] = seq_name_transfered
-                        else:
-                            seq_name_transfered =  already_added[addr]
-                        task.driver.set_sequence_pos(seq_name_transfered, ch_id, current_pos + pos + 1)
-                        task.driver.set_repeat(current_pos + pos + 1, repeat[pos])
-                        task.driver.set_goto_pos(current_pos + pos + 1, current_pos + pos + 2)
+                            seq_name_transfered = task.driver.upload_waveform(
+                                seq_name_transfered, waveform)
+                            task.driver.set_sequence_pos(seq_name_transfered, ch_id, current_pos + pos + 1)
+                            task.driver.set_repeat(current_pos + pos + 1, repeat[pos])
+                            task.driver.set_goto_pos(current_pos + pos + 1, current_pos + pos + 2)
         
-            current_pos += len(byteseq[task.driver.defined_channels[0]])
+                current_pos += len(byteseq[task.driver.defined_channels[0]])
+        finally:
+            # Stop the compilation workers if the transfer stopped early.
+            compiled.close()
         
         task.driver.set_goto_pos(current_pos, 1)
             
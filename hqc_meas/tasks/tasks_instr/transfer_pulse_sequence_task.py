@@ -137,7 +137,7 @@ class AWGTransferInterface(InstrTaskInterface):
     sequence_name = Str().tag(pref=True)
 
     #: Flag indicating whether or not initialisation has been performed.
-    initialized = Bool(False)
+    initialized = Bool(False).tag(runtime=True)
 
     #: Flag indicating whether the transfered sequence should be selected for
     #: execution after transfert.
@@ -91,8 +91,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
             if handle_stop_pause(root):
                 return
 
-            self.write_in_database('index', i+1)
-            self.write_in_database('value', value)
+            self.write_values_in_database({'index': i+1, 'value': value})
             try:
                 for child in self.children_task:
                     child.perform_(child)
@@ -135,8 +134,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
             if handle_stop_pause(root):
                 return
 
-            self.write_in_database('index', i+1)
-            self.write_in_database('value', value)
+            self.write_values_in_database({'index': i+1, 'value': value})
             tic = default_timer()
             try:
                 for child in self.children_task:
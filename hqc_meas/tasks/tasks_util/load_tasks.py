@@ -6,13 +6,20 @@
 # =============================================================================
 """
 """
-from atom.api import (Bool, Str, Unicode, List, set_default)
+from atom.api import (Bool, Str, Unicode, List, Int, Typed, set_default)
 import numpy as np
 from inspect import cleandoc
+from collections import OrderedDict
 import os
 
 from ..base_tasks import SimpleTask
 from ..task_interface import InterfaceableTaskMixin, TaskInterface
+from ..tools.binary_columns import load_columns, read_sidecar
+
+
+#: Maximal size (in bytes) of the data kept in the cache of a LoadArrayTask.
+#: The least recently used files are dropped first.
+FILE_CACHE_MAX_BYTES = 256*2**20
 
 
 def _make_array(names, dtypes='f8'):
@@ -39,6 +46,54 @@ class LoadArrayTask(InterfaceableTaskMixin, SimpleTask):
     task_database_entries = set_default({'array': _make_array(['var1',
                                                                'var2'])})
 
+    #: Whether to reuse the data of a file already loaded during the measure
+    #: if it was not modified since.
+    use_cache = Bool(True).tag(pref=True)
+
+    def load_file(self, full_path, loader, options=()):
+        """ Load a file, going through the cache of the measure.
+
+        The cached data are read only so that they cannot be altered by the
+        tasks using them. The cache keeps at most FILE_CACHE_MAX_BYTES of data,
+        larger files are never cached.
+
+        Parameters
+        ----------
+        full_path : unicode
+            Path of the file to load.
+
+        loader : callable
+            Function called with the path to actually load the file.
+
+        options : tuple, optional
+            Options of the loader affecting the data it returns. The cached
+            data are used only if they were loaded with the same options.
+
+        """
+        if not self.use_cache:
+            return loader(full_path)
+
+        stat = os.stat(full_path)
+        key = (stat.st_mtime, stat.st_size, options)
+        cache = self._file_cache
+        cached = cache.pop(full_path, None)
+        if cached:
+            if cached[0] == key:
+                # Reinsert the data to mark them as the most recently used.
+                cache[full_path] = cached
+                return cached[1]
+            self._cached_bytes -= cached[1].nbytes
+
+        data = loader(full_path)
+        data.flags.writeable = False
+        if data.nbytes <= FILE_CACHE_MAX_BYTES:
+            cache[full_path] = (key, data)
+            self._cached_bytes += data.nbytes
+            while self._cached_bytes > FILE_CACHE_MAX_BYTES:
+                _, (_, evicted) = cache.popitem(last=False)
+                self._cached_bytes -= evicted.nbytes
+        return data
+
     def check(self, *args, **kwargs):
         """
         """
@@ -71,10 +126,29 @@ class LoadArrayTask(InterfaceableTaskMixin, SimpleTask):
 
         return test, traceback
 
+    # --- Private API ---------------------------------------------------------
+
+    #: Data of the files loaded during the measure stored as
+    #: {path: ((mtime, size, options), data)} from the least to the most
+    #: recently used.
+    _file_cache = Typed(OrderedDict, ()).tag(runtime=True)
+
+    #: Size (in bytes) of the data stored in the cache.
+    _cached_bytes = Int().tag(runtime=True)
+
 
 KNOWN_PY_TASKS = [LoadArrayTask]
 
 
+def _loader_options(interface):
+    """ Identify the interface loading a file and its settings (used to know
+    whether cached data were loaded the same way).
+
+    """
+    prefs = interface.preferences_from_members()
+    return (type(interface).__name__,) + tuple(sorted(prefs.items()))
+
+
 class CSVLoadInterface(TaskInterface):
     """
     """
@@ -104,19 +178,9 @@ class CSVLoadInterface(TaskInterface):
         filename = task.format_string(task.filename)
         full_path = os.path.join(folder, filename)
 
-        comment_lines = 0
-        with open(full_path) as f:
-            while True:
-                if f.readline().startswith(self.comments):
-                    comment_lines += 1
-                else:
-                    break
-
-        data = np.genfromtxt(full_path, comments=self.comments,
-                             delimiter=self.delimiter, names=self.names,
-                             skip_header=comment_lines)
-
-        task.write_in_database('array', data)
+        task.write_in_database('array',
+                               task.load_file(full_path, self._load,
+                                              _loader_options(self)))
 
     def check(self, *args, **kwargs):
         """
@@ -146,6 +210,22 @@ class CSVLoadInterface(TaskInterface):
 
         return True, {}
 
+    def _load(self, full_path):
+        """ Parse the file.
+
+        """
+        comment_lines = 0
+        with open(full_path) as f:
+            while True:
+                if f.readline().startswith(self.comments):
+                    comment_lines += 1
+                else:
+                    break
+
+        return np.genfromtxt(full_path, comments=self.comments,
+                             delimiter=self.delimiter, names=self.names,
+                             skip_header=comment_lines)
+
     def _observe_c_names(self, change):
         """ Observer keeping in sync the c_names and the array in the database.
 
@@ -153,4 +233,115 @@ class CSVLoadInterface(TaskInterface):
         if change['value']:
             self.task.write_in_database('array', _make_array(change['value']))
 
-INTERFACES = {'LoadArrayTask': [CSVLoadInterface]}
+
+class BinaryLoadInterface(TaskInterface):
+    """ Load a file written by a SaveFileTask in binary format.
+
+    """
+    #: Whether to memory-map the file instead of reading it.
+    use_mmap = Bool(True).tag(pref=True)
+
+    #: Class attr used in the UI.
+    file_formats = ['Binary']
+
+    has_view = True
+
+    def perform(self):
+        """
+        """
+        task = self.task
+        folder = task.format_string(task.folder)
+        filename = task.format_string(task.filename)
+        full_path = os.path.join(folder, filename)
+
+        task.write_in_database('array',
+                               task.load_file(full_path, self._load,
+                                              _loader_options(self)))
+
+    def check(self, *args, **kwargs):
+        """
+        """
+        task = self.task
+        try:
+            full_folder_path = task.format_string(task.folder)
+            filename = task.format_string(task.filename)
+        except Exception:
+            return True, {}
+
+        full_path = os.path.join(full_folder_path, filename)
+
+        if os.path.isfile(full_path):
+            try:
+                infos = read_sidecar(full_path)
+            except Exception as e:
+                err_path = task.task_path + '/' + task.task_name
+                mess = 'Failed to read the description of the file: {}'
+                return False, {err_path + '-sidecar': mess.format(e)}
+            task.write_in_database('array', _make_array(infos['labels']))
+
+        return True, {}
+
+    def _load(self, full_path):
+        """ Load the file, memory-mapping it if requested.
+
+        """
+        return load_columns(full_path, self.use_mmap)[0]
+
+
+class NPYLoadInterface(TaskInterface):
+    """ Load an array saved in the numpy .npy format.
+
+    """
+    #: Whether to memory-map the file instead of reading it.
+    use_mmap = Bool(True).tag(pref=True)
+
+    #: Class attr used in the UI.
+    file_formats = ['NPY']
+
+    has_view = True
+
+    def perform(self):
+        """
+        """
+        task = self.task
+        folder = task.format_string(task.folder)
+        filename = task.format_string(task.filename)
+        full_path = os.path.join(folder, filename)
+
+        task.write_in_database('array',
+                               task.load_file(full_path, self._load,
+                                              _loader_options(self)))
+
+    def check(self, *args, **kwargs):
+        """
+        """
+        task = self.task
+        try:
+            full_folder_path = task.format_string(task.folder)
+            filename = task.format_string(task.filename)
+        except Exception:
+            return True, {}
+
+        full_path = os.path.join(full_folder_path, filename)
+
+        if os.path.isfile(full_path):
+            try:
+                data = np.load(full_path, mmap_mode='r')
+            except Exception as e:
+                err_path = task.task_path + '/' + task.task_name
+                mess = 'Failed to read the file: {}'
+                return False, {err_path + '-file': mess.format(e)}
+            task.write_in_database('array',
+                                   np.ones((5,) + data.shape[1:], data.dtype))
+
+        return True, {}
+
+    def _load(self, full_path):
+        """ Load the file, memory-mapping it if requested.
+
+        """
+        return np.load(full_path, mmap_mode='r' if self.use_mmap else None)
+
+
+INTERFACES = {'LoadArrayTask': [CSVLoadInterface, BinaryLoadInterface,
+                                NPYLoadInterface]}
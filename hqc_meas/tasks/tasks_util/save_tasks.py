@@ -7,15 +7,18 @@
 """
 """
 from atom.api import (Tuple, ContainerList, Str, Enum, Value,
-                      Bool, Int, observe, set_default, Unicode)
+                      Bool, Int, Float, observe, set_default, Unicode)
 import os
 import errno
 import numpy
-import h5py
 import logging
 from inspect import cleandoc
 
 from ..base_tasks import SimpleTask
+from ..tools.buffered_writer import BufferedFileWriter
+from ..tools.hdf5_writer import ChunkedHDF5Writer
+from ..tools.binary_columns import write_sidecar, append_block
+from ..tools.column_buffer import ColumnBuffer
 
 
 class SaveTask(SimpleTask):
@@ -26,7 +29,9 @@ class SaveTask(SimpleTask):
 
     Notes
     -----
-    Currently only support saving floats.
+    Currently only support saving floats (and complexes in array mode). In
+    array mode, the data are stored in a growable ColumnBuffer and the
+    database holds a structured array of the lines saved so far.
 
     """
     #: Kind of object in which to save the data.
@@ -39,7 +44,7 @@ class SaveTask(SimpleTask):
     filename = Unicode().tag(pref=True)
 
     #: Currently opened file object. (File mode)
-    file_object = Value()
+    file_object = Value().tag(runtime=True)
 
     #: Opening mode to use when saving to a file.
     file_mode = Enum('New', 'Add')
@@ -47,23 +52,30 @@ class SaveTask(SimpleTask):
     #: Header to write at the top of the file.
     header = Str().tag(pref=True)
 
-    #: Numpy array in which data are stored (Array mode)
-    array = Value()  # Array
+    #: Maximal time (in s) between the saving of a line and the flush of the
+    #: file. When non zero the lines are written by a background thread, 0
+    #: flushes the file after each line.
+    flush_interval = Float(0.0).tag(pref=True)
 
-    #: Size of the data to be saved. (Evaluated at runtime)
+    #: Buffer in which data are stored (Array mode)
+    array = Value().tag(runtime=True)  # ColumnBuffer
+
+    #: Size of the data to be saved, if left empty the array grows as needed
+    #: and the file is never closed before the end of the measure.
+    #: (Evaluated at runtime)
     array_size = Str().tag(pref=True)
 
     #: Computed size of the data (post evaluation)
-    array_length = Int()
+    array_length = Int().tag(runtime=True)
 
     #: Index of the current line.
-    line_index = Int(0)
+    line_index = Int(0).tag(runtime=True)
 
     #: List of values to be saved store as (label, value).
     saved_values = ContainerList(Tuple()).tag(pref=True)
 
     #: Flag indicating whether or not initialisation has been performed.
-    initialized = Bool(False)
+    initialized = Bool(False).tag(runtime=True)
 
     task_database_entries = set_default({'file': None})
 
@@ -101,6 +113,14 @@ class SaveTask(SimpleTask):
                     log.error(mes)
                     self.root_task.should_stop.set()
 
+                if self.flush_interval > 0:
+                    # The root task closes the writer at the end of the
+                    # measure which writes all the pending lines.
+                    self.file_object = \
+                        BufferedFileWriter(self.file_object,
+                                           self.flush_interval,
+                                           stop_event=self.root_task.should_stop)
+
                 self.root_task.files[full_path] = self.file_object
                 if self.header:
                     h = self.format_string(self.header)
@@ -111,13 +131,10 @@ class SaveTask(SimpleTask):
                 self.file_object.flush()
 
             if self.saving_target != 'File':
-                # TODO add more flexibilty on the dtype (possible complex
-                # values)
-                array_type = numpy.dtype([(str(s[0]), 'f8')
-                                          for s in self.saved_values])
-                self.array = numpy.empty((self.array_length),
-                                         dtype=array_type)
-                self.write_in_database('array', self.array)
+                # The buffer grows if the size is unknown or exceeded.
+                self.array = ColumnBuffer([s[0] for s in self.saved_values],
+                                          max(self.array_length, 0))
+                self.write_in_database('array', self.array.array)
             self.initialized = True
 
         # Writing
@@ -126,9 +143,12 @@ class SaveTask(SimpleTask):
         if self.saving_target != 'Array':
             self.file_object.write('\t'.join([str(val)
                                               for val in values]) + '\n')
-            self.file_object.flush()
+            if self.flush_interval <= 0:
+                self.file_object.flush()
         if self.saving_target != 'File':
-            self.array[self.line_index] = tuple(values)
+            self.array.append(values)
+            # Publish the lines saved so far (the buffer may have moved).
+            self.write_in_database('array', self.array.array)
 
         self.line_index += 1
 
@@ -192,10 +212,6 @@ class SaveTask(SimpleTask):
                 traceback[err_path] = mess.format(e)
                 return False, traceback
 
-        elif self.saving_target != 'File':
-            traceback[err_path] = 'A size for the array must be provided.'
-            return False, traceback
-
         test = True
         for i, s in enumerate(self.saved_values):
             try:
@@ -226,14 +242,15 @@ class SaveTask(SimpleTask):
 
 
 class SaveFileTask(SimpleTask):
-    """ Save the specified entries in a CSV file.
+    """ Save the specified entries in a CSV or binary file.
 
     Wait for any parallel operation before execution.
 
     Notes
     -----
     Currently only support saving floats and arrays of floats (record arrays
-    or simple arrays).
+    or simple arrays). In binary mode, the arrays must keep the same size
+    during the whole measure (see binary_columns for the format).
 
     """
     #: Folder in which to save the data.
@@ -242,8 +259,11 @@ class SaveFileTask(SimpleTask):
     #: Name of the file in which to write the data.
     filename = Unicode().tag(pref=True)
 
+    #: Format of the file.
+    file_format = Enum('CSV', 'Binary').tag(pref=True)
+
     #: Currently opened file object. (File mode)
-    file_object = Value()
+    file_object = Value().tag(runtime=True)
 
     #: Header to write at the top of the file.
     header = Str().tag(pref=True)
@@ -252,10 +272,13 @@ class SaveFileTask(SimpleTask):
     saved_values = ContainerList(Tuple()).tag(pref=True)
 
     #: Flag indicating whether or not initialisation has been performed.
-    initialized = Bool(False)
+    initialized = Bool(False).tag(runtime=True)
 
     #: Column indices identified as arrays.
-    array_values = Value()
+    array_values = Value().tag(runtime=True)
+
+    #: Length of the blocks written in the binary file.
+    block_length = Int().tag(runtime=True)
 
     task_database_entries = set_default({'file': None})
 
@@ -265,6 +288,34 @@ class SaveFileTask(SimpleTask):
         """ Collect all data and write them to file.
 
         """
+        values = [self.format_and_eval_string(s[1])
+                  for s in self.saved_values]
+
+        lengths = set()
+        for val in values:
+            if isinstance(val, numpy.ndarray):
+                lengths.add(val.shape[0])
+                if len(val.shape) > 1:
+                    log = logging.getLogger()
+                    mes = cleandoc('''In {}, impossible to save arrays exceeding
+                                    one dimension. Save file in HDF5 format.
+                                    '''.format(self.task_name))
+                    log.error(mes)
+                    self.root_task.should_stop.set()
+
+        length = 1
+        if lengths:
+            if len(lengths) > 1:
+                log = logging.getLogger()
+                mes = cleandoc('''In {}, impossible to save simultaneously
+                                arrays of different sizes.
+                                Save file in HDF5 format.
+                                '''.format(self.task_name))
+                log.error(mes)
+                self.root_task.should_stop.set()
+            else:
+                length = lengths.pop()
+
         # Initialisation.
         if not self.initialized:
 
@@ -282,15 +333,9 @@ class SaveFileTask(SimpleTask):
 
             self.root_task.files[full_path] = self.file_object
 
-            if self.header:
-                h = self.format_string(self.header)
-                for line in h.split('\n'):
-                    self.file_object.write('# ' + line + '\n')
-
             labels = []
             self.array_values = set()
-            for i, s in enumerate(self.saved_values):
-                value = self.format_and_eval_string(s[1])
+            for i, (s, value) in enumerate(zip(self.saved_values, values)):
                 if isinstance(value, numpy.ndarray):
                     names = value.dtype.names
                     self.array_values.add(i)
@@ -300,41 +345,37 @@ class SaveFileTask(SimpleTask):
                         labels.append(s[0])
                 else:
                     labels.append(s[0])
-            self.file_object.write('\t'.join(labels) + '\n')
-            self.file_object.flush()
 
-            self.initialized = True
+            if self.file_format == 'Binary':
+                self.block_length = length
+                write_sidecar(full_path, labels, length,
+                              self.format_string(self.header))
+            else:
+                if self.header:
+                    h = self.format_string(self.header)
+                    for line in h.split('\n'):
+                        self.file_object.write('# ' + line + '\n')
+                self.file_object.write('\t'.join(labels) + '\n')
+                self.file_object.flush()
 
-        lengths = set()
-        values = []
-        for i, s in enumerate(self.saved_values):
-            value = self.format_and_eval_string(s[1])
-            values.append(value)
-            if i in self.array_values:
-                lengths.add(value.shape[0])
-                if len(value.shape) > 1:
-                    log = logging.getLogger()
-                    mes = cleandoc('''In {}, impossible to save arrays exceeding
-                                    one dimension. Save file in HDF5 format. 
-                                    '''.format(self.task_name))
-                    log.error(mes)
-                    self.root_task.should_stop.set()
+            self.initialized = True
 
-        if lengths:
-            if len(lengths) > 1:
-                log = logging.getLogger()
-                mes = cleandoc('''In {}, impossible to save simultaneously
-                                arrays of different sizes.
-                                Save file in HDF5 format. 
-                                '''.format(self.task_name))
-                log.error(mes)
-                self.root_task.should_stop.set()
-            else:
-                length = lengths.pop()
+        if self.file_format == 'Binary' and length != self.block_length:
+            log = logging.getLogger()
+            mes = cleandoc('''In {}, the size of the arrays changed from {} to
+                            {}, which is not supported by the binary format.
+                            '''.format(self.task_name, self.block_length,
+                                        length))
+            log.error(mes)
+            self.root_task.should_stop.set()
+            return
 
         if not self.array_values:
-            self.file_object.write('\t'.join([str(val) for val in values]) +
-                                   '\n')
+            if self.file_format == 'Binary':
+                append_block(self.file_object, [values])
+            else:
+                self.file_object.write('\t'.join([str(val)
+                                                  for val in values]) + '\n')
             self.file_object.flush()
         else:
             columns = []
@@ -346,8 +387,12 @@ class SaveFileTask(SimpleTask):
                         columns.append(val)
                 else:
                     columns.append(numpy.ones(length)*val)
-            array_to_save = numpy.rec.fromarrays(columns)
-            numpy.savetxt(self.file_object, array_to_save, delimiter='\t')
+            if self.file_format == 'Binary':
+                # The columns are written directly (no record array).
+                append_block(self.file_object, columns)
+            else:
+                array_to_save = numpy.rec.fromarrays(columns)
+                numpy.savetxt(self.file_object, array_to_save, delimiter='\t')
             self.file_object.flush()
 
     def check(self, *args, **kwargs):
@@ -405,27 +450,7 @@ class SaveFileTask(SimpleTask):
                 test = False
 
         return test, traceback
-        
-class _HDF5File(h5py.File):
-    """ 
-        Resize the datasets before closing the file
-        Sets the compression with a boolean
-    """
 
-    def close(self):
-        for dataset in self.keys():
-            oldshape = self[dataset].shape
-            newshape = (self.attrs['countCalls'], ) + oldshape[1:]
-            self[dataset].resize(newshape)
-        super(_HDF5File, self).close()
-
-    def create_dataset(self, name, shape, maximumshape, datatype, compress):
-        f = super(_HDF5File, self)
-        if compress:
-            f.create_dataset(name, shape, maxshape=maximumshape, dtype=datatype, compression='gzip')
-        else:
-            f.create_dataset(name, shape, maxshape=maximumshape, dtype=datatype)
-            
 
 class SaveFileHDF5Task(SimpleTask):
     """ Save the specified entries in a HDF5 file.
@@ -440,7 +465,7 @@ class SaveFileHDF5Task(SimpleTask):
     filename = Unicode().tag(pref=True)
 
     #: Currently opened file object. (File mode)
-    file_object = Value()
+    file_object = Value().tag(runtime=True)
 
     #: Header to write at the top of the file.
     header = Str().tag(pref=True)
@@ -451,14 +476,29 @@ class SaveFileHDF5Task(SimpleTask):
     #: data type (float16, float32, etc.)
     datatype = Enum('float16', 'float32', 'float64').tag(pref=True)
     
-    #: gzip compression of the data in the HDF5 file
+    #: Compression of the data in the HDF5 file.
     compression = Bool(False).tag(pref=True)
 
-    #: estimation of the number of calls of this task during the measure. This helps h5py to chunk the file appropriately
+    #: Compression filter to use (gzip is slower but more widely supported).
+    compression_filter = Enum('gzip', 'lzf').tag(pref=True)
+
+    #: Whether to apply the shuffle filter before compressing.
+    shuffle = Bool(False).tag(pref=True)
+
+    #: Whether to open the file in SWMR mode so that it can be read during
+    #: the measure.
+    swmr = Bool(False).tag(pref=True)
+
+    #: Maximal time (in s) between the collection of a point and its writing
+    #: to the file.
+    flush_interval = Float(1.0).tag(pref=True)
+
+    #: Estimation of the number of calls of this task during the measure.
+    #: This is used to avoid chunks much larger than the datasets.
     callsEstimation = Str('1').tag(pref=True)
 
     #: Flag indicating whether or not initialisation has been performed.
-    initialized = Bool(False)
+    initialized = Bool(False).tag(runtime=True)
 
     task_database_entries = set_default({'file': None})
 
@@ -467,76 +507,50 @@ class SaveFileHDF5Task(SimpleTask):
     def perform(self):
         """ Collect all data and write them to file.
 
+        The points are buffered and written to the file by chunks.
+
         """
+        values = {}
+        for s in self.saved_values:
+            value = self.format_and_eval_string(s[1])
+            if isinstance(value, numpy.ndarray) and value.dtype.names:
+                for m in value.dtype.names:
+                    values[s[0] + '_' + m] = value[m]
+            else:
+                values[s[0]] = value
 
-        callsEstimation = self.format_and_eval_string(self.callsEstimation)        
-        
         # Initialisation.
         if not self.initialized:
 
             full_folder_path = self.format_string(self.folder)
             filename = self.format_string(self.filename)
             full_path = os.path.join(full_folder_path, filename)
+            calls = self.format_and_eval_string(self.callsEstimation)
+            compression = (self.compression_filter if self.compression
+                           else None)
             try:
-                self.file_object = _HDF5File(full_path, 'w')
+                self.file_object = ChunkedHDF5Writer(
+                    full_path, self.format_string(self.header), compression,
+                    self.shuffle, self.flush_interval, self.swmr, calls)
             except IOError as e:
                 log = logging.getLogger()
                 mes = cleandoc('''In {}, failed to open the specified
                                 file {}'''.format(self.task_name, e))
                 log.error(mes)
                 self.root_task.should_stop.set()
+                return
 
             self.root_task.files[full_path] = self.file_object
 
             f = self.file_object
-            for s in self.saved_values:
-                value = self.format_and_eval_string(s[1])
-                if isinstance(value, numpy.ndarray):
-                    names = value.dtype.names
-                    if names:
-                        for m in names:
-                            f.create_dataset(s[0] + '_' + m, 
-                                             (callsEstimation, ) + value.shape,
-                                             (None, ) + value.shape,
-                                             self.format_string(self.datatype),
-                                             self.compression )
-                    else:
-                        f.create_dataset(s[0], 
-                                         (callsEstimation, ) + value.shape,
-                                         (None, ) + value.shape,
-                                         self.format_string(self.datatype),
-                                         self.compression )
-                else:
-                    f.create_dataset(s[0], (callsEstimation, ), (None, ), self.format_string(self.datatype), self.compression)
-            f.attrs['header'] = self.format_string(self.header)
-            f.attrs['countCalls'] = 0
-            f.flush()
+            datatype = self.format_string(self.datatype)
+            for name, value in values.iteritems():
+                f.create_dataset(name, numpy.shape(value), datatype)
+            f.start()
 
             self.initialized = True
-        
-        f = self.file_object
-        countCalls = f.attrs['countCalls']
-        
-        if not (countCalls % callsEstimation):
-            for dataset in f.keys():
-                oldshape = f[dataset].shape
-                newshape = (oldshape[0] + callsEstimation, ) + oldshape[1:]
-                f[dataset].resize(newshape)
-        
-        for s in self.saved_values:
-            value = self.format_and_eval_string(s[1])
-            if isinstance(value, numpy.ndarray):
-                names = value.dtype.names
-                if names:
-                    for m in names:
-                        f[s[0] + '_' + m][countCalls] = value[m]
-                else:
-                    f[s[0]][countCalls] = value
-            else:
-                f[s[0]][countCalls] = value
-                
-        f.attrs['countCalls'] = countCalls + 1
-        f.flush()
+
+        self.file_object.append(values)
 
     def check(self, *args, **kwargs):
         """
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : binary_columns.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Append-only binary format used to save columns of floats.
+
+Formatting large arrays as text is slow and triples the size of the files.
+In this format the data file only contains little-endian doubles written by
+blocks: each call of the saving task appends one block made of the columns
+written one after the other (each column has the same length in all blocks).
+The labels, the length of the blocks and the header are stored in a JSON
+sidecar file (data file name followed by '.json').
+
+As the file is a sequence of fixed size blocks, it can be memory-mapped as a
+structured array with one field per column. When the blocks contain a single
+row, the fields are 1D and the array looks exactly like the one obtained by
+loading a CSV file. Otherwise each field has the shape (blocks, block_length).
+
+"""
+import os
+import json
+
+import numpy as np
+
+
+#: Type of the saved values.
+DTYPE = np.dtype('<f8')
+
+#: Extension of the sidecar file.
+SIDECAR_EXT = '.json'
+
+#: Identifier of the format stored in the sidecar.
+FORMAT = 'hqc_meas.binary_columns'
+
+
+def sidecar_path(path):
+    """Path of the sidecar file associated with a data file.
+
+    """
+    return path + SIDECAR_EXT
+
+
+def write_sidecar(path, labels, block_length, header=''):
+    """Write the sidecar describing a data file.
+
+    Parameters
+    ----------
+    path : unicode
+        Path of the data file.
+
+    labels : list(str)
+        Labels of the columns.
+
+    block_length : int
+        Number of rows in each block.
+
+    header : str, optional
+        Header of the file.
+
+    """
+    infos = {'format': FORMAT, 'version': 1, 'dtype': DTYPE.str,
+             'labels': list(labels), 'block_length': block_length,
+             'header': header}
+    with open(sidecar_path(path), 'w') as f:
+        json.dump(infos, f, indent=2)
+
+
+def read_sidecar(path):
+    """Read the sidecar associated with a data file.
+
+    Raises
+    ------
+    ValueError :
+        If the sidecar does not describe a binary columns file.
+
+    """
+    with open(sidecar_path(path)) as f:
+        infos = json.load(f)
+    if infos.get('format') != FORMAT:
+        raise ValueError('{} is not a binary columns file'.format(path))
+    infos['labels'] = [str(l) for l in infos['labels']]
+    return infos
+
+
+def block_dtype(labels, block_length):
+    """Structured type corresponding to one block of the data file.
+
+    """
+    if block_length == 1:
+        return np.dtype([(l, DTYPE) for l in labels])
+    return np.dtype([(l, DTYPE, (block_length,)) for l in labels])
+
+
+def append_block(file_object, columns):
+    """Append a block to a data file.
+
+    Parameters
+    ----------
+    file_object : file
+        Data file opened in binary mode.
+
+    columns : list
+        Arrays (or scalars) of the block. They are written directly, a copy
+        only being made if the type or the memory layout does not match.
+
+    """
+    for column in columns:
+        column = np.ascontiguousarray(column, DTYPE)
+        file_object.write(buffer(column))
+
+
+def load_columns(path, mmap=True):
+    """Load a binary columns file.
+
+    Parameters
+    ----------
+    path : unicode
+        Path of the data file.
+
+    mmap : bool, optional
+        Whether to memory-map the file (read only) instead of reading it.
+
+    Returns
+    -------
+    data : numpy.ndarray
+        Structured array with one field per column, incomplete trailing
+        blocks are ignored.
+
+    header : str
+        Header saved along with the data.
+
+    """
+    infos = read_sidecar(path)
+    dtype = block_dtype(infos['labels'], infos['block_length'])
+    blocks = os.path.getsize(path) // dtype.itemsize
+    if not blocks:
+        data = np.empty(0, dtype)
+    elif mmap:
+        data = np.memmap(path, dtype=dtype, mode='r', shape=(blocks,))
+    else:
+        data = np.fromfile(path, dtype=dtype, count=blocks)
+    return data, infos['header']
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : buffered_writer.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""File wrapper delegating the writing to a background thread.
+
+Flushing a file after each line is slow on network filesystems. The writer
+stores the lines in a bounded queue drained by a thread which writes them by
+batches and flushes the file when the flush interval elapsed or when enough
+data accumulated. When the queue is full the measure waits for the thread,
+bounding the memory used. Closing the writer (as done by the root task at the
+end of a measure) writes everything and synchronizes the file with the disk.
+
+"""
+import os
+import logging
+from threading import Thread
+from timeit import default_timer
+from Queue import Queue, Empty
+
+
+#: Maximal number of lines written at once.
+MAX_BATCH = 1000
+
+#: Marker asking the thread to flush the file.
+_FLUSH = object()
+
+#: Marker asking the thread to exit.
+_CLOSE = object()
+
+
+class BufferedFileWriter(object):
+    """Write to a file from a background thread.
+
+    Parameters
+    ----------
+    file_object : file
+        Opened file to write to. It is closed by the writer.
+
+    flush_interval : float, optional
+        Maximal time (in s) between the write of a line and the flush of the
+        file.
+
+    flush_size : int, optional
+        Number of bytes written after which the file is flushed even if the
+        interval did not elapse.
+
+    max_pending : int, optional
+        Maximal number of lines waiting to be written.
+
+    stop_event : Event, optional
+        Event signaling that the measure should stop. Once set, the file is
+        flushed and synchronized with the disk as soon as possible.
+
+    """
+
+    def __init__(self, file_object, flush_interval=1.0, flush_size=2**20,
+                 max_pending=10000, stop_event=None):
+        self.file_object = file_object
+        self.name = getattr(file_object, 'name', '')
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.stop_event = stop_event
+        self.closed = False
+        self._queue = Queue(max_pending)
+        self._error = None
+        self._thread = Thread(target=self._run,
+                              name='BufferedWriter-{}'.format(self.name))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, data):
+        """Queue data to be written.
+
+        """
+        self._check()
+        self._queue.put(data)
+
+    def flush(self):
+        """Wait for the queued data to be written and flush the file.
+
+        """
+        self._check()
+        self._queue.put(_FLUSH)
+        self._queue.join()
+        self._check()
+
+    def close(self):
+        """Write the queued data, synchronize the file and close it.
+
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self.file_object.close()
+        if self._error is not None:
+            raise self._error
+
+    def _check(self):
+        """Raise the error which occurred in the writing thread if any.
+
+        """
+        if self._error is not None:
+            raise self._error
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+
+    def _sync(self):
+        """Flush the file and ask the OS to write it to the disk.
+
+        """
+        self.file_object.flush()
+        try:
+            os.fsync(self.file_object.fileno())
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self):
+        """Drain the queue, write the data and flush the file as needed.
+
+        """
+        queue = self._queue
+        f = self.file_object
+        unflushed = 0
+        first_unflushed = None
+        synced_on_stop = False
+        running = True
+        while running:
+            timeout = 0.1
+            if first_unflushed is not None:
+                remaining = self.flush_interval - (default_timer() -
+                                                   first_unflushed)
+                timeout = max(min(timeout, remaining), 0)
+            try:
+                items = [queue.get(timeout=timeout)]
+            except Empty:
+                items = []
+            # Collect what is already available to write it at once.
+            while len(items) < MAX_BATCH:
+                try:
+                    items.append(queue.get_nowait())
+                except Empty:
+                    break
+
+            force = False
+            try:
+                chunks = []
+                for item in items:
+                    if item is _CLOSE:
+                        running = False
+                    elif item is _FLUSH:
+                        force = True
+                    else:
+                        chunks.append(item)
+
+                if chunks and self._error is None:
+                    data = ''.join(chunks)
+                    f.write(data)
+                    unflushed += len(data)
+                    if first_unflushed is None:
+                        first_unflushed = default_timer()
+
+                stopping = (self.stop_event is not None and
+                            self.stop_event.is_set())
+                elapsed = (first_unflushed is not None and
+                           default_timer() - first_unflushed >=
+                           self.flush_interval)
+                if not running or (stopping and not synced_on_stop):
+                    self._sync()
+                    synced_on_stop = stopping
+                elif force or elapsed or unflushed >= self.flush_size:
+                    f.flush()
+                else:
+                    continue
+                unflushed = 0
+                first_unflushed = None
+
+            except Exception as e:
+                if self._error is None:
+                    logger = logging.getLogger(__name__)
+                    logger.exception('Failed to write to %s', self.name)
+                    self._error = e
+            finally:
+                for item in items:
+                    queue.task_done()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : column_buffer.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Growable buffer storing the lines saved by a task in a structured array.
+
+The length of the data does not need to be known in advance : the capacity of
+the underlying array doubles when it is full. Columns are float64 and switch
+to complex128 the first time a complex value is saved in them.
+
+The lines saved so far are accessed as a structured array (a view on the
+buffer, no copy), which is valid until the buffer grows. Indexing the buffer
+by a column name returns a view on the values of this column.
+
+"""
+import numpy as np
+
+
+#: Minimal capacity of the buffer.
+MIN_CAPACITY = 16
+
+
+class ColumnBuffer(object):
+    """Columns of floats or complexes of growing length.
+
+    Parameters
+    ----------
+    names : iterable(str)
+        Names of the columns.
+
+    capacity : int, optional
+        Expected number of lines. The buffer grows beyond if necessary.
+
+    """
+
+    def __init__(self, names, capacity=0):
+        capacity = max(capacity, 1)
+        self.length = 0
+        self._data = np.empty(capacity, [(str(n), 'f8') for n in names])
+
+    @property
+    def names(self):
+        """Names of the columns.
+
+        """
+        return self._data.dtype.names
+
+    @property
+    def dtype(self):
+        """Structured type equivalent to a line of the buffer.
+
+        """
+        return self._data.dtype
+
+    @property
+    def capacity(self):
+        """Number of lines which can be stored without reallocation.
+
+        """
+        return len(self._data)
+
+    @property
+    def array(self):
+        """Structured array of the lines saved so far (view on the buffer).
+
+        """
+        return self._data[:self.length]
+
+    def append(self, values):
+        """Add a line to the buffer.
+
+        Parameters
+        ----------
+        values : iterable
+            Values of the line in the order of the columns.
+
+        """
+        values = tuple(values)
+        dtype = self._data.dtype
+        if any(dtype[i].kind != 'c' and np.iscomplexobj(value)
+               for i, value in enumerate(values)):
+            new_dtype = [(name, 'c16' if np.iscomplexobj(value) else
+                          dtype[name])
+                         for name, value in zip(dtype.names, values)]
+            self._reallocate(self.capacity, new_dtype)
+
+        index = self.length
+        if index == self.capacity:
+            self._reallocate(max(2*index, MIN_CAPACITY), self._data.dtype)
+
+        self._data[index] = values
+        self.length = index + 1
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        """Access a column or lines of the buffer.
+
+        """
+        return self.array[key]
+
+    def __array__(self, dtype=None):
+        """Convert the buffer into a structured array.
+
+        """
+        array = self.array
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    def _reallocate(self, capacity, dtype):
+        """Copy the lines into a new array.
+
+        """
+        data = np.empty(capacity, dtype)
+        for name in self._data.dtype.names:
+            data[name][:self.length] = self._data[name][:self.length]
+        self._data = data
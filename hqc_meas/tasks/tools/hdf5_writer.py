@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : hdf5_writer.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Writer appending rows to the datasets of a HDF5 file by chunks.
+
+Writing each point with one slice assignment per dataset (and flushing the
+file after each point) is dominated by the HDF5 overhead. The writer
+accumulates the rows in memory and writes them one chunk at a time, the chunk
+shape of the datasets matching the size of the buffers. The datasets are
+extended to the number of rows written so that their length is always
+meaningful, which allows to read the file while it is written (in SWMR mode).
+
+The number of rows written is also stored in the 'countCalls' attribute of
+the file. As attributes cannot be modified in SWMR mode, it is then only
+updated when the file is closed.
+
+"""
+from timeit import default_timer
+
+import numpy as np
+import h5py
+
+
+#: Target size of a chunk in bytes.
+CHUNK_BYTES = 256*2**10
+
+#: Minimal number of rows in a chunk.
+MIN_CHUNK_ROWS = 64
+
+
+def chunk_rows(row_shape, dtype, rows_estimate=None):
+    """Number of rows in a chunk of a dataset.
+
+    Parameters
+    ----------
+    row_shape : tuple
+        Shape of a row of the dataset.
+
+    dtype : numpy.dtype
+        Type of the data.
+
+    rows_estimate : int, optional
+        Expected number of rows, used to avoid chunks much larger than the
+        dataset.
+
+    """
+    row_bytes = np.dtype(dtype).itemsize*int(np.prod(row_shape))
+    rows = max(1, CHUNK_BYTES // max(row_bytes, 1))
+    if rows_estimate:
+        rows = min(rows, max(rows_estimate, MIN_CHUNK_ROWS))
+    return rows
+
+
+class ChunkedHDF5Writer(object):
+    """Append rows to the datasets of a HDF5 file.
+
+    Parameters
+    ----------
+    path : unicode
+        Path of the file to create (overwritten if it exists).
+
+    header : str, optional
+        Header stored in the 'header' attribute of the file.
+
+    compression : {None, 'gzip', 'lzf'}, optional
+        Compression filter to use.
+
+    shuffle : bool, optional
+        Whether to use the shuffle filter, which generally improves the
+        compression ratio.
+
+    flush_interval : float, optional
+        Maximal time (in s) between the addition of a row and its writing to
+        the file. The rows are otherwise written when a chunk is full.
+
+    swmr : bool, optional
+        Whether to open the file in Single Writer Multiple Readers mode, so
+        that it can be read during the measure.
+
+    rows_estimate : int, optional
+        Expected number of rows.
+
+    """
+
+    def __init__(self, path, header='', compression=None, shuffle=False,
+                 flush_interval=1.0, swmr=False, rows_estimate=None):
+        self.path = path
+        self.compression = compression
+        self.shuffle = shuffle
+        self.flush_interval = flush_interval
+        self.swmr = swmr
+        self.rows_estimate = rows_estimate
+        self.rows = 0
+        self.closed = False
+        kwargs = {'libver': 'latest'} if swmr else {}
+        self.file = h5py.File(path, 'w', **kwargs)
+        self.file.attrs['header'] = header
+        self.file.attrs['countCalls'] = 0
+        self._buffers = {}
+        self._pending = 0
+        self._last_write = default_timer()
+
+    def create_dataset(self, name, row_shape, dtype):
+        """Create a dataset whose rows have the given shape.
+
+        All the datasets must be created before the first row is added.
+
+        """
+        rows = chunk_rows(row_shape, dtype, self.rows_estimate)
+        kwargs = {}
+        if self.compression:
+            kwargs['compression'] = self.compression
+        if self.shuffle:
+            kwargs['shuffle'] = True
+        self.file.create_dataset(name, (0,) + tuple(row_shape),
+                                 maxshape=(None,) + tuple(row_shape),
+                                 chunks=(rows,) + tuple(row_shape),
+                                 dtype=dtype, **kwargs)
+        self._buffers[name] = np.empty((rows,) + tuple(row_shape), dtype)
+
+    def start(self):
+        """Signal that all the datasets were created.
+
+        In SWMR mode, no object can be created after this call.
+
+        """
+        if self.swmr:
+            self.file.swmr_mode = True
+
+    def append(self, values):
+        """Add a row to the datasets.
+
+        Parameters
+        ----------
+        values : dict
+            Values of the row for each dataset.
+
+        """
+        index = self._pending
+        for name, value in values.iteritems():
+            self._buffers[name][index] = value
+        self._pending += 1
+
+        full = any(self._pending == len(b) for b in self._buffers.values())
+        if full or default_timer() - self._last_write > self.flush_interval:
+            self.write()
+
+    def write(self):
+        """Write the buffered rows to the file and flush it.
+
+        """
+        pending = self._pending
+        if pending:
+            start = self.rows
+            for name, buff in self._buffers.iteritems():
+                dataset = self.file[name]
+                dataset.resize(start + pending, axis=0)
+                dataset[start:start+pending] = buff[:pending]
+            self.rows += pending
+            self._pending = 0
+            if not self.swmr:
+                self.file.attrs['countCalls'] = self.rows
+        self.file.flush()
+        self._last_write = default_timer()
+
+    def flush(self):
+        """Alias of write to be usable as a file.
+
+        """
+        self.write()
+
+    def close(self):
+        """Write the remaining rows and close the file.
+
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.write()
+        self.file.close()
+        if self.swmr:
+            # The attribute could not be updated while in SWMR mode.
+            with h5py.File(self.path, 'r+', libver='latest') as f:
+                f.attrs['countCalls'] = self.rows
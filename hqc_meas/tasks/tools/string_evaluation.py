@@ -6,6 +6,8 @@
 #==============================================================================
 """
 """
+from ast import literal_eval
+from numbers import Number
 from textwrap import fill
 from inspect import cleandoc
 from math import (cos, sin, tan, acos, asin, atan, sqrt, log10,
@@ -41,3 +43,54 @@ def safe_eval(expr, local_var=None):
         return eval(expr, globals(), local_var)
     else:
         return eval(expr)
+
+
+def compile_eval(expr, local_names=()):
+    """ Build a callable evaluating an expression.
+
+    The returned callable takes as single argument the dict of local variables
+    (as safe_eval) and returns the value of the expression. The expression is
+    parsed once and the resulting code object reused on each call. Pure
+    constant and single variable expressions are special cased to avoid going
+    through eval at all.
+
+    Parameters
+    ----------
+    expr : str
+        Expression to evaluate.
+
+    local_names : iterable(str), optional
+        Names of the local variables which will be passed to the evaluator.
+        Used to detect expressions which simply access a variable.
+
+    Returns
+    -------
+    evaluator : callable
+        Callable taking a dict of local variables (or None) and returning the
+        value of the expression.
+
+    """
+    # Keep the behaviour of safe_eval for plain words.
+    if expr.isalpha():
+        return lambda local_var=None: expr
+
+    stripped = expr.strip()
+    if stripped in local_names:
+        return lambda local_var: local_var[stripped]
+
+    try:
+        const = literal_eval(stripped)
+    except Exception:
+        pass
+    else:
+        # Only immutable values can be safely shared between calls.
+        if isinstance(const, (Number, basestring)):
+            return lambda local_var=None: const
+
+    code = compile(stripped, '<string>', 'eval')
+    glob = globals()
+
+    def evaluator(local_var=None):
+        return eval(code, glob, local_var or {})
+
+    return evaluator
@@ -8,6 +8,13 @@
 """
 from atom.api import Atom, Dict, Bool, Value, Event, List, Str, Typed
 from threading import Lock
+import numpy as np
+
+
+#: Number of locks used to protect the flat database in running mode. Entries
+#: are distributed among the locks according to their index so that writes to
+#: different entries from different threads rarely contend.
+LOCK_STRIPES = 16
 
 
 class DatabaseNode(Atom):
@@ -26,15 +33,22 @@ class TaskDatabase(Atom):
         - an edition mode in which the number of entries and their hierarchy
         can change. In this mode the database is represented by a nested dict.
         - a running mode in which the entries are fixed (only their values can
-        change). In this mode the database is represented as a flat list.
-        In running mode the database is thread safe but the object it contains
-        may not be so (dict, list, etc)
+        change). In this mode the database is represented as a flat list,
+        float values being stored in a float64 array. In running mode the
+        database is thread safe but the object it contains may not be so
+        (dict, list, etc). Writes are protected by a set of striped locks and
+        reads do not lock. Notifications are emitted after the lock has been
+        released so that observers never run inside the critical section
+        (as a consequence two concurrent writes to the same entry may be
+        notified in a different order than the one in which they occurred).
 
     """
     # --- Public API ----------------------------------------------------------
 
     #: Event used to notify a value changed in the database. Thye update is
-    #: passed as a tuple (path, value)
+    #: passed as a tuple (path, value). When several values are set at once
+    #: in running mode (see set_values) a single notification is emitted
+    #: whose value is a list of such tuples.
     notifier = Event()
 
     #: List of root entries which should not be listed.
@@ -72,10 +86,9 @@ class TaskDatabase(Atom):
         if self.running:
             full_path = node_path + '/' + value_name
             index = self._entry_index_map[full_path]
-            self._lock.acquire()
-            self._flat_database[index] = value
-            self.notifier = (node_path + '/' + value_name, value)
-            self._lock.release()
+            with self._locks[index % LOCK_STRIPES]:
+                self._store(index, value)
+            self.notifier = (full_path, value)
         else:
             node = self._go_to_path(node_path)
             if value_name not in node.data:
@@ -109,7 +122,7 @@ class TaskDatabase(Atom):
         """
         if self.running:
             index = self._find_index(assumed_path, value_name)
-            return self._flat_database[index]
+            return self._load(index)
 
         else:
             node = self._go_to_path(assumed_path)
@@ -132,6 +145,99 @@ class TaskDatabase(Atom):
                     raise KeyError(mes)
                 return self.get_value(new_assumed_path, value_name)
 
+    def set_values(self, node_path, values):
+        """Method used to set the values of several entries of a node at once.
+
+        In running mode the paths are resolved only once for a given set of
+        entries, the locks are acquired a single time and a single
+        notification is emitted (carrying a list of (path, value) tuples). In
+        edition mode this is equivalent to calling set_value for each entry.
+
+        Parameters
+        ----------
+        node_path : str
+            Path to the node holding the values to be set.
+
+        values : dict
+            Mapping between the names of the entries and the values to store.
+
+        Returns
+        -------
+        new_val : bool
+            Boolean indicating whether or not a new entry has been created in
+            the database.
+
+        """
+        if not self.running:
+            new_val = False
+            for value_name, value in values.iteritems():
+                new_val |= self.set_value(node_path, value_name, value)
+            return new_val
+
+        names = tuple(values)
+        key = (node_path, names)
+        cache = self._write_cache
+        if key in cache:
+            paths, indexes, locks = cache[key]
+        else:
+            paths = [node_path + '/' + name for name in names]
+            indexes = [self._entry_index_map[path] for path in paths]
+            # Always acquire the locks in the same order to avoid deadlocks.
+            stripes = sorted(set(i % LOCK_STRIPES for i in indexes))
+            locks = [self._locks[i] for i in stripes]
+            cache[key] = (paths, indexes, locks)
+
+        vals = [values[name] for name in names]
+        for lock in locks:
+            lock.acquire()
+        try:
+            store = self._store
+            for index, value in zip(indexes, vals):
+                store(index, value)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        self.notifier = zip(paths, vals)
+        return False
+
+    def get_values(self, assumed_path, value_names):
+        """Method used to get several values from the database at once.
+
+        The lookup rules are the same as for get_value. In running mode the
+        indexes of the entries are cached so that subsequent calls for the
+        same entries do not need to resolve the paths again.
+
+        Parameters
+        ----------
+        assumed_path : str
+            Path where we start looking for the entries.
+
+        value_names : iterable(str)
+            Names of the values we are looking for.
+
+        Returns
+        -------
+        values : list
+            Values stored under the specified entries, in the same order as the
+            names.
+
+        """
+        if not self.running:
+            return [self.get_value(assumed_path, name) for name in value_names]
+
+        key = (assumed_path, tuple(value_names))
+        cache = self._read_cache
+        if key in cache:
+            indexes = cache[key]
+        else:
+            indexes = [self._find_index(assumed_path, name)
+                       for name in value_names]
+            cache[key] = indexes
+
+        load = self._load
+        return [load(i) for i in indexes]
+
     def delete_value(self, node_path, value_name):
         """Method to remove an entry from the specified node
 
@@ -180,10 +286,11 @@ class TaskDatabase(Atom):
             prefix was not None.
 
         """
+        load = self._load
         if prefix is None:
-            return [self._flat_database[i] for i in indexes]
+            return [load(i) for i in indexes]
         else:
-            return {prefix + str(i): self._flat_database[i] for i in indexes}
+            return {prefix + str(i): load(i) for i in indexes}
 
     def get_entries_indexes(self, assumed_path, entries):
         """ Access to the index in the flattened database for some entries.
@@ -426,7 +533,7 @@ class TaskDatabase(Atom):
         This is used when tasks are executed.
 
         """
-        self._lock = Lock()
+        self._locks = [Lock() for i in range(LOCK_STRIPES)]
         self.running = True
 
         # Flattening the database by walking all the nodes.
@@ -453,25 +560,107 @@ class TaskDatabase(Atom):
                 full_path = access[entry] + '/' + entry
                 mapping[short_path] = mapping[full_path]
 
+        # Float entries are stored in a typed buffer, the corresponding value
+        # in the list being left untouched.
+        slots = {}
+        for i, val in enumerate(datas):
+            if isinstance(val, float):
+                slots[i] = len(slots)
+        buff = np.empty(len(slots), dtype=np.float64)
+        for i, slot in slots.iteritems():
+            buff[slot] = datas[i]
+
+        self._write_cache = {}
+        self._read_cache = {}
         self._flat_database = datas
+        self._float_buffer = buff
+        self._float_slots = slots
         self._entry_index_map = mapping
 
+        # Keep the nested database around so that the edition mode can be
+        # restored.
+        self._edition_database = self._database
         self._database = None
 
+    def restore_edition_mode(self):
+        """ Leave the running mode and go back to the nested database.
+
+        The values set in running mode are discarded, the database being
+        restored in the state it was before calling prepare_for_running.
+
+        """
+        if not self.running:
+            return
+
+        self._database = self._edition_database
+        self._edition_database = None
+        self._flat_database = []
+        self._float_buffer = None
+        self._float_slots = {}
+        self._entry_index_map = {}
+        self._write_cache = {}
+        self._read_cache = {}
+        self.running = False
+
     # --- Private API ---------------------------------------------------------
 
     #: Main container for the database.
     _database = Typed(DatabaseNode, ())
 
+    #: Nested database stored while in running mode.
+    _edition_database = Typed(DatabaseNode)
+
     #: Flat version of the database only used in running mode for perfomances
     #: issues.
     _flat_database = List()
 
+    #: Array storing the values of the float entries in running mode.
+    _float_buffer = Value()
+
+    #: Dict mapping the flat database indexes of float entries to their
+    #: position in the float buffer.
+    _float_slots = Dict()
+
     #: Dict mapping full paths to flat database indexes.
     _entry_index_map = Dict()
 
-    #: Lock to make the database thread safe in running mode.
-    _lock = Value()
+    #: Striped locks making the database thread safe in running mode.
+    _locks = List()
+
+    #: Cache of the paths, indexes and locks resolved by set_values in running
+    #: mode.
+    _write_cache = Dict()
+
+    #: Cache of the indexes resolved by get_values in running mode.
+    _read_cache = Dict()
+
+    def _store(self, index, value):
+        """ Store a value in the flat database.
+
+        Must be called while holding the lock associated with the index.
+
+        """
+        slots = self._float_slots
+        if index in slots:
+            if isinstance(value, float):
+                self._float_buffer[slots[index]] = value
+                return
+            # The entry is no longer a float, store it as a generic object from
+            # now on. Update the list first so that a concurrent reader always
+            # get a meaningful value.
+            self._flat_database[index] = value
+            del slots[index]
+        else:
+            self._flat_database[index] = value
+
+    def _load(self, index):
+        """ Read a value from the flat database.
+
+        """
+        slot = self._float_slots.get(index)
+        if slot is None:
+            return self._flat_database[index]
+        return self._float_buffer.item(slot)
 
     def _go_to_path(self, path):
         """Method used to reach a node specified by a path.
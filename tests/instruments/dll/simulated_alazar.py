@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : simulated_alazar.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Simulation of the Alazar DLL used to test the drivers without a board.
+
+"""
+import ctypes
+from collections import deque
+from threading import current_thread
+
+import numpy as np
+
+from hqc_meas.instruments.dll.alazar935x import (SAMPLES_PER_SEC,
+                                                 CHANNEL_RANGE, CODE,
+                                                 BIT_SHIFT)
+
+
+class CallResult(object):
+    """Mimic the object returned by pyclibrary when calling a function.
+
+    """
+    def __init__(self, rval, args=()):
+        self.rval = rval
+        self.args = args
+
+    def __call__(self):
+        return self.rval
+
+    def __getitem__(self, index):
+        return (self.rval, self.args)[index]
+
+    def __iter__(self):
+        return iter((self.rval, self.args))
+
+
+class SimulatedAlazarDll(object):
+    """Fake DLL filling the posted buffers with sinusoidal signals.
+
+    Parameters
+    ----------
+    signals : dict
+        Signal of each channel ('A' and 'B') as a callable taking the time
+        (in s) from the trigger and returning the voltage.
+
+    fill_time : float, optional
+        Time (in s) needed by the board to fill a buffer. When non zero the
+        n-th buffer is complete fill_time*(n+1) after the start of the
+        capture and the board overflows if this buffer was not posted when it
+        started filling it.
+
+    Notes
+    -----
+    The timing of the board is simulated using a virtual clock (now) so that
+    the results do not depend on the load of the machine. The clock is
+    advanced when waiting on a buffer and through elapse, which the tests use
+    to simulate the processing time.
+
+    """
+    ApiSuccess = 512
+    ApiWaitTimeout = 579
+    ApiBufferOverflow = 582
+    ADMA_EXTERNAL_STARTCAPTURE = 0x1
+    ADMA_NPT = 0x200
+
+    def __init__(self, signals, fill_time=0.0):
+        self.signals = signals
+        self.fill_time = fill_time
+        self.posted = deque()
+        self.buffers_filled = 0
+        self.now = 0.0
+        self.capture_thread = None
+
+    def GetBoardBySystemID(self, system, board):
+        return CallResult(1)
+
+    def GetChannelInfo(self, board):
+        return CallResult(self.ApiSuccess, (board, 2**30, 12))
+
+    def SetRecordSize(self, board, pre_samples, samples):
+        self.samples = samples
+        return CallResult(self.ApiSuccess)
+
+    def SetRecordCount(self, board, count):
+        return CallResult(self.ApiSuccess)
+
+    def BeforeAsyncRead(self, board, channels, offset, samples,
+                        records_per_buffer, records, flags):
+        self.channels = [c for c, mask in (('A', 1), ('B', 2))
+                         if channels & mask]
+        self.records_per_buffer = records_per_buffer
+        return CallResult(self.ApiSuccess)
+
+    def PostAsyncBuffer(self, board, addr, size):
+        self.posted.append((addr, size, self.now))
+        return CallResult(self.ApiSuccess)
+
+    def StartCapture(self, board):
+        times = np.arange(self.samples)/SAMPLES_PER_SEC
+        blocks = []
+        for channel in self.channels:
+            volts = self.signals.get(channel, lambda t: 0*t)(times)
+            codes = np.clip(np.round((volts/CHANNEL_RANGE + 1)*CODE), 0, 4095)
+            block = np.tile(codes.astype(np.uint16) << BIT_SHIFT,
+                            (self.records_per_buffer, 1))
+            blocks.append(block)
+        self.data = np.concatenate(blocks).ravel()
+        self.start = self.now
+        self.capture_thread = current_thread()
+        self.filled_at_start = self.buffers_filled
+        return CallResult(self.ApiSuccess)
+
+    def WaitAsyncBufferComplete(self, board, addr, timeout):
+        head, size, posted = self.posted.popleft()
+        assert head == addr, 'Waiting on a buffer which is not the oldest'
+        if self.fill_time:
+            n = self.buffers_filled - self.filled_at_start
+            if posted > self.start + n*self.fill_time:
+                return CallResult(self.ApiBufferOverflow)
+            self.now = max(self.now, self.start + (n + 1)*self.fill_time)
+        array = (ctypes.c_uint16 * (size // 2)).from_address(addr)
+        np.frombuffer(array, np.uint16)[:] = self.data
+        self.buffers_filled += 1
+        return CallResult(self.ApiSuccess)
+
+    def elapse(self, duration):
+        """Advance the virtual clock.
+
+        Only the time spent in the thread which started the capture delays the
+        posting of the buffers, the time spent in other threads is ignored as
+        it runs in parallel to the acquisition.
+
+        """
+        if current_thread() is self.capture_thread:
+            self.now += duration
+
+    def AlazarErrorToText(self, code):
+        return CallResult('Error {}'.format(code))
+
+    def AbortAsyncRead(self, board):
+        self.posted.clear()
+        return CallResult(self.ApiSuccess)
+
+    def AbortCapture(self):
+        return CallResult(self.ApiSuccess)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_alazar935x.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from time import sleep
+import numpy as np
+from nose.tools import (assert_equal, assert_almost_equal, assert_greater,
+                        assert_raises)
+
+from hqc_meas.instruments.driver_tools import InstrIOError
+from hqc_meas.instruments.dll.alazar935x import (Alazar935x, DMABuffer,
+                                                 MAX_DMA_BUFFERS)
+from hqc_meas.instruments.dll.alazar_acquisition import BufferAcquisition
+
+from .simulated_alazar import SimulatedAlazarDll
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+FREQ = 25e6
+
+
+def make_driver(signals):
+    # Skip __init__ as it loads the real DLL.
+    driver = Alazar935x.__new__(Alazar935x)
+    driver._dll = SimulatedAlazarDll(signals)
+    return driver
+
+
+class TestGetDemod(object):
+
+    def setup(self):
+        signals = {'A': lambda t: 0.2*np.cos(2*np.pi*FREQ*t + 0.5),
+                   'B': lambda t: 0.1*np.sin(2*np.pi*FREQ*t)}
+        self.driver = make_driver(signals)
+
+    def test_averaged_demod(self):
+        demod, traces = self.driver.get_demod([20e-9, 0, 0], [200e-9, 400e-9,
+                                                              100e-9],
+                                              1000, 100, [0, 0], [FREQ, FREQ],
+                                              True, 1, 1, 1, 0)
+        assert_equal(demod.shape, (1,))
+        assert_almost_equal(demod['AI0'][0], 0.2*np.cos(0.5), 3)
+        assert_almost_equal(demod['AQ0'][0], -0.2*np.sin(0.5), 3)
+        assert_almost_equal(demod['BI0'][0], 0, 3)
+        assert_almost_equal(demod['BQ0'][0], 0.1, 3)
+        assert_equal(traces.shape, (50,))
+        assert_almost_equal(traces['A0'][0], 0.2*np.cos(0.5), 3)
+
+    def test_demod_per_record(self):
+        demod, _ = self.driver.get_demod([0], [400e-9], 1000, 100, [80e-9],
+                                         [FREQ], False, 1, 0, 0, 0)
+        assert_equal(demod.shape, (1000,))
+        assert_equal(demod.dtype.names,
+                     tuple(name for i in range(5)
+                           for name in ('AI0_{}'.format(i),
+                                        'AQ0_{}'.format(i))))
+        np.testing.assert_allclose(demod['AI0_3'], 0.2*np.cos(0.5),
+                                   atol=1e-3)
+
+    def test_buffers_reposting(self):
+        records = 100*(MAX_DMA_BUFFERS + 4)
+        self.driver.get_demod([0], [100e-9], records, 100, [0], [FREQ], True,
+                              1, 0, 0, 0)
+        assert_equal(self.driver._dll.buffers_filled, MAX_DMA_BUFFERS + 4)
+
+    def test_threaded_demod(self):
+        args = ([20e-9, 0], [200e-9, 100e-9], 1000, 100, [40e-9], [FREQ],
+                False, 1, 0, 1, 0)
+        demod, traces = self.driver.get_demod(*args)
+        threaded_demod, threaded_traces = self.driver.get_demod(*args,
+                                                                workers=3)
+        np.testing.assert_allclose(threaded_demod['AI0_2'], demod['AI0_2'])
+        np.testing.assert_array_equal(threaded_traces['A0'], traces['A0'])
+        assert_equal(self.driver.acquisition_stats.buffers, 10)
+        assert_equal(self.driver.acquisition_stats.overruns, 0)
+
+    def test_threaded_averaged_demod(self):
+        args = ([0], [400e-9], 1000, 100, [0], [FREQ], True, 1, 0, 0, 0)
+        demod, _ = self.driver.get_demod(*args)
+        threaded_demod, _ = self.driver.get_demod(*args, workers=2)
+        assert_almost_equal(threaded_demod['AI0'][0], demod['AI0'][0])
+        assert_almost_equal(threaded_demod['AQ0'][0], demod['AQ0'][0])
+
+
+class TestBufferAcquisition(object):
+
+    def setup(self):
+        self.buffers = [DMABuffer(2, 128) for i in range(2)]
+        self.processed = []
+
+    def teardown(self):
+        for buffer in self.buffers:
+            buffer.__exit__()
+
+    def start(self, fill_time=0.0):
+        dll = SimulatedAlazarDll({}, fill_time)
+        dll.SetRecordSize(1, 0, 64)
+        dll.BeforeAsyncRead(1, 1, 0, 64, 1, 100, 0)
+        for buffer in self.buffers:
+            dll.PostAsyncBuffer(1, buffer.addr, buffer.size_bytes)
+        dll.StartCapture(1)
+        self.dll = dll
+        return dll
+
+    def slow_process(self, index, raw, scratch):
+        sleep(0.01)
+        self.processed.append(index)
+
+    def virtual_process(self, index, raw, scratch):
+        # Takes 10 ms on the virtual clock of the board.
+        self.dll.elapse(0.01)
+        self.processed.append(index)
+
+    def test_backpressure(self):
+        acquisition = BufferAcquisition(self.start(), 1, self.buffers,
+                                        self.slow_process, workers=1,
+                                        queue_size=1)
+        stats = acquisition.run(10)
+        assert_equal(sorted(self.processed), range(10))
+        assert_equal(stats.buffers, 10)
+        assert_equal(stats.overruns, 0)
+        assert_greater(stats.backpressure, 0)
+        assert_equal(stats.max_queue_depth, 1)
+
+    def test_overrun(self):
+        acquisition = BufferAcquisition(self.start(0.002), 1, self.buffers,
+                                        self.virtual_process)
+        assert_raises(InstrIOError, acquisition.run, 10)
+        assert_equal(acquisition.stats.overruns, 1)
+
+    def test_threaded_overlap(self):
+        # Processing is slower than the board but happens in the workers so
+        # the reposting of the buffers is not delayed.
+        acquisition = BufferAcquisition(self.start(0.005), 1, self.buffers,
+                                        self.virtual_process, workers=4,
+                                        queue_size=4)
+        stats = acquisition.run(10)
+        assert_equal(stats.overruns, 0)
+        assert_equal(stats.buffers, 10)
+        assert_equal(sorted(self.processed), range(10))
+        # The acquisition thread only waited on the board.
+        assert_equal(self.dll.now, 10*0.005)
+
+    def test_processing_error(self):
+        def process(index, raw, scratch):
+            if index == 3:
+                raise ValueError()
+        acquisition = BufferAcquisition(self.start(), 1, self.buffers,
+                                        process, workers=2)
+        assert_raises(ValueError, acquisition.run, 10)
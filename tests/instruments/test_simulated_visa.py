@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_simulated_visa.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal, assert_true, raises
+
+from hqc_meas.instruments.visa_tools import VisaIOError
+from hqc_meas.instruments.simulated_visa import (SimulatedInstrument,
+                                                 binary_block,
+                                                 open_simulated_driver,
+                                                 simulated_pna,
+                                                 simulated_awg,
+                                                 simulated_lecroy,
+                                                 simulated_psa)
+from hqc_meas.instruments.visa.agilent_pna import (AgilentPNA,
+                                                   AgilentPNAChannel)
+from hqc_meas.instruments.visa.agilent_psa import AgilentPSA
+from hqc_meas.instruments.visa.le_croy_64xi import LeCroy64Xi
+from hqc_meas.instruments.visa.tektro_awg import AWG
+
+from ..util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class TestSimulatedInstrument(object):
+
+    def setup(self):
+        self.instr = SimulatedInstrument({'*IDN?': 'SIM'},
+                                         {'FREQ:CENT': '1e9'})
+        self.instr.open()
+
+    def test_settings(self):
+        # Test values written are read back, in base units.
+        instr = self.instr
+        assert_equal(instr.ask('freq:cent?'), '1e9')
+        instr.write(':FREQ:CENT 5 GHz')
+        assert_equal(instr.ask_for_values('FREQ:CENT?'), [5e9])
+
+    def test_program_message(self):
+        # Test the units of a message are processed in order, binary blocks
+        # being skipped.
+        instr = self.instr
+        instr.write("DATA 'a;b',#13;;;;:MODE FAST;*IDN?;:MODE?")
+        assert_equal(instr.read(), 'SIM;FAST')
+        assert_equal((instr.messages, instr.commands), (2, 4))
+        assert_true('DATA' not in instr.settings)
+
+    def test_binary_values(self):
+        # Test decoding values sent in a binary block.
+        instr = self.instr
+        instr.responses['DATA?'] = binary_block('\x00\x00\x80\x3f')
+        assert_equal(instr.ask_for_values('DATA?', 1), [1.0])
+
+    @raises(VisaIOError)
+    def test_timeout(self):
+        # Test reading the answer to an unknown query.
+        self.instr.ask('UNKNOWN?')
+
+    @raises(VisaIOError)
+    def test_closed(self):
+        # Test a closed session cannot be used.
+        self.instr.close()
+        self.instr.write('*RST')
+
+
+def test_pna_trace():
+    # Test reading a trace and batching the settings of a PNA.
+    instr = simulated_pna(points=11)
+    pna = open_simulated_driver(AgilentPNA, instr)
+    channel = AgilentPNAChannel(pna, 1)
+    assert_equal(len(channel.read_raw_data()), 11)
+    assert_true(instr.bytes_read > 88)
+
+    instr.reset_stats()
+    with pna.batch():
+        channel.if_bandwidth = 100
+        channel.sweep_points = 21
+    assert_equal(instr.messages, 2)
+    assert_equal(channel.sweep_points, 21)
+
+
+def test_pna_reopen():
+    # Test a driver using a simulated instrument can reconnect.
+    instr = simulated_pna()
+    pna = open_simulated_driver(AgilentPNA, instr)
+    pna.reopen_connection()
+    assert_true(pna.connected())
+    pna.close_connection()
+    assert_true(instr.closed)
+
+
+def test_awg_upload():
+    # Test the waveforms sent to an AWG are accounted for.
+    instr = simulated_awg()
+    awg = open_simulated_driver(AWG, instr)
+    awg.upload_waveform('Seq_0', bytearray(1000))
+    assert_true(instr.bytes_written > 1000)
+    assert_equal(instr.commands, 4)
+
+
+def test_lecroy_waveform():
+    # Test reading a waveform from a LeCroy oscilloscope.
+    instr = simulated_lecroy(points=100)
+    lecroy = open_simulated_driver(LeCroy64Xi, instr)
+    channel = lecroy.get_channel('1')
+    for hires in ('False', 'True'):
+        data = channel.read_data_cfast(hires)
+        assert_equal(len(data['Volt_Value_array']), 100)
+
+
+def test_psa_settings():
+    # Test the settings of a PSA are verified.
+    instr = simulated_psa()
+    psa = open_simulated_driver(AgilentPSA, instr)
+    assert_equal(psa.mode, 'SA')
+    with psa.batch():
+        psa.center_frequency = 2.5
+        psa.average_count_SA = 10
+    assert_equal(psa.center_frequency, 2.5)
@@ -10,7 +10,8 @@ from hqc_meas.instruments.driver_tools import (BaseInstrument,
                                                instrument_property,
                                                InstrIOError,
                                                secure_communication)
-from nose.tools import assert_is_instance, assert_equal, raises
+from nose.tools import (assert_is_instance, assert_equal, raises,
+                        assert_true)
 
 from ..util import complete_line
 
@@ -246,6 +247,96 @@ def test_check_instrument_cache2():
     assert_equal(a.check_cache(['value1']), {'value1': 5})
 
 
+class DependentInstr(Instr):
+
+    caching_permissions = {'value1': True, 'value3': True}
+    cache_dependencies = {'value2': ('value1',), 'value1': ['value3']}
+
+    @instrument_property
+    def value3(self):
+        return self._value1 + self._value2
+
+
+def test_instr_property_index():
+    """ Test the instrument properties are indexed at class creation.
+
+    """
+    assert_equal(Instr._instrument_properties,
+                 frozenset(['value1', 'value2']))
+    assert_equal(DependentInstr._cache_dependents,
+                 {'value1': frozenset(['value3']),
+                  'value2': frozenset(['value1', 'value3'])})
+
+
+@raises(ValueError)
+def test_instr_unknown_dependency():
+    class WrongInstr(Instr):
+        cache_dependencies = {'value1': ('value4',)}
+
+
+def test_instr_cache_dependencies1():
+    """ Test setting a property invalidates the ones depending on it.
+
+    """
+    a = DependentInstr({})
+    assert_equal(a.value3, 3)
+    a.value1 = 5
+    assert_equal(a._cache, {'value1': 5})
+    assert_equal(a.value3, 7)
+    # Setting a non cached property also clears its dependents.
+    a.value2 = 1
+    assert_equal(a._cache, {})
+
+
+def test_instr_cache_dependencies2():
+    """ Test clearing the cache of a property clears its dependents.
+
+    """
+    a = DependentInstr({}, caching_permissions={'value2': True})
+    assert_equal(a.value3, 3)
+    assert_equal(a.value2, 2)
+    a.clear_cache(['value1'])
+    assert_equal(a._cache, {'value2': 2})
+
+
+def test_instr_cache_timeout():
+    """ Test the cached value of a property with a timeout expires.
+
+    """
+    a = Instr({})
+    a.cache_timeouts = {'value1': 10}
+    assert_equal(a.value1, 1)
+    a._value1 = 2
+    assert_equal(a.value1, 1)
+    assert_equal(a.check_cache(['value1']), {'value1': 1})
+
+    a.cache_timeouts = {'value1': -1}
+    a.clear_cache(['value1'])
+    assert_equal(a.value1, 2)
+    a._value1 = 3
+    assert_equal(a.check_cache(), {})
+    assert_equal(a.check_cache(['value1']), {'value1': None})
+    assert_equal(a.value1, 3)
+    # An expired value does not prevent setting the property.
+    a._value1 = 0
+    a.value1 = 3
+    assert_equal(a._value1, 3)
+
+
+def test_instr_cache_counters():
+    """ Test the counting of the cache hits and misses.
+
+    """
+    a = Instr({})
+    a.value1
+    a.value1
+    a.value2
+    assert_equal((a.cache_hits, a.cache_misses), (1, 1))
+    a.clear_cache()
+    a.value1
+    assert_true(a.cache_misses == 2)
+
+
 def test_secure_communication1():
     # Test securing a communication
     i = Instr({})
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_visa_tools.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import (assert_equal, assert_false, assert_in, assert_not_in,
+                        raises)
+import numpy as np
+
+from hqc_meas.instruments.driver_tools import (InstrIOError,
+                                               instrument_property)
+from hqc_meas.instruments.visa_tools import (parse_binary_block,
+                                             VisaInstrument, InstrBatchError)
+
+from hqc_meas.instruments.simulated_visa import (SimulatedInstrument,
+                                                 binary_block,
+                                                 open_simulated_driver)
+from ..util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+def test_definite_block():
+    values = np.arange(100, dtype='<f8')
+    data = parse_binary_block(binary_block(values.tostring()) + '\n', '<f8')
+    np.testing.assert_array_equal(data, values)
+    assert_false(data.flags.writeable)
+
+
+def test_indefinite_block():
+    values = np.arange(10, dtype='<f4')
+    data = parse_binary_block('#0' + values.tostring() + '\n', '<f4')
+    np.testing.assert_array_equal(data, values)
+
+
+def test_empty_block():
+    assert_equal(len(parse_binary_block('#10\n', '<f4')), 0)
+
+
+@raises(InstrIOError)
+def test_truncated_block():
+    parse_binary_block('#3100' + 'a'*20, '<f4')
+
+
+@raises(InstrIOError)
+def test_invalid_block():
+    parse_binary_block('1.0,2.0\n', '<f4')
+
+
+def _check(value, answer):
+    if float(answer) != value:
+        raise InstrIOError('Wrong value')
+
+
+class BatchDriver(VisaInstrument):
+    """Driver whose properties opt in batching.
+
+    """
+    caching_permissions = {'frequency': True, 'power': True, 'output': True}
+
+    @instrument_property
+    def frequency(self):
+        return float(self.ask('FREQ?'))
+
+    @frequency.setter
+    def frequency(self, value):
+        self.write('FREQ {}'.format(value))
+        self.verify('FREQ?', lambda a: _check(value, a), 'frequency')
+
+    @instrument_property
+    def power(self):
+        return float(self.ask('SOUR:POW?'))
+
+    @power.setter
+    def power(self, value):
+        self.write('SOUR:POW {}'.format(value))
+        self.verify('SOUR:POW?', lambda a: _check(value, a), 'power')
+
+    @instrument_property
+    def output(self):
+        return self.ask('OUTP?')
+
+    @output.setter
+    def output(self, value):
+        self.write('OUTP {}'.format(value))
+
+
+class TestBatch(object):
+
+    def setup(self):
+        self.instr = SimulatedInstrument({'*IDN?': 'SIM'}, record=True)
+        self.driver = open_simulated_driver(BatchDriver, self.instr)
+
+    def test_verify_outside_batch(self):
+        # Test the value is checked immediately.
+        self.driver.frequency = 1
+        assert_equal(self.instr.written, ['FREQ 1', 'FREQ?'])
+
+    def test_single_message(self):
+        # Test commands and checks are sent in one message.
+        message = 'FREQ 1;:SOUR:POW 2;:FREQ?;:SOUR:POW?'
+        with self.driver.batch():
+            self.driver.frequency = 1
+            with self.driver.batch():
+                self.driver.power = 2
+            assert_equal(self.instr.written, [])
+
+        assert_equal(self.instr.written, [message])
+
+    def test_query_in_batch(self):
+        # Test queued commands are sent before a query.
+        with self.driver.batch():
+            self.driver.write('*RST')
+            self.driver.ask('*IDN?')
+            self.driver.write('OUTP ON')
+
+        assert_equal(self.instr.written, ['*RST', '*IDN?', 'OUTP ON'])
+
+    def test_failed_check(self):
+        # Test the error is attributed to the property and its cache cleared.
+        self.instr.responses['SOUR:POW?'] = '3'
+        try:
+            with self.driver.batch():
+                self.driver.frequency = 1
+                self.driver.power = 2
+        except InstrBatchError as e:
+            assert_equal(list(e.errors), ['power'])
+        else:
+            raise AssertionError('No error raised')
+
+        assert_in('frequency', self.driver._cache)
+        assert_not_in('power', self.driver._cache)
+
+    def test_error_in_batch(self):
+        # Test the cache of the properties whose command was not sent is
+        # cleared when an error occurs in the batch.
+        try:
+            with self.driver.batch():
+                self.driver.output = 'ON'
+                self.driver.ask('*IDN?')
+                self.driver.frequency = 1
+                self.driver.power = 2
+                raise ValueError()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('No error raised')
+
+        assert_equal(self.instr.written, ['OUTP ON', '*IDN?'])
+        assert_in('output', self.driver._cache)
+        assert_not_in('frequency', self.driver._cache)
+        assert_not_in('power', self.driver._cache)
+
+    @raises(InstrBatchError)
+    def test_missing_answers(self):
+        # Test a wrong number of answers makes all checks fail.
+        self.instr.responses['SOUR:POW?'] = lambda instr, query: None
+        with self.driver.batch():
+            self.driver.frequency = 1
+            self.driver.power = 2
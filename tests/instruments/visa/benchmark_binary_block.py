@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : benchmark_binary_block.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from timeit import default_timer
+import numpy as np
+
+from hqc_meas.instruments.simulated_visa import (SimulatedInstrument,
+                                                 binary_block,
+                                                 open_simulated_driver)
+from hqc_meas.instruments.visa.agilent_pna import (AgilentPNA,
+                                                   AgilentPNAChannel)
+
+
+POINTS = 200000
+
+FORMATS = {'REAL,32': '<f4', 'REAL,64': '<f8'}
+
+
+def best_time(func, repeat=5):
+    times = []
+    for i in range(repeat):
+        tic = default_timer()
+        func()
+        times.append(default_timer() - tic)
+    return min(times)
+
+
+class BenchmarkTraceTransfer(object):
+    """ Compare the decoding of a 200k points complex trace sent by a
+    simulated PNA by the conversion to a list of floats (former
+    implementation) and by the binary block reader.
+
+    """
+
+    def setup(self):
+        self.pnas = {}
+        for data_format, dtype in FORMATS.items():
+            trace = np.random.rand(2*POINTS).astype(dtype)
+            responses = {'CALCulate1:DATA? SDATA':
+                         binary_block(trace.tostring()),
+                         'CALC1:PARameter:SELect?': '"CH1_S21_1"'}
+            instr = SimulatedInstrument(responses,
+                                        {'FORMAT:DATA': data_format})
+            self.pnas[data_format] = open_simulated_driver(AgilentPNA, instr)
+
+    def benchmark_legacy(self):
+        for data_format in sorted(FORMATS):
+            pna = self.pnas[data_format]
+            code = 1 if data_format == 'REAL,32' else 3
+
+            def read():
+                aux = np.array(pna.ask_for_values('CALCulate1:DATA? SDATA',
+                                                  code))
+                return aux[::2] + 1j*aux[1::2]
+
+            duration = best_time(read)
+            print 'Legacy', data_format, POINTS/duration, 'points/s'
+
+    def benchmark_binary_block(self):
+        for data_format in sorted(FORMATS):
+            channel = AgilentPNAChannel(self.pnas[data_format], 1)
+            duration = best_time(channel.read_raw_data)
+            print 'Binary block', data_format, POINTS/duration, 'points/s'
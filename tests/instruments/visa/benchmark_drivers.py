@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : benchmark_drivers.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""Throughput of the VISA drivers talking to simulated instruments.
+
+Each benchmark reports the number of commands (and queries) sent per second
+and the amount of data exchanged per second, the simulated instruments having
+the latency and bandwidth of a typical LAN connection.
+
+"""
+from timeit import default_timer
+import numpy as np
+
+from hqc_meas.instruments.simulated_visa import (open_simulated_driver,
+                                                 simulated_pna,
+                                                 simulated_awg,
+                                                 simulated_lecroy,
+                                                 simulated_psa)
+from hqc_meas.instruments.visa.agilent_pna import (AgilentPNA,
+                                                   AgilentPNAChannel)
+from hqc_meas.instruments.visa.agilent_psa import AgilentPSA
+from hqc_meas.instruments.visa.le_croy_64xi import LeCroy64Xi
+from hqc_meas.instruments.visa.tektro_awg import AWG
+
+
+#: Time (in s) needed by the simulated instruments to process a message.
+LATENCY = 5e-4
+
+#: Bandwidth (in bytes per second) of the connection to the instruments.
+BANDWIDTH = 10e6
+
+REPEAT = 20
+
+
+def measure(name, instrument, func, repeat=REPEAT):
+    """Call a function several times and report the throughput.
+
+    """
+    instrument.reset_stats()
+    tic = default_timer()
+    for i in range(repeat):
+        func(i)
+    duration = default_timer() - tic
+    size = instrument.bytes_written + instrument.bytes_read
+    print '{:<34} {:>8.1f} commands/s {:>8.2f} MB/s'.format(
+        name, instrument.commands/duration, size/duration/1e6)
+
+
+class BenchmarkPNA(object):
+    """ Transfer of 20001 points complex traces and setting of the sweep.
+
+    """
+
+    def setup(self):
+        self.instr = simulated_pna(20001, latency=LATENCY,
+                                   bandwidth=BANDWIDTH)
+        self.pna = open_simulated_driver(AgilentPNA, self.instr)
+        self.channel = AgilentPNAChannel(self.pna, 1)
+
+    def benchmark_read_trace(self):
+        measure('PNA read trace', self.instr,
+                lambda i: self.channel.read_raw_data())
+
+    def settings(self, i):
+        channel = self.channel
+        channel.if_bandwidth = 100 + i
+        channel.sweep_points = 1001 + i
+        channel.sweep_type = 'LOG' if i % 2 else 'LIN'
+
+    def benchmark_settings(self):
+        measure('PNA settings', self.instr, self.settings)
+
+    def benchmark_batched_settings(self):
+        def batched(i):
+            with self.pna.batch():
+                self.settings(i)
+
+        measure('PNA batched settings', self.instr, batched)
+
+
+class BenchmarkAWG(object):
+    """ Upload of 1 MB waveforms.
+
+    """
+
+    def setup(self):
+        self.instr = simulated_awg(latency=LATENCY, bandwidth=BANDWIDTH)
+        self.awg = open_simulated_driver(AWG, self.instr)
+        self.waveforms = [bytearray(np.random.bytes(10**6))
+                          for i in range(REPEAT)]
+
+    def benchmark_upload(self):
+        awg = self.awg
+
+        def upload(i):
+            awg.upload_waveform('Seq_{}'.format(i), self.waveforms[i])
+
+        measure('AWG upload', self.instr, upload)
+
+
+class BenchmarkLeCroy(object):
+    """ Transfer of 10000 points waveforms.
+
+    """
+
+    def setup(self):
+        self.instr = simulated_lecroy(10000, latency=LATENCY,
+                                      bandwidth=BANDWIDTH)
+        lecroy = open_simulated_driver(LeCroy64Xi, self.instr)
+        self.channel = lecroy.get_channel('1')
+
+    def benchmark_read_waveform(self):
+        for hires in ('False', 'True'):
+            measure('LeCroy read waveform hires={}'.format(hires), self.instr,
+                    lambda i: self.channel.read_data_cfast(hires), 5)
+
+
+class BenchmarkPSA(object):
+    """ Transfer of 1001 points traces (ASCII) and setting of the sweep.
+
+    """
+
+    def setup(self):
+        self.instr = simulated_psa(1001, latency=LATENCY, bandwidth=BANDWIDTH)
+        self.psa = open_simulated_driver(AgilentPSA, self.instr)
+
+    def benchmark_read_trace(self):
+        measure('PSA read trace', self.instr,
+                lambda i: self.psa.read_data(1))
+
+    def settings(self, i):
+        psa = self.psa
+        psa.center_frequency = 1 + i*1e-3
+        # Keep the number of points of the trace.
+        psa.sweep_points_SA = 1001
+        psa.average_count_SA = 1 + i
+
+    def benchmark_settings(self):
+        measure('PSA settings', self.instr, self.settings)
+
+    def benchmark_batched_settings(self):
+        def batched(i):
+            with self.psa.batch():
+                self.settings(i)
+
+        measure('PSA batched settings', self.instr, batched)
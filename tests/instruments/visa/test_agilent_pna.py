@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_agilent_pna.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal
+import numpy as np
+
+from hqc_meas.instruments.simulated_visa import (SimulatedInstrument,
+                                                 binary_block,
+                                                 open_simulated_driver)
+from hqc_meas.instruments.visa.agilent_pna import (AgilentPNA,
+                                                   AgilentPNAChannel)
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class TestDataTransfer(object):
+
+    def setup(self):
+        self.trace = np.random.rand(20)
+        self.block = binary_block(self.trace.astype('<f4').tostring())
+
+    def make_channel(self, data_format):
+        responses = {'CALCulate1:DATA? FDATA': self.block,
+                     'CALCulate1:DATA? SDATA': self.block,
+                     'CALC1:PARameter:SELect?': '"CH1_S21_1"'}
+        instr = SimulatedInstrument(responses, {'FORMAT:DATA': data_format})
+        pna = open_simulated_driver(AgilentPNA, instr)
+        return AgilentPNAChannel(pna, 1)
+
+    def test_formatted_data(self):
+        channel = self.make_channel('REAL,32')
+        data = channel.read_formatted_data()
+        assert_equal(data.dtype, np.dtype('<f4'))
+        np.testing.assert_allclose(data, self.trace, rtol=1e-6)
+
+    def test_raw_data(self):
+        channel = self.make_channel('REAL,32')
+        data = channel.read_raw_data()
+        assert_equal(data.dtype, np.dtype('<c8'))
+        expected = self.trace[::2] + 1j*self.trace[1::2]
+        np.testing.assert_allclose(data, expected, rtol=1e-6)
+
+    def test_formatted_raw_data(self):
+        channel = self.make_channel('REAL,32')
+        data = channel.read_and_format_raw_data('MLIN')
+        expected = np.abs(self.trace[::2] + 1j*self.trace[1::2])
+        np.testing.assert_allclose(data, expected, rtol=1e-6)
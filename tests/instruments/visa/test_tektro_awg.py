@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_tektro_awg.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal
+
+from hqc_meas.instruments.simulated_visa import (open_simulated_driver,
+                                                 simulated_awg)
+from hqc_meas.instruments.visa.tektro_awg import AWG
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+def sent_waveforms(driver):
+    return [m for m in driver._driver.written if m.startswith('WLIS:WAV:DATA')]
+
+
+class TestWaveformRegistry(object):
+
+    def setup(self):
+        self.driver = open_simulated_driver(AWG, simulated_awg(record=True))
+
+    def test_upload_once(self):
+        driver = self.driver
+        zeros = bytearray(200)
+        assert_equal(driver.upload_waveform('Seq_0', zeros), 'Seq_0')
+        assert_equal(driver.upload_waveform('Seq_1', bytearray(200)), 'Seq_0')
+        assert_equal(driver.upload_waveform('Seq_2', bytearray(100)), 'Seq_2')
+
+        assert_equal(len(sent_waveforms(driver)), 2)
+        assert_equal(driver.upload_stats, {'uploads': 2, 'hits': 1,
+                                           'bytes_sent': 300,
+                                           'bytes_saved': 200})
+
+    def test_name_collision(self):
+        # Test a waveform used by the current sequence is not overwritten.
+        driver = self.driver
+        driver.upload_waveform('Seq_0', bytearray(10))
+        assert_equal(driver.upload_waveform('Seq_0', bytearray([1]*10)),
+                     'Seq_0_1')
+        assert_equal(driver.upload_waveform('Seq_0', bytearray(10)), 'Seq_0')
+
+    def test_name_reuse(self):
+        # Test the waveforms no longer used are overwritten.
+        driver = self.driver
+        for i in range(3):
+            driver.clear_sequence(keep_waveforms=True)
+            assert_equal(driver.upload_waveform('Seq_0', bytearray([i]*10)),
+                         'Seq_0')
+        assert_equal(len(driver._waveforms), 1)
+        assert_equal(driver.upload_waveform('Seq_1', bytearray(10)), 'Seq_1')
+
+    def test_overwritten_by_to_send_initialized(self):
+        driver = self.driver
+        driver.upload_waveform('Seq_0', bytearray(10))
+        driver.to_send('Seq_0', bytearray([1]*10), True)
+        assert_equal(driver.upload_waveform('Seq_1', bytearray(10)), 'Seq_1')
+
+    def test_overwritten_by_to_send(self):
+        driver = self.driver
+        driver.upload_waveform('Seq_0', bytearray(10))
+        driver.to_send('Seq_0', bytearray([1]*10), False)
+        assert_equal(driver.upload_waveform('Seq_1', bytearray(10)), 'Seq_1')
+
+    def test_clear_sequence(self):
+        driver = self.driver
+        driver.upload_waveform('Seq_0', bytearray(10))
+        driver.clear_sequence(keep_waveforms=True)
+        assert_equal(driver.upload_waveform('Seq_1', bytearray(10)), 'Seq_0')
+        driver.clear_sequence()
+        assert_equal(driver.upload_waveform('Seq_1', bytearray(10)), 'Seq_1')
+        assert_equal(len(sent_waveforms(driver)), 2)
+
+    def test_close_connection(self):
+        driver = self.driver
+        instr = driver._driver
+        driver.upload_waveform('Seq_0', bytearray(10))
+        driver.close_connection()
+        assert_equal(instr.closed, True)
+
+        driver.open_connection()
+        driver.upload_waveform('Seq_1', bytearray(10))
+        assert_equal(len(sent_waveforms(driver)), 2)
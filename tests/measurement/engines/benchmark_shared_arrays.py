@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : benchmark_shared_arrays.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from multiprocessing.queues import Queue
+from tempfile import gettempdir
+from timeit import default_timer
+import os
+import numpy as np
+
+from hqc_meas.measurement.engines.shared_arrays import ArrayRingBuffer
+
+
+SIZES = (1, 10, 100)
+
+
+def throughput(func, nbytes, repeat=5):
+    best = min(_timed(func) for i in range(repeat))
+    return nbytes/best/2**20
+
+
+def _timed(func):
+    tic = default_timer()
+    func()
+    return default_timer() - tic
+
+
+class BenchmarkArrayTransfer(object):
+    """ Compare the throughput (in MB/s) of sending arrays to the monitors
+    through the queue (pickling) and through the shared ring buffer.
+
+    """
+
+    def setup(self):
+        self.path = os.path.join(gettempdir(), 'benchmark.buffer')
+        self.buffer = ArrayRingBuffer(self.path, 2*max(SIZES)*2**20)
+        self.reader = ArrayRingBuffer(self.path)
+        self.queue = Queue()
+
+    def teardown(self):
+        self.buffer.close()
+        self.reader.close(remove=True)
+
+    def benchmark_queue(self):
+        for size in SIZES:
+            data = np.random.rand(size*2**20/8)
+
+            def transfer():
+                self.queue.put(('root/data', data))
+                self.queue.get()
+
+            print 'Queue', size, 'MB', throughput(transfer, data.nbytes)
+
+    def benchmark_shared_buffer(self):
+        for size in SIZES:
+            data = np.random.rand(size*2**20/8)
+
+            def transfer():
+                self.queue.put(('root/data', self.buffer.write(data)))
+                desc = self.queue.get()[1]
+                self.reader.read(desc)
+                self.reader.release(desc)
+
+            print 'Shared buffer', size, 'MB', throughput(transfer,
+                                                          data.nbytes)
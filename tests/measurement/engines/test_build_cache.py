@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_build_cache.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from atom.api import Int, Value
+from configobj import ConfigObj
+from nose.tools import (assert_equal, assert_is, assert_is_not, assert_true,
+                        assert_raises)
+
+from hqc_meas.tasks.api import RootTask, SimpleTask
+from hqc_meas.measurement.engines.process_engine.build_cache import (
+    BuildCache, analyse_config, apply_preferences)
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class CachedTask(SimpleTask):
+    """ Task with a preference and some runtime state.
+
+    """
+    value = Int().tag(pref=True)
+
+    state = Int().tag(runtime=True)
+
+    #: Object built along the task (not a task or an interface).
+    built = Value()
+
+
+DEPS = {'tasks': {'CachedTask': CachedTask, 'RootTask': RootTask}}
+
+
+def make_config(value, name='task'):
+    root = RootTask()
+    root.children_task.append(CachedTask(task_name=name, value=value))
+    root.update_preferences_from_members()
+    return ConfigObj(root.task_preferences.dict())
+
+
+class TestBuildCache(object):
+
+    def setup(self):
+        self.cache = BuildCache(2)
+
+    def test_analyse_config(self):
+        key1, values1 = analyse_config(make_config(1))
+        key2, values2 = analyse_config(make_config(2))
+        assert_equal(key1, key2)
+        assert_equal(values1[('children_task_0', 'value')], '1')
+        assert_true(key1 != analyse_config(make_config(1, 'other'))[0])
+
+    def test_reuse(self):
+        root, reused = self.cache.get_root(make_config(1), DEPS)
+        assert_equal(reused, False)
+        root.task_database.prepare_for_running()
+        root.children_task[0].state = 2
+        self.cache.store(root)
+
+        new, reused = self.cache.get_root(make_config(3), DEPS)
+        assert_equal(reused, True)
+        assert_is(new, root)
+        assert_equal(new.task_database.running, False)
+        assert_equal(new.children_task[0].value, 3)
+        assert_equal(new.children_task[0].state, 0)
+        assert_equal((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_build_time_state(self):
+        # Test the members set when building the tasks are kept.
+        root, _ = self.cache.get_root(make_config(1), DEPS)
+        built = object()
+        root.children_task[0].built = built
+        self.cache.store(root)
+        new, _ = self.cache.get_root(make_config(2), DEPS)
+        assert_is(new.children_task[0].built, built)
+
+    def test_discard(self):
+        root, _ = self.cache.get_root(make_config(1), DEPS)
+        self.cache.discard(root)
+        new, reused = self.cache.get_root(make_config(1), DEPS)
+        assert_equal(reused, False)
+        assert_is_not(new, root)
+
+    def test_eviction(self):
+        for name in ('a', 'b', 'c'):
+            root, _ = self.cache.get_root(make_config(1, name), DEPS)
+            self.cache.store(root)
+        _, reused = self.cache.get_root(make_config(1, 'a'), DEPS)
+        assert_equal(reused, False)
+        _, reused = self.cache.get_root(make_config(1, 'c'), DEPS)
+        assert_equal(reused, True)
+
+
+def test_apply_preferences_not_task():
+    # Test only the preferences of tasks and interfaces are updated in place.
+    root = RootTask()
+    root.children_task.append(CachedTask(task_name='task', built=object()))
+    assert_raises(ValueError, apply_preferences, root,
+                  {('children_task_0', 'built', 'value'): '1'})
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_pool_engine.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal, assert_is, assert_is_not, assert_raises
+
+from hqc_meas.measurement.engines.pool_engine.engine import PoolEngine
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class TestPoolEngine(object):
+
+    def setup(self):
+        self.engine = PoolEngine()
+
+    def test_idle_worker(self):
+        engine = self.engine
+        worker1 = engine._get_idle_worker()
+        engine._running['a'] = worker1
+        worker2 = engine._get_idle_worker()
+        assert_is_not(worker1, worker2)
+        assert_equal(worker2.process_name, 'MeasureProcess-2')
+
+        engine._running['b'] = worker2
+        assert_raises(RuntimeError, engine._get_idle_worker)
+
+    def test_notifications_forwarding(self):
+        engine = self.engine
+        worker = engine._get_idle_worker()
+        engine._running['a'] = worker
+        assert_is(engine.news_source('a'), worker)
+
+        done = []
+        engine.observe('done', lambda change: done.append(change['value']))
+        worker.measure_status = ('RUNNING', 'Measure running.')
+        assert_equal(engine.measure_status,
+                     ('RUNNING', 'Measure running.', 'a'))
+
+        worker.done = ('COMPLETED', 'Measure a succeeded')
+        assert_equal(done, [('COMPLETED', 'Measure a succeeded', 'a')])
+        assert_is(engine.news_source('a'), engine)
+        assert_is(engine._get_idle_worker(), worker)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_session_pool.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import (assert_equal, assert_is, assert_is_not, assert_true,
+                        assert_false)
+
+from hqc_meas.instruments.driver_tools import BaseInstrument, InstrIOError
+from hqc_meas.measurement.engines.process_engine.session_pool import (
+    SessionPool)
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class PooledDriver(BaseInstrument):
+    """ Driver recording the calls made by the pool.
+
+    """
+    caching_permissions = {'value': True}
+
+    def __init__(self, connection_info, caching_allowed=True,
+                 caching_permissions={}, auto_open=True):
+        super(PooledDriver, self).__init__(connection_info, caching_allowed,
+                                           caching_permissions, auto_open)
+        self.is_connected = True
+        self.failing = False
+        self.modified = False
+
+    def close_connection(self):
+        self.is_connected = False
+
+    def connected(self):
+        return self.is_connected
+
+    def check_connection(self):
+        if self.failing:
+            raise InstrIOError()
+        return self.modified
+
+
+CONFIG = {'address': '1'}
+
+
+class TestSessionPool(object):
+
+    def setup(self):
+        self.pool = SessionPool()
+
+    def release(self, driver, valid=True):
+        driver.owner = 'task'
+        driver._cache['value'] = 1
+        self.pool.release('instr', driver, valid)
+
+    def test_reuse(self):
+        # Test a healthy driver is reused along with its cache.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        assert_true(driver.connected())
+
+        new = self.pool.acquire('instr', PooledDriver, dict(CONFIG))
+        assert_is(new, driver)
+        assert_equal(new.owner, '')
+        assert_equal(new._cache, {'value': 1})
+        assert_equal((self.pool.hits, self.pool.misses), (1, 1))
+
+    def test_modified_instrument(self):
+        # Test the cache is cleared if the instrument may have been modified.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        driver.modified = True
+        assert_true(self.pool.has_session('instr', PooledDriver, CONFIG))
+
+        new = self.pool.acquire('instr', PooledDriver, CONFIG)
+        assert_is(new, driver)
+        assert_equal(new._cache, {})
+
+        # Once cleared the cache is kept if the instrument did not change.
+        driver.modified = False
+        self.release(new)
+        assert_equal(self.pool.acquire('instr', PooledDriver, CONFIG)._cache,
+                     {'value': 1})
+
+    def test_failing_check(self):
+        # Test a driver failing to communicate is replaced.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        driver.failing = True
+        new = self.pool.acquire('instr', PooledDriver, CONFIG)
+        assert_is_not(new, driver)
+        assert_false(driver.connected())
+        assert_equal(new._cache, {})
+
+    def test_invalid_state(self):
+        # Test the cache is cleared when the measure did not complete.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver, False)
+        assert_equal(driver._cache, {})
+        assert_is(self.pool.acquire('instr', PooledDriver, CONFIG), driver)
+
+    def test_unhealthy(self):
+        # Test a disconnected driver is replaced.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        driver.is_connected = False
+        assert_false(self.pool.has_session('instr', PooledDriver, CONFIG))
+        assert_is_not(self.pool.acquire('instr', PooledDriver, CONFIG),
+                      driver)
+
+    def test_config_change(self):
+        # Test a driver is not reused if the profile changed.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        new = self.pool.acquire('instr', PooledDriver, {'address': '2'})
+        assert_is_not(new, driver)
+        assert_false(driver.connected())
+
+    def test_idle_timeout(self):
+        # Test drivers unused for too long are closed.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        self.pool.prune()
+        assert_true(self.pool.has_session('instr', PooledDriver, CONFIG))
+
+        self.pool.idle_timeout = 1e-9
+        self.pool.prune()
+        assert_false(driver.connected())
+        assert_false(self.pool.has_session('instr', PooledDriver, CONFIG))
+
+    def test_no_timeout(self):
+        # Test a null timeout disables the pooling.
+        self.pool.idle_timeout = 0
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        assert_false(driver.connected())
+
+    def test_invalidate(self):
+        # Test idle drivers are closed and the ones in use are not kept.
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.release(driver)
+        self.pool.invalidate(['instr'])
+        assert_false(driver.connected())
+
+        driver = self.pool.acquire('instr', PooledDriver, CONFIG)
+        self.pool.invalidate(['instr'])
+        self.release(driver)
+        assert_false(driver.connected())
+        assert_false(self.pool.has_session('instr', PooledDriver, CONFIG))
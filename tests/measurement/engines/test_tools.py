@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_tools.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal, assert_in
+from multiprocessing.queues import Queue
+from threading import Thread
+from time import sleep
+from tempfile import gettempdir
+import os
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from hqc_meas.tasks.tools.task_database import TaskDatabase
+from hqc_meas.measurement.engines.tools import MeasureSpy, put_last
+from hqc_meas.measurement.engines.shared_arrays import (ArrayRingBuffer,
+                                                        SharedArray)
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+def empty_queue(queue):
+    news = []
+    sleep(0.1)
+    while not queue.empty():
+        news.append(queue.get())
+    return news
+
+
+class TestMeasureSpy(object):
+
+    def setup(self):
+        self.database = TaskDatabase()
+        self.database.set_value('root', 'val1', 1.0)
+        self.database.set_value('root', 'val2', 1.0)
+        self.database.prepare_for_running()
+        self.queue = Queue()
+
+    def test_direct_mode(self):
+        spy = MeasureSpy(self.queue, ['root/val1'], self.database)
+        for i in range(5):
+            self.database.set_value('root', 'val1', float(i))
+            self.database.set_value('root', 'val2', float(i))
+        spy.close()
+
+        news = empty_queue(self.queue)
+        assert_equal([n[0] for n in news], ['root/val1']*5 + [''])
+        assert_equal(news[-1][1], {'updates': 5, 'coalesced': 0,
+                                   'dropped': 0})
+
+    def test_coalescing_mode(self):
+        spy = MeasureSpy(self.queue, ['root/val1'], self.database,
+                         coalesce=True, flush_rate=1.0)
+        for i in range(5):
+            self.database.set_value('root', 'val1', float(i))
+        spy.close()
+
+        news = empty_queue(self.queue)
+        assert_equal(news[0], ('root/val1', 4.0))
+        assert_equal(news[-1][1], {'updates': 5, 'coalesced': 4,
+                                   'dropped': 0})
+
+    def test_array_summary(self):
+        spy = MeasureSpy(self.queue, ['root/val1'], self.database,
+                         max_array_size=10)
+        self.database.set_value('root', 'val1', np.zeros(10))
+        spy.close()
+
+        news = empty_queue(self.queue)
+        assert_in('shape=(10,)', news[0][1])
+
+    def test_shared_array(self):
+        path = os.path.join(gettempdir(), 'test_spy.buffer')
+        buff = ArrayRingBuffer(path, 1000)
+        spy = MeasureSpy(self.queue, ['root/val1'], self.database,
+                         max_array_size=10, shared_buffer=buff)
+        self.database.set_value('root', 'val1', np.arange(10.))
+        self.database.set_value('root', 'val1', np.arange(1000.))
+        # Not enough free space as the first array was not released.
+        self.database.set_value('root', 'val1', np.arange(110.))
+        spy.close()
+
+        news = empty_queue(self.queue)
+        assert_equal(news[0][1], SharedArray(0, (10,), '<f8', 128))
+        assert_array_equal(buff.read(news[0][1]), np.arange(10.))
+        assert_in('shape=(1000,)', news[1][1])
+        assert_in('shape=(110,)', news[2][1])
+        buff.close(remove=True)
+
+
+def test_put_last():
+    # Test a message is put in a full queue by dropping the oldest ones.
+    queue = Queue(2)
+    queue.put(1)
+    queue.put(2)
+    assert_equal(put_last(queue, None), True)
+    assert_equal(empty_queue(queue), [2, None])
+
+
+def test_put_last_consumer():
+    # Test the last message reaches a consumer reading a full queue.
+    queue = Queue(3)
+    received = []
+
+    def consume():
+        while True:
+            item = queue.get(timeout=5)
+            received.append(item)
+            if item is None:
+                break
+
+    for i in range(3):
+        queue.put(i)
+    consumer = Thread(target=consume)
+    consumer.start()
+    assert_equal(put_last(queue, None), True)
+    consumer.join(5)
+    assert_equal(received[-1], None)
+
+
+class TestArrayRingBuffer(object):
+
+    def setup(self):
+        self.path = os.path.join(gettempdir(), 'test_ring.buffer')
+
+    def teardown(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def test_write_read(self):
+        writer = ArrayRingBuffer(self.path, 256)
+        reader = ArrayRingBuffer(self.path)
+        data = np.arange(6, dtype=np.complex64).reshape((2, 3))
+        desc = writer.write(data)
+        assert_array_equal(reader.read(desc), data)
+        assert_equal(writer.write(data).offset, 64)
+        writer.close()
+        reader.close()
+
+    def test_structured_array(self):
+        writer = ArrayRingBuffer(self.path, 256)
+        data = np.array([(1, 2.)], dtype=[('a', 'i4'), ('b', 'f8')])
+        desc = writer.write(data)
+        assert_equal(writer.read(desc).dtype, data.dtype)
+        assert_array_equal(writer.read(desc), data)
+        writer.close()
+
+    def test_wrap_around(self):
+        writer = ArrayRingBuffer(self.path, 192)
+        reader = ArrayRingBuffer(self.path)
+        reader.release(writer.write(np.zeros(10)))
+        assert_equal(writer.write(np.ones(10)).offset, 0)
+        writer.close()
+        reader.close()
+
+    def test_backpressure(self):
+        # Test arrays which were not released are never overwritten.
+        writer = ArrayRingBuffer(self.path, 192)
+        reader = ArrayRingBuffer(self.path)
+        first = writer.write(np.zeros(8))
+        assert_equal(writer.write(np.ones(8)).offset, 64)
+        assert_equal(writer.write(np.ones(8)), None)
+        reader.release(first)
+        assert_equal(writer.write(np.ones(8)).offset, 0)
+        writer.close()
+        reader.close()
+
+    def test_discard(self):
+        writer = ArrayRingBuffer(self.path, 192)
+        writer.discard(writer.write(np.zeros(16)))
+        assert_equal(writer.write(np.ones(16)).offset, 0)
+        writer.close()
+
+    def test_can_store(self):
+        writer = ArrayRingBuffer(self.path, 192)
+        assert_equal(writer.can_store(np.zeros(16)), True)
+        assert_equal(writer.can_store(np.zeros(17)), False)
+        assert_equal(writer.can_store(np.array([object()])), False)
+        writer.close()
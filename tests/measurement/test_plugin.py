@@ -18,6 +18,7 @@ with enaml.imports():
     from hqc_meas.utils.preferences.manifest import PreferencesManifest
     from hqc_meas.utils.dependencies.manifest import DependenciesManifest
     from hqc_meas.measurement.manifest import MeasureManifest
+    from hqc_meas.measurement.measure import Measure
 
     from .dummies import (DummyCheck1, DummyCheck1bis, DummyCheck2,
                           DummyCheck3, DummyCheck4,
@@ -483,6 +484,27 @@ class TestPluginCoreFunctionalities(object):
         self.workbench.register(DummyEngine4())
         self.workbench.get_plugin(u'hqc_meas.measure')
 
+    def test_find_next_measure(self):
+        """ Test that measures conflicting with the running ones are skipped.
+
+        """
+        self.workbench.register(MeasureManifest())
+        plugin = self.workbench.get_plugin(u'hqc_meas.measure')
+
+        running = Measure(name='running', status='RUNNING',
+                          store={'profiles': ['p1']})
+        conflicting = Measure(name='conflicting', status='READY',
+                              store={'profiles': ['p1', 'p2']})
+        same_name = Measure(name='running', status='READY')
+        free = Measure(name='free', status='READY',
+                       store={'profiles': ['p3']})
+        plugin.enqueued_measures = [running, conflicting, same_name, free]
+
+        assert_equal(plugin.find_next_measure(), running)
+
+        plugin.running_measures = {'running': running}
+        assert_equal(plugin.find_next_measure(), free)
+
     def test_selected_engine1(self):
         """ Test selected engine from preferences is kept if found.
 
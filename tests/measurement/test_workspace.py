@@ -1012,8 +1012,9 @@ class TestMeasureSpace(object):
         plugin.engine_instance.allow_stop = False
         workspace.stop_current_measure()
 
-        # Check the plugin flags.
-        assert_in('stop_attempt', plugin.flags)
+        # Check the stop attempt is recorded for this measure only.
+        assert_equal(plugin.stop_attempts, [measure1.name])
+        assert_equal(plugin.flags.count('processing'), 1)
 
         # Force stop the measure before it completes.
         workspace.force_stop_measure()
@@ -1029,6 +1030,7 @@ class TestMeasureSpace(object):
 
         # Check plugin state.
         assert_false(plugin.flags)
+        assert_false(plugin.stop_attempts)
         assert_false(plugin.engine_instance.running)
 
     def test_exit_processing(self):
@@ -1054,8 +1056,9 @@ class TestMeasureSpace(object):
         plugin.engine_instance.allow_stop = False
         workspace.stop_current_measure()
 
-        # Check the plugin flags.
-        assert_in('stop_attempt', plugin.flags)
+        # Check the stop attempt is recorded for this measure only.
+        assert_equal(plugin.stop_attempts, [measure1.name])
+        assert_equal(plugin.flags.count('processing'), 1)
 
         # Force stop the processing.
         workspace.force_stop_processing()
@@ -5,6 +5,7 @@
 # license : MIT license
 # =============================================================================
 from functools import partial
+from itertools import cycle
 from timeit import repeat
 
 
@@ -13,6 +14,10 @@ def time(*args, **kwargs):
     kwargs['repeat'] = 100
     return min(repeat(*args, **kwargs))/kwargs['number']
 
+
+def time_long(func):
+    return min(repeat(func, number=5, repeat=10))/5
+
 from hqc_meas.pulses.base_sequences import RootSequence, Sequence
 from hqc_meas.pulses.pulse import Pulse
 from hqc_meas.pulses.sequences.conditional_sequence import ConditionalSequence
@@ -155,3 +160,32 @@ class BenchmarkCompilation(object):
 
         print 'Conditional seq 2', time(partial(self.root.compile_sequence,
                                                 False))
+
+    def benchmark_incremental_compilation(self):
+        # Compare recompiling a 100 pulses sequence after changing a variable
+        # used by all pulses or by a single one.
+        self.root.external_vars = {'a': 1.0, 'amp': 0.5}
+        for i in range(100):
+            amplitude = '{amp}' if i == 99 else '0.5'
+            pulse = Pulse(kind='Analogical', def_mode='Start/Duration',
+                          def_1='{a} + ' + str(10*i), def_2='5.0',
+                          shape=SquareShape(amplitude=amplitude),
+                          modulation=Modulation(frequency='1.0',
+                                                activated=True))
+            self.root.items.append(pulse)
+
+        def recompile(name, values):
+            values = cycle(values)
+
+            def compile_sequence():
+                self.root.external_vars[name] = next(values)
+                res, pulses = self.root.compile_sequence(False)
+                for pulse in pulses:
+                    pulse.waveform
+
+            return compile_sequence
+
+        print '100 pulses, all modified', time_long(recompile('a',
+                                                             (1.0, 2.0)))
+        print '100 pulses, one modified', time_long(recompile('amp',
+                                                             (0.5, 0.25)))
@@ -20,3 +20,6 @@ class TestContext(BaseContext):
 
     def _get_sampling_time(self):
         return self.sampling
+
+    def compile_sequence(self, pulses, **kwargs):
+        return True, [p.waveform for p in pulses]
@@ -7,6 +7,7 @@
 from functools import partial
 from timeit import repeat
 from nose.tools import assert_true
+import numpy as np
 
 
 def time(*args, **kwargs):
@@ -182,3 +183,59 @@ class BenchmarkCompilation(object):
         assert_true(self.root.compile_sequence()[0])
 
         print 'Conditional seq 2', time(partial(self.root.compile_sequence))
+
+
+#: Number of samples of the long sequences (10 ms at 1 GS/s).
+LONG_SEQUENCE = 10**7
+
+
+def legacy_packing(analog, marker1, marker2):
+    # Packing used before the introduction of pack_pulses, kept as reference.
+    array = analog + marker1*(2**14) + marker2*(2**15)
+    aux = np.empty(2*len(array), dtype=np.uint8)
+    aux[::2] = array % 2**8
+    aux[1::2] = array // 2**8
+    return bytearray(aux)
+
+
+class BenchmarkLongSequence(object):
+    """ Compile a sequence of 10^7 samples on the four channels of the AWG.
+
+    """
+
+    def setup(self):
+        self.root = RootSequence()
+        self.context = AWGContext()
+        self.root.context = self.context
+        self.root.time_constrained = True
+        self.root.sequence_duration = str(LONG_SEQUENCE/1000)
+
+        items = []
+        for ch in range(1, 5):
+            for i in range(10):
+                start = 1000*i
+                items.append(Pulse(kind='Analogical',
+                                   channel='Ch{}_A'.format(ch),
+                                   def_1=str(start), def_2=str(start + 500),
+                                   shape=SquareShape(amplitude='0.5'),
+                                   modulation=Modulation(frequency='10',
+                                                         activated=True)))
+                items.append(Pulse(kind='Logical',
+                                   channel='Ch{}_M1'.format(ch),
+                                   def_1=str(start), def_2=str(start + 10)))
+        self.root.items = items
+        # Compile once so that only the context work is timed afterwards.
+        assert_true(self.root.compile_sequence()[0])
+
+    def benchmark_compilation(self):
+        duration = min(repeat(self.root.compile_sequence, number=1,
+                              repeat=5))
+        print 'Sequence of 10^7 samples, 4 channels', duration
+
+    def benchmark_legacy_packing(self):
+        analog = np.ones(LONG_SEQUENCE, dtype=np.uint16)*(2**13)
+        marker1 = np.zeros(LONG_SEQUENCE, dtype=np.int8)
+        marker2 = np.zeros(LONG_SEQUENCE, dtype=np.int8)
+        duration = min(repeat(partial(legacy_packing, analog, marker1,
+                                      marker2), number=1, repeat=5))
+        print 'Legacy packing of 10^7 samples, 1 channel', duration
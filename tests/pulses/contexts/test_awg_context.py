@@ -40,7 +40,7 @@ class TestAWGContext(object):
         sequence[1::2] = 2**5
         sequence[201:1001:2] += 2**4 + 2**3 + 4 + 2 + 1
         sequence[200:1000:2] += 255
-        assert_sequence_equal(arrays[1],
+        assert_sequence_equal(bytearray(arrays[1]),
                               bytearray(sequence))
 
     def test_compiling_M1_pulse(self):
@@ -57,7 +57,7 @@ class TestAWGContext(object):
         sequence = np.zeros(2000, dtype=np.uint8)
         sequence[1::2] = 2**5
         sequence[201:1001:2] += 2**6
-        assert_sequence_equal(arrays[1],
+        assert_sequence_equal(bytearray(arrays[1]),
                               bytearray(sequence))
 
     def test_compiling_M2_pulse(self):
@@ -86,9 +86,32 @@ class TestAWGContext(object):
         sequence = np.zeros(2000, dtype=np.uint8)
         sequence[1::2] = 2**7 + 2**6 + 2**5
         sequence[201:1001:2] -= 2**7
-        assert_sequence_equal(arrays[1],
+        assert_sequence_equal(bytearray(arrays[1]),
                               bytearray(sequence))
 
+    def test_compiling_mixed_channel(self):
+        # Analogical values and both markers share the same 16 bits words.
+        self.root.time_constrained = True
+        self.root.sequence_duration = '1'
+        pulse1 = Pulse(kind='Analogical', shape=SquareShape(amplitude='-1.0'),
+                       def_1='0.1', def_2='0.5', channel='Ch1_A')
+        pulse2 = Pulse(kind='Logical', def_1='0.2', def_2='0.6',
+                       channel='Ch1_M1')
+        pulse3 = Pulse(kind='Logical', def_1='0.3', def_2='0.4',
+                       channel='Ch1_M2')
+        self.root.items = [pulse1, pulse2, pulse3]
+
+        res, arrays = self.root.compile_sequence()
+        assert_true(res)
+        assert_true(isinstance(arrays[1], memoryview))
+
+        words = np.frombuffer(bytearray(arrays[1]), dtype='<u2')
+        expected = np.ones(1000, dtype=np.uint16)*2**13
+        expected[100:500] -= 8191
+        expected[200:600] += 2**14
+        expected[300:400] += 2**15
+        np.testing.assert_array_equal(words, expected)
+
     def test_compiling_variable_length(self):
         pulse = Pulse(kind='Logical', def_1='0.1', def_2='0.5',
                       channel='Ch1_M1')
@@ -102,7 +125,7 @@ class TestAWGContext(object):
         sequence = np.zeros(100, dtype=np.uint8)
         sequence[1::2] = 2**5
         sequence[21:101:2] += 2**6
-        assert_sequence_equal(arrays[1],
+        assert_sequence_equal(bytearray(arrays[1]),
                               bytearray(sequence))
 
     def test_too_short_fixed_length(self):
@@ -158,7 +181,7 @@ class TestAWGContext(object):
         sequence = np.zeros(2000, dtype=np.uint8)
         sequence[1::2] = 2**5
         sequence[201:1201:2] += 2**7
-        assert_sequence_equal(arrays[1],
+        assert_sequence_equal(bytearray(arrays[1]),
                               bytearray(sequence))
 
     def test_overflow_check_A(self):
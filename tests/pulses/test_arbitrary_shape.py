@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_arbitrary_shape.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import (assert_equal, assert_is, assert_true, assert_false,
+                        assert_in, assert_raises)
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+import numpy as np
+
+from hqc_meas.pulses.pulse import Pulse
+from hqc_meas.pulses.base_sequences import RootSequence
+from hqc_meas.pulses.shapes.arbitrary_shape import ArbitraryShape
+
+from .context import TestContext
+
+
+class TestArbitraryShape(object):
+
+    def setup(self):
+        self.time = np.linspace(0, 1, 11)
+
+    def test_function(self):
+        shape = ArbitraryShape(formula='def c(self, time, unit):\n'
+                                       '    return {a}*np.ones(len(time))')
+        missing = set()
+        assert_false(shape.eval_entries({}, missing, {}, 0))
+        assert_equal(missing, set(['a']))
+
+        assert_true(shape.eval_entries({'a': 0.5}, set(), {}, 0))
+        assert_array_equal(shape.compute(self.time, 'mus'),
+                           0.5*np.ones(11))
+
+        # The function is built once for a given set of values.
+        factory = shape._shape_factory
+        other = ArbitraryShape(formula=shape.formula)
+        assert_true(other.eval_entries({'a': 0.5}, set(), {}, 0))
+        assert_is(other._shape_factory, factory)
+        assert_equal(other.cache_key(), shape.cache_key())
+
+    def test_expression(self):
+        shape = ArbitraryShape(mode='Expression',
+                               formula='{a}*sin(2*pi*time)')
+        assert_true(shape.eval_entries({'a': 0.5}, set(), {}, 0))
+        assert_array_almost_equal(shape.compute(self.time, 'mus'),
+                                  0.5*np.sin(2*np.pi*self.time))
+
+        shape.formula = '{a}'
+        assert_true(shape.eval_entries({'a': 0.5}, set(), {}, 0))
+        assert_array_equal(shape.compute(self.time, 'mus'), 0.5*np.ones(11))
+
+    def test_expression_namespace(self):
+        # Only the ufuncs are available in expression mode.
+        shape = ArbitraryShape(mode='Expression', formula='len(time)')
+        assert_true(shape.eval_entries({}, set(), {}, 0))
+        assert_raises(NameError, shape.compute, self.time, 'mus')
+
+    def test_syntax_error(self):
+        shape = ArbitraryShape(mode='Expression', formula='time +')
+        errors = {}
+        assert_false(shape.eval_entries({}, set(), errors, 0))
+        assert_in('0_shape_exec_error', errors)
+
+    def test_validation(self):
+        shape = ArbitraryShape(mode='Expression', formula='2*time')
+        assert_true(shape.eval_entries({}, set(), {}, 0))
+        assert_raises(ValueError, shape.compute, self.time, 'mus')
+
+        shape.validate = False
+        assert_array_equal(shape.compute(self.time, 'mus'), 2*self.time)
+
+        shape.validate = True
+        nan = np.array([0.1, np.nan])
+        assert_raises(ValueError, shape.compute, nan, 'mus')
+
+
+def test_shape_timing_report():
+    # Test that the time spent computing the shapes is reported.
+    root = RootSequence(context=TestContext(sampling=0.5))
+    shape = ArbitraryShape(mode='Expression', formula='0.5*time/time')
+    root.items.extend([Pulse(def_1='1.0', def_2='2.0', kind='Analogical',
+                             shape=shape),
+                       Pulse(def_1='1.0', def_2='2.0')])
+
+    res, waveforms = root.compile_sequence()
+    assert_true(res)
+    report = root.compilation_report
+    assert_equal(report['shape_timings'].keys(), [1])
+    shape_class, duration = report['shape_timings'][1]
+    assert_equal(shape_class, 'ArbitraryShape')
+    assert_equal(report['shape_time'], duration)
@@ -574,6 +574,45 @@ class TestPulse(object):
         assert_equal(missing, set())
         assert_in('0_shape_amplitude', errors)
 
+    def test_eval_pulse_cache(self):
+        # Test that the evaluation is skipped when the variables used did not
+        # change.
+        self.pulse.def_1 = '1.0'
+        self.pulse.def_2 = '{a} + 1.0'
+
+        def evaluate(root_vars):
+            seq_locals = root_vars.copy()
+            assert_true(self.pulse.eval_entries(root_vars, seq_locals,
+                                                set(), {}))
+            assert_equal(seq_locals['0_stop'], root_vars['0_stop'])
+            return root_vars
+
+        evaluate({'a': 2.0, 'b': 1.0})
+        waveform = self.pulse.waveform
+        assert_false(waveform.flags.writeable)
+
+        root_vars = evaluate({'a': 2.0, 'b': 2.0})
+        assert_equal(root_vars['0_stop'], 3.0)
+        assert_is(self.pulse.waveform, waveform)
+
+        root_vars = evaluate({'a': 3.0, 'b': 2.0})
+        assert_equal(root_vars['0_stop'], 4.0)
+        assert_array_equal(self.pulse.waveform, np.ones(3))
+
+        self.pulse.def_2 = '{b} + 1.0'
+        root_vars = evaluate({'a': 3.0, 'b': 2.0})
+        assert_equal(self.pulse.stop, 3.0)
+
+    def test_eval_pulse_cache_missing(self):
+        # Test that a cached pulse whose variables are not yet known fails.
+        self.pulse.def_1 = '1.0'
+        self.pulse.def_2 = '{a} + 1.0'
+        self.pulse.eval_entries({'a': 2.0}, {'a': 2.0}, set(), {})
+
+        missing = set()
+        assert_false(self.pulse.eval_entries({}, {}, missing, {}))
+        assert_equal(missing, set(['a']))
+
 
 class TestModulation(object):
 
@@ -722,6 +761,66 @@ class TestCompilation(object):
         assert_equal(pulses[0].stop, 2.)
 
 
+    def test_incremental_compilation(self):
+        # Test that only the pulses depending on a modified variable are
+        # evaluated again.
+        self.root.external_vars = {'a': 1.5, 'b': 2.0}
+
+        pulse1 = Pulse(def_1='{2_start} - 1.0', def_2='{a}')
+        pulse2 = Pulse(def_1='{b}', def_2='0.5', def_mode='Start/Duration')
+        pulse3 = Pulse(def_1='{2_stop} + 0.5', def_2='10')
+        self.root.items.extend([pulse1, pulse2, pulse3])
+
+        res, pulses = self.root.compile_sequence(False)
+        assert_true(res)
+        waveforms = [p.waveform for p in pulses]
+
+        self.root.external_vars = {'a': 2.0, 'b': 2.0}
+        res, pulses = self.root.compile_sequence(False)
+        assert_true(res)
+        assert_equal((pulse1.start, pulse1.stop), (1.0, 2.0))
+        assert_equal(len(pulse1.waveform), 2)
+        assert_is(pulse2.waveform, waveforms[1])
+        assert_is(pulse3.waveform, waveforms[2])
+
+        self.root.external_vars = {'a': 2.0, 'b': 2.5}
+        res, pulses = self.root.compile_sequence(False)
+        assert_true(res)
+        assert_equal((pulse1.start, pulse1.stop), (1.5, 2.0))
+        assert_equal((pulse2.start, pulse2.stop), (2.5, 3.0))
+        assert_equal((pulse3.start, pulse3.stop), (3.5, 10.0))
+        assert_equal(len(pulse3.waveform), 13)
+
+    def test_shared_waveforms(self):
+        # Test that identical pulses share their waveform unless it depends
+        # on the absolute time.
+        self.root.external_vars = {'a': 1.5}
+
+        pulse1 = Pulse(def_1='1.0', def_2='{a}', kind='Analogical',
+                       shape=SquareShape(amplitude='0.5'))
+        pulse2 = Pulse(def_1='3.0', def_2='3.5', kind='Analogical',
+                       shape=SquareShape(amplitude='0.5'))
+        pulse3 = Pulse(def_1='3.0', def_2='3.5', kind='Analogical',
+                       shape=SquareShape(amplitude='0.5'),
+                       modulation=Modulation(activated=True, frequency='1.0'))
+        pulse4 = Pulse(def_1='1.0', def_2='{a}', kind='Analogical',
+                       shape=SquareShape(amplitude='0.5'),
+                       modulation=Modulation(activated=True, frequency='1.0'))
+        self.root.items.extend([pulse1, pulse2, pulse3, pulse4])
+
+        res, pulses = self.root.compile_sequence(False)
+        assert_true(res)
+        assert_is(pulse2.waveform, pulse1.waveform)
+        assert_false(pulse4.waveform is pulse3.waveform)
+        assert_array_equal(pulse4.waveform,
+                           0.5*np.sin(2*np.pi*np.linspace(1.0, 1.5, 1, False)))
+
+        self.root.external_vars = {'a': 2.0}
+        res, pulses = self.root.compile_sequence(False)
+        assert_true(res)
+        assert_array_equal(pulse1.waveform, 0.5*np.ones(2))
+        assert_array_equal(pulse2.waveform, 0.5*np.ones(1))
+
     def test_sequence_compilation2(self):
         # Test compiling a flat sequence of fixed duration.
         self.root.external_vars = {'a': 1.5}
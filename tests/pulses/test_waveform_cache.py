@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_waveform_cache.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal, assert_is
+import numpy as np
+
+from hqc_meas.pulses.waveform_cache import WaveformCache
+
+
+def test_lru_eviction():
+    # Test that the least recently used arrays are evicted first.
+    cache = WaveformCache(max_bytes=24)
+    arrays = [np.zeros(1) for i in range(4)]
+    for i in range(3):
+        cache.put(i, arrays[i])
+    assert_is(cache.get(0), arrays[0])
+
+    cache.put(3, arrays[3])
+    assert_equal(cache.get(1), None)
+    assert_is(cache.get(0), arrays[0])
+    assert_equal(len(cache), 3)
+    assert_equal(cache.nbytes, 24)
+    assert_equal((cache.hits, cache.misses, cache.evictions), (2, 1, 1))
+
+
+def test_too_large_array():
+    # Test that arrays larger than the cache are not stored.
+    cache = WaveformCache(max_bytes=8)
+    cache.put(0, np.zeros(1))
+    cache.put(1, np.zeros(2))
+    assert_equal(cache.get(1), None)
+    assert_equal(cache.nbytes, 8)
+
+    cache.clear()
+    assert_equal(len(cache), 0)
+    assert_equal(cache.nbytes, 0)
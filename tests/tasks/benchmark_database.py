@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : benchmark_database.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from threading import Thread
+from timeit import default_timer
+
+from hqc_meas.tasks.tools.task_database import TaskDatabase
+
+
+WRITES = 100000
+
+
+class BenchmarkContendedWrites(object):
+    """ Measure the throughput of running mode writes from several threads.
+
+    """
+
+    def setup(self):
+        self.database = TaskDatabase()
+        for i in range(8):
+            self.database.set_value('root', 'float_{}'.format(i), 1.0)
+            self.database.set_value('root', 'obj_{}'.format(i), 'a')
+        self.database.prepare_for_running()
+
+    def _run(self, label, n_threads, entry, shared=False):
+        database = self.database
+        per_thread = WRITES/n_threads
+
+        def write(i):
+            name = entry.format(0 if shared else i)
+            for j in xrange(per_thread):
+                database.set_value('root', name, float(j))
+
+        threads = [Thread(target=write, args=(i,)) for i in range(n_threads)]
+        start = default_timer()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duration = default_timer() - start
+        print label, n_threads, 'threads', WRITES/duration, 'writes/s'
+
+    def benchmark_float_entries(self):
+        for n in (1, 2, 4, 8):
+            self._run('Distinct float entries', n, 'float_{}')
+
+    def benchmark_object_entries(self):
+        for n in (1, 2, 4, 8):
+            self._run('Distinct object entries', n, 'obj_{}')
+
+    def benchmark_shared_entry(self):
+        for n in (1, 2, 4, 8):
+            self._run('Single entry', n, 'float_{}', shared=True)
+
+    def benchmark_observed_entries(self):
+        self.database.observe('notifier', lambda change: None)
+        for n in (1, 2, 4, 8):
+            self._run('Observed float entries', n, 'float_{}')
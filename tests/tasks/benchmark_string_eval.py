@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : benchmark_string_eval.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from functools import partial
+from timeit import repeat
+
+
+def time(*args, **kwargs):
+    kwargs['number'] = 1000
+    kwargs['repeat'] = 100
+    return min(repeat(*args, **kwargs))/kwargs['number']
+
+from hqc_meas.tasks.base_tasks import RootTask, PREFIX
+from hqc_meas.tasks.tools.string_evaluation import safe_eval
+
+
+class BenchmarkEvaluation(object):
+    """ Compare the per call latency of the running mode evaluation using
+    safe_eval (ie parsing the expression on each call) and the compiled
+    expressions.
+
+    """
+
+    def setup(self):
+        self.root = RootTask()
+        database = self.root.task_database
+        database.set_value('root', 'val1', 1.0)
+        database.create_node('root', 'node1')
+        database.set_value('root/node1', 'val2', 10.0)
+        database.add_access_exception('root', 'val2', 'root/node1')
+        database.prepare_for_running()
+
+    def _compare(self, label, string):
+        root = self.root
+        root.format_and_eval_string(string)
+        evaluator, ids = root._eval_cache[string]
+        database = root.task_database
+
+        # Rebuild the preformatted string as was stored before compilation.
+        expr = string
+        for name, index in database.get_entries_indexes(
+                root.task_path, [el.split('}')[0]
+                                 for el in string.split('{')[1:]]).items():
+            expr = expr.replace('{' + name + '}', PREFIX + str(index))
+
+        def old():
+            vals = database.get_values_by_index(ids, PREFIX)
+            return safe_eval(expr, vals)
+
+        print label, 'safe_eval', time(old)
+        print label, 'compiled', time(partial(root.format_and_eval_string,
+                                              string))
+
+    def benchmark_constant(self):
+        self._compare('Constant', '1.0e-3')
+
+    def benchmark_single_variable(self):
+        self._compare('Single variable', '{val1}')
+
+    def benchmark_expression(self):
+        self._compare('Expression', 'cos({val1}/{val2}) + 2*{val1}')
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_psa_tasks.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""
+"""
+from nose.tools import assert_equal, assert_in
+from multiprocessing import Event
+
+from hqc_meas.tasks.api import RootTask
+from hqc_meas.tasks.tasks_instr.psa_tasks import PSASetParam
+from hqc_meas.instruments.simulated_visa import (simulated_psa,
+                                                 open_simulated_driver)
+from hqc_meas.instruments.visa.agilent_psa import AgilentPSA
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class TestPSASetParam(object):
+
+    def setup(self):
+        self.root = RootTask(should_stop=Event(), should_pause=Event())
+        self.task = PSASetParam(task_name='Test', mode='Center/Span',
+                                center_freq='2.5', span_freq='0.5',
+                                average_nb='10')
+        self.root.children_task.append(self.task)
+
+        self.instr = simulated_psa(record=True)
+        self.task.driver = open_simulated_driver(AgilentPSA, self.instr)
+
+    def test_batched_settings(self):
+        # Test the mode is queried only once so that all the settings are sent
+        # in a single message.
+        self.instr.reset_stats()
+        self.task.perform()
+
+        mode_query, settings = self.instr.written[:2]
+        assert_equal(mode_query, 'inst:sel?')
+        for command in ('FREQ:CENT 2.5 GHz', 'FREQ:SPAN 0.5 GHz',
+                        'AVERage:COUNt 10', 'FREQ:CENT?', 'FREQ:SPAN?'):
+            assert_in(command, settings)
+        assert_equal(len([m for m in self.instr.written if 'GHz' in m]), 1)
+        config = self.task.get_from_database('Test_psa_config')
+        assert_in('Span freq 0.5', config)
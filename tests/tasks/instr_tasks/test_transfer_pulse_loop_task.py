@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_transfer_pulse_loop_task.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+"""
+"""
+from nose.tools import assert_equal, assert_true, assert_false, assert_in
+from multiprocessing import Event
+import numpy as np
+
+from hqc_meas.tasks.api import RootTask
+from hqc_meas.pulses.api import RootSequence, Pulse
+from hqc_meas.pulses.contexts.awg_context import AWGContext
+from hqc_meas.tasks.tasks_instr import transfer_pulse_loop_task
+from hqc_meas.tasks.tasks_instr.transfer_pulse_loop_task\
+    import TransferPulseLoopTask
+
+from ...util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+def as_bytes(byteseq):
+    return {ch_id: [bytearray(w) for w in waveforms]
+            for ch_id, waveforms in byteseq.items()}
+
+
+class TestLoopCompilation(object):
+
+    def setup(self):
+        self.root = RootTask(should_stop=Event(), should_pause=Event())
+        self.task = TransferPulseLoopTask(task_name='Test', loop_names='var',
+                                          loop_start='1', loop_stop='2',
+                                          loop_points='5')
+        self.root.children_task.append(self.task)
+
+        self.sequence = RootSequence()
+        self.sequence.context = AWGContext()
+        self.sequence.external_vars = {'a': None}
+        pulse1 = Pulse(def_1='0.5', def_2='{a}', channel='Ch1_M1')
+        pulse2 = Pulse(def_1='{a} + 1.0', def_2='4.0', channel='Ch1_M2')
+        self.sequence.items.extend([pulse1, pulse2])
+
+        self.task.sequence = self.sequence
+        self.task.sequence_vars = {'a': 'var'}
+        self.task._pulses_dependencies = {'RootSequence': RootSequence,
+                                          'Pulse': Pulse,
+                                          'contexts': {'AWGContext':
+                                                       AWGContext},
+                                          'shapes': {}}
+
+    def compile(self):
+        variables = self.task.intricate_loops(0, np.empty((5, 1)))
+        return list(self.task.iter_compiled_loops(['var'], variables))
+
+    def test_parallel_compilation(self):
+        sequential = self.compile()
+        self.task.compile_workers = 2
+        self.task.compile_window = 3
+        parallel = self.compile()
+
+        assert_equal(len(parallel), 5)
+        for seq_res, par_res in zip(sequential, parallel):
+            assert_true(par_res[0])
+            assert_equal(as_bytes(par_res[1]), as_bytes(seq_res[1]))
+            assert_equal(list(par_res[2]), list(seq_res[2]))
+
+    def test_parallel_compilation_failure(self):
+        self.sequence.items[0].def_2 = '{b}'
+        self.task.compile_workers = 2
+        res, (missings, errors), _ = self.compile()[0]
+        assert_equal(res, False)
+        assert_equal(missings, set(['b']))
+
+    def test_compilation_window(self):
+        # Test that no more than compile_window points are compiled in advance.
+        compile_point = transfer_pulse_loop_task._compile_point
+        calls = []
+
+        def counting_compile_point(external_vars):
+            calls.append(external_vars)
+            return compile_point(external_vars)
+
+        self.task.compile_workers = 4
+        self.task.compile_window = 2
+        variables = self.task.intricate_loops(0, np.empty((5, 1)))
+        transfer_pulse_loop_task._compile_point = counting_compile_point
+        try:
+            compiled = self.task.iter_compiled_loops(['var'], variables)
+            next(compiled)
+            assert_true(len(calls) <= 2)
+            assert_equal(len(list(compiled)), 4)
+        finally:
+            transfer_pulse_loop_task._compile_point = compile_point
+        assert_equal(len(calls), 5)
+
+    def test_check_compilation_window(self):
+        self.task.compile_workers = 2
+        self.task.compile_window = 0
+        test, traceback = self.task.check()
+        assert_false(test)
+        assert_in('root/Test_window', traceback)
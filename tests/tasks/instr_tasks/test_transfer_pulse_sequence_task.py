@@ -144,6 +144,27 @@ class TestAWGTransferInterface(object):
     def test_perform(self):
         self.task.perform()
 
+    def test_perform_after_clean(self):
+        # Test the task can be run again once its runtime state has been reset
+        # as done when the measure process reuses a built task hierarchy.
+        def get_ch(s, ch):
+            return InstrHelper(({'output_state': 'OFF'},
+                                {'select_sequence': lambda s, se: None}))
+        prof = ({'owner': [None], 'defined_channels': ('Ch1',),
+                 'run_mode': '', 'running': ''},
+                {'get_channel': get_ch,
+                 'to_send': lambda s, name, seq, initialized: True})
+        self.root.run_time['profiles'] = {'Test1': prof}
+
+        for i in range(2):
+            test, traceback = self.task.check()
+            assert_true(test, traceback)
+            self.task.perform()
+            self.root.clean_runtime_state()
+            assert_is(self.task.sequence, self.sequence)
+            assert_is(self.task.driver, None)
+            assert_false(self.task.interface.initialized)
+
 
 @attr('ui')
 class TestTransferPulseSequenceView(object):
@@ -4,6 +4,7 @@
 # author : Matthieu Dartiailh
 # license : MIT license
 # =============================================================================
+from atom.api import Int
 from hqc_meas.tasks.api import RootTask, SimpleTask, ComplexTask
 from nose.tools import assert_equal, assert_is, assert_raises, assert_not_in
 
@@ -243,3 +244,34 @@ def test_ex_access_handling7():
     assert_equal(task2.get_from_database('task4_val2'), 'r')
     task3.remove_access_exception('task4_val2')
     assert_not_in('task4_val2', task2.access_exs)
+
+
+class RuntimeTask(SimpleTask):
+    """ Task keeping some state between executions.
+
+    """
+    pref = Int(1).tag(pref=True)
+
+    built = Int()
+
+    state = Int().tag(runtime=True)
+
+
+def test_clean_runtime_state():
+    # Test that only the runtime state of the tasks is reset.
+    root = RootTask()
+    task1 = ComplexTask(task_name='task1')
+    root.children_task.append(task1)
+    task2 = RuntimeTask(task_name='task2', pref=2, built=4, state=3)
+    task1.children_task.append(task2)
+    root.task_database.prepare_for_running()
+    root.format_and_eval_string('1 + 1')
+
+    root.clean_runtime_state()
+    assert_equal(task2.pref, 2)
+    assert_equal(task2.built, 4)
+    assert_equal(task2.state, 0)
+    assert_equal(task2.task_name, 'task2')
+    assert_is(task2.root_task, root)
+    assert_is(task2.task_database, root.task_database)
+    assert_equal(root._eval_cache, {})
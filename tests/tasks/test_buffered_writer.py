@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_buffered_writer.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal, assert_raises
+from StringIO import StringIO
+from time import sleep
+
+from hqc_meas.tasks.tools.buffered_writer import BufferedFileWriter
+
+from ..util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+class RecordingFile(StringIO):
+    """In memory file counting the flushes and refusing some data.
+
+    """
+
+    def __init__(self):
+        StringIO.__init__(self)
+        self.flushes = 0
+        self.content = ''
+
+    def write(self, data):
+        if 'fail' in data:
+            raise IOError('Disk full')
+        StringIO.write(self, data)
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.content = self.getvalue()
+        StringIO.close(self)
+
+
+def test_flush_policies():
+    f = RecordingFile()
+    writer = BufferedFileWriter(f, flush_interval=100.0, flush_size=10)
+    writer.write('abc\n')
+    sleep(0.2)
+    assert_equal(f.flushes, 0)
+
+    writer.write('0123456789\n')
+    sleep(0.2)
+    assert_equal(f.flushes, 1)
+
+    writer.write('abc\n')
+    writer.flush()
+    assert_equal(f.flushes, 2)
+    assert_equal(f.getvalue(), 'abc\n0123456789\nabc\n')
+
+    writer.close()
+    assert_equal(f.content, 'abc\n0123456789\nabc\n')
+    assert_raises(ValueError, writer.write, 'abc\n')
+
+
+def test_write_error():
+    writer = BufferedFileWriter(RecordingFile())
+    writer.write('fail\n')
+    assert_raises(IOError, writer.flush)
+    assert_raises(IOError, writer.close)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_column_buffer.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal, assert_is, assert_true
+import numpy as np
+
+from hqc_meas.tasks.tools.column_buffer import ColumnBuffer, MIN_CAPACITY
+
+from ..util import complete_line
+
+
+def setup_module():
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+
+
+def test_growth():
+    buff = ColumnBuffer(['a', 'b'])
+    assert_equal(buff.capacity, 1)
+    for i in range(MIN_CAPACITY + 1):
+        buff.append((i, 2*i))
+
+    assert_equal(len(buff), MIN_CAPACITY + 1)
+    assert_equal(buff.capacity, 2*MIN_CAPACITY)
+    np.testing.assert_array_equal(buff['b'], 2*np.arange(MIN_CAPACITY + 1))
+
+
+def test_known_capacity():
+    buff = ColumnBuffer(['a'], 3)
+    for i in range(3):
+        buff.append((i,))
+    assert_equal(buff.capacity, 3)
+
+
+def test_views():
+    buff = ColumnBuffer(['a', 'b'], 10)
+    buff.append((1, 2))
+    assert_true(np.may_share_memory(buff['a'], buff._data))
+    buff.append((3, 4))
+    np.testing.assert_array_equal(buff['a'], [1, 3])
+    array = buff.array
+    assert_is(type(array), np.ndarray)
+    assert_true(np.may_share_memory(array, buff._data))
+    assert_equal(len(array), 2)
+
+
+def test_complex_values():
+    buff = ColumnBuffer(['a', 'b'], 10)
+    buff.append((1, 2))
+    buff.append((1, 2 + 1j))
+    assert_equal(buff.dtype, np.dtype([('a', 'f8'), ('b', 'c16')]))
+    np.testing.assert_array_equal(buff['b'], [2, 2 + 1j])
+
+
+def test_record_conversion():
+    buff = ColumnBuffer(['a', 'b'])
+    buff.append((1, 2))
+    buff.append((3, 4))
+    array = np.asarray(buff)
+    assert_equal(array.dtype.names, ('a', 'b'))
+    np.testing.assert_array_equal(array['a'], [1, 3])
+    assert_equal(buff[1]['b'], 4)
@@ -257,3 +257,82 @@ def test_get_set_on_flat_database3():
 
     assert_false(database.set_value('root/node1', 'val2', 2))
     assert_equal(database.get_value('root/node1', 'val2'), 2)
+
+
+def test_get_set_on_flat_database4():
+    # Test get/set operations on float entries, which are stored in a typed
+    # buffer, and that they can change type.
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1.0)
+    database.set_value('root', 'val2', 2)
+
+    database.prepare_for_running()
+    assert_equal(database.get_value('root', 'val1'), 1.0)
+    database.set_value('root', 'val1', 3.0)
+    assert_equal(database.get_value('root', 'val1'), 3.0)
+    indexes = database.get_entries_indexes('root', ['val1', 'val2'])
+    assert_equal(database.get_values_by_index([indexes['val1'],
+                                               indexes['val2']]), [3.0, 2])
+
+    database.set_value('root', 'val1', 'a')
+    assert_equal(database.get_value('root', 'val1'), 'a')
+    database.set_value('root', 'val1', 4.0)
+    assert_equal(database.get_value('root', 'val1'), 4.0)
+
+
+def test_notification_on_flat_database():
+    # Test that observers are not called while holding the lock.
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1.0)
+    database.prepare_for_running()
+    locked = []
+
+    def observer(change):
+        locked.append(any(l.locked() for l in database._locks))
+
+    database.observe('notifier', observer)
+    database.set_value('root', 'val1', 2.0)
+    assert_equal(locked, [False])
+
+
+def test_set_get_values_on_flat_database():
+    # Test setting and getting several values at once in running mode.
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1.0)
+    database.create_node('root', 'node1')
+    database.set_value('root/node1', 'val2', 'a')
+    database.add_access_exception('root', 'val2', 'root/node1')
+    database.prepare_for_running()
+    notifications = []
+    database.observe('notifier',
+                     lambda change: notifications.append(change['value']))
+
+    assert_false(database.set_values('root', {'val1': 2.0, 'val2': 'b'}))
+    assert_equal(database.get_values('root/node1', ['val1', 'val2']),
+                 [2.0, 'b'])
+    assert_equal(len(notifications), 1)
+    assert_equal(sorted(notifications[0]),
+                 [('root/val1', 2.0), ('root/val2', 'b')])
+
+    # Second call uses the cached indexes.
+    database.set_values('root', {'val1': 3.0, 'val2': 'c'})
+    assert_equal(database.get_values('root/node1', ['val1', 'val2']),
+                 [3.0, 'c'])
+
+
+def test_restore_edition_mode():
+    # Test that leaving the running mode restores the nested database.
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1.0)
+    database.create_node('root', 'node1')
+    database.set_value('root/node1', 'val2', 'a')
+    database.prepare_for_running()
+    database.set_value('root', 'val1', 2.0)
+
+    database.restore_edition_mode()
+    assert_false(database.running)
+    assert_equal(database.get_value('root', 'val1'), 1.0)
+    assert_equal(database.get_value('root/node1', 'val2'), 'a')
+
+    database.prepare_for_running()
+    assert_equal(database.get_value('root', 'val1'), 1.0)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : test_hdf5_writer.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from nose.tools import assert_equal
+from tempfile import mkdtemp
+import os
+import shutil
+import numpy as np
+import h5py
+
+from hqc_meas.tasks.tools.hdf5_writer import (ChunkedHDF5Writer, chunk_rows,
+                                              CHUNK_BYTES, MIN_CHUNK_ROWS)
+
+from ..util import complete_line
+
+
+TEST_DIR = None
+
+
+def setup_module():
+    global TEST_DIR
+    print complete_line(__name__ + ': setup_module()', '~', 78)
+    TEST_DIR = mkdtemp()
+
+
+def teardown_module():
+    print complete_line(__name__ + ': teardown_module()', '~', 78)
+    shutil.rmtree(TEST_DIR)
+
+
+def test_chunk_rows():
+    assert_equal(chunk_rows((), 'float64'), CHUNK_BYTES/8)
+    assert_equal(chunk_rows((100,), 'float32'), CHUNK_BYTES/400)
+    assert_equal(chunk_rows((), 'float64', 10), MIN_CHUNK_ROWS)
+    assert_equal(chunk_rows((), 'float64', 1000), 1000)
+    assert_equal(chunk_rows((CHUNK_BYTES,), 'float64'), 1)
+
+
+def test_chunked_writing():
+    path = os.path.join(TEST_DIR, 'chunks.h5')
+    writer = ChunkedHDF5Writer(path, 'header', flush_interval=100.0,
+                               rows_estimate=10)
+    writer.create_dataset('x', (), 'float64')
+    writer.create_dataset('y', (3,), 'float32')
+    writer.start()
+
+    assert_equal(writer.file['x'].chunks, (MIN_CHUNK_ROWS,))
+    for i in range(MIN_CHUNK_ROWS + 5):
+        writer.append({'x': i, 'y': [i, 2*i, 3*i]})
+        if i == MIN_CHUNK_ROWS - 2:
+            assert_equal(writer.file['x'].shape, (0,))
+
+    # A full chunk was written, the remaining points are buffered.
+    assert_equal(writer.rows, MIN_CHUNK_ROWS)
+    assert_equal(writer.file['y'].shape, (MIN_CHUNK_ROWS, 3))
+    assert_equal(writer.file.attrs['countCalls'], MIN_CHUNK_ROWS)
+    writer.close()
+    writer.close()
+
+    with h5py.File(path, 'r') as f:
+        assert_equal(f.attrs['header'], 'header')
+        assert_equal(f.attrs['countCalls'], MIN_CHUNK_ROWS + 5)
+        np.testing.assert_array_equal(f['x'][:],
+                                      np.arange(MIN_CHUNK_ROWS + 5))
+        np.testing.assert_array_equal(f['y'][-1],
+                                      np.arange(1, 4)*(MIN_CHUNK_ROWS + 4))
+
+
+def test_swmr_writing():
+    path = os.path.join(TEST_DIR, 'swmr.h5')
+    writer = ChunkedHDF5Writer(path, compression='gzip', shuffle=True,
+                               flush_interval=0.0, swmr=True)
+    writer.create_dataset('x', (), 'float64')
+    writer.start()
+    writer.append({'x': 1.0})
+    writer.append({'x': 2.0})
+
+    with h5py.File(path, 'r', libver='latest', swmr=True) as f:
+        np.testing.assert_array_equal(f['x'][:], [1.0, 2.0])
+
+    writer.close()
+    with h5py.File(path, 'r') as f:
+        assert_equal(f.attrs['countCalls'], 2)
+        assert_equal(f['x'].compression, 'gzip')
@@ -6,6 +6,7 @@
 #==============================================================================
 from nose.tools import assert_in, assert_equal, assert_false, assert_true
 from hqc_meas.tasks.base_tasks import RootTask
+from hqc_meas.tasks.tools.string_evaluation import compile_eval
 from math import cos
 import numpy
 from numpy.testing import assert_array_equal
@@ -182,3 +183,45 @@ class TestEvaluation(object):
         test = 'np.abs({val1})[{val2}]'
         formatted = self.root.format_and_eval_string(test)
         assert_equal(formatted, 2.0)
+
+    def test_eval_running_mode5(self):
+        # Single variable expressions should not go through eval.
+        self.root.task_database.prepare_for_running()
+        test = '{val1}'
+        formatted = self.root.format_and_eval_string(test)
+        assert_equal(formatted, 1)
+        self.root.task_database.set_value('root', 'val1', 3)
+        formatted = self.root.format_and_eval_string(test)
+        assert_equal(formatted, 3)
+
+    def test_eval_running_mode6(self):
+        self.root.task_database.prepare_for_running()
+        test = '2.0*Pi'
+        formatted = self.root.format_and_eval_string(test)
+        assert_equal(formatted, 2.0*numpy.pi)
+        assert_in(test, self.root._eval_cache)
+        assert_equal(self.root.format_and_eval_string(test), 2.0*numpy.pi)
+
+
+class TestCompileEval(object):
+
+    def test_word(self):
+        assert_equal(compile_eval('Auto')(), 'Auto')
+
+    def test_constant(self):
+        assert_equal(compile_eval(' 1.5e-3 ')(), 1.5e-3)
+
+    def test_mutable_constant(self):
+        evaluator = compile_eval('[1, 2]')
+        res = evaluator()
+        res.append(3)
+        assert_equal(evaluator(), [1, 2])
+
+    def test_single_variable(self):
+        evaluator = compile_eval('_a0', ['_a0'])
+        assert_equal(evaluator({'_a0': 2}), 2)
+
+    def test_expression(self):
+        evaluator = compile_eval('cos(_a0) + _a1', ['_a0', '_a1'])
+        assert_equal(evaluator({'_a0': 0.0, '_a1': 1.0}), 2.0)
+        assert_equal(evaluator({'_a0': 0.0, '_a1': 2.0}), 3.0)
@@ -18,7 +18,7 @@ class InterfaceTest(TaskInterface):
 
     answer = Bool()
 
-    called = Bool()
+    called = Bool().tag(runtime=True)
 
     interface_database_entries = set_default({'itest': 1.0})
 
@@ -103,6 +103,15 @@ class TestInterfaceableTaskMixin(object):
         assert_equal(len(traceback), 1)
         assert_true(self.mixin.interface.called)
 
+    def test_clean_runtime_state(self):
+        # Test that the interface state is reset along the task one.
+        interface = InterfaceTest(called=True)
+        self.mixin.interface = interface
+        self.mixin.clean_runtime_state()
+        assert_is(self.mixin.interface, interface)
+        assert_is(interface.task, self.mixin)
+        assert_false(interface.called)
+
     def test_build_from_config1(self):
         # Test building a interfaceable task from a config.
         aux = RootTask()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# module : benchmark_save_hdf5.py
+# author : Matthieu Dartiailh
+# license : MIT license
+# =============================================================================
+from tempfile import mkdtemp
+from timeit import default_timer
+import os
+import shutil
+import numpy as np
+import h5py
+
+from hqc_meas.tasks.tools.hdf5_writer import ChunkedHDF5Writer
+
+
+POINTS = 5000
+
+#: Shapes of the rows of the saved values.
+ROWS = {'scalar': (), 'trace': (1000,)}
+
+
+def legacy_write(path, row_shape, compression, calls_estimation=1):
+    """Write the points as the SaveFileHDF5Task did before the chunked writer.
+
+    """
+    kwargs = {'compression': compression} if compression else {}
+    f = h5py.File(path, 'w')
+    f.create_dataset('x', (calls_estimation,) + row_shape,
+                     maxshape=(None,) + row_shape, dtype='float64', **kwargs)
+    f.attrs['countCalls'] = 0
+    value = np.random.rand(*row_shape)
+    for i in xrange(POINTS):
+        count = f.attrs['countCalls']
+        if not count % calls_estimation:
+            f['x'].resize((count + calls_estimation,) + row_shape)
+        f['x'][count] = value
+        f.attrs['countCalls'] = count + 1
+        f.flush()
+    f['x'].resize((POINTS,) + row_shape)
+    f.close()
+
+
+def chunked_write(path, row_shape, compression, shuffle=False):
+    """Write the points using the chunked writer.
+
+    """
+    writer = ChunkedHDF5Writer(path, compression=compression, shuffle=shuffle,
+                               rows_estimate=POINTS)
+    writer.create_dataset('x', row_shape, 'float64')
+    writer.start()
+    value = np.random.rand(*row_shape)
+    for i in xrange(POINTS):
+        writer.append({'x': value})
+    writer.close()
+
+
+class BenchmarkHDF5Writing(object):
+    """ Compare the number of points per second saved by the former per point
+    writing and by the chunked writer.
+
+    """
+
+    def setup(self):
+        self.folder = mkdtemp()
+        self.path = os.path.join(self.folder, 'benchmark.h5')
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def _run(self, label, func, *args):
+        tic = default_timer()
+        func(self.path, *args)
+        duration = default_timer() - tic
+        print label, POINTS/duration, 'points/s'
+
+    def benchmark_legacy(self):
+        for name, shape in sorted(ROWS.items()):
+            self._run('Legacy ' + name, legacy_write, shape, None)
+            self._run('Legacy gzip ' + name, legacy_write, shape, 'gzip')
+
+    def benchmark_chunked(self):
+        for name, shape in sorted(ROWS.items()):
+            self._run('Chunked ' + name, chunked_write, shape, None)
+            self._run('Chunked gzip ' + name, chunked_write, shape, 'gzip')
+            self._run('Chunked lzf+shuffle ' + name, chunked_write, shape,
+                      'lzf', True)
@@ -7,7 +7,7 @@
 """
 """
 from nose.tools import (assert_equal, assert_true, assert_false, assert_in,
-                        assert_is, assert_is_instance)
+                        assert_is, assert_is_not, assert_is_instance)
 from nose.plugins.attrib import attr
 from multiprocessing import Event
 from enaml.workbench.api import Workbench
@@ -15,8 +15,13 @@ import numpy as np
 import os
 
 from hqc_meas.tasks.api import RootTask
+from hqc_meas.tasks.tasks_util import load_tasks
 from hqc_meas.tasks.tasks_util.load_tasks import (LoadArrayTask,
-                                                  CSVLoadInterface)
+                                                  CSVLoadInterface,
+                                                  BinaryLoadInterface,
+                                                  NPYLoadInterface)
+from hqc_meas.tasks.tools.binary_columns import (write_sidecar, append_block,
+                                                 sidecar_path)
 
 import enaml
 with enaml.imports():
@@ -90,6 +95,154 @@ class TestLoadArrayTaskCSVInterface(object):
         array = self.task.get_from_database('Test_array')
         np.testing.assert_array_equal(array, self.data)
 
+    def test_perform_cache(self):
+        # Test that the file is parsed only once unless it is modified.
+        self.task.perform()
+        array = self.task.get_from_database('Test_array')
+        assert_false(array.flags.writeable)
+        self.task.perform()
+        assert_is(self.task.get_from_database('Test_array'), array)
+
+        self.task.use_cache = False
+        self.task.perform()
+        assert_is_not(self.task.get_from_database('Test_array'), array)
+
+        self.task.use_cache = True
+        self.task.clean_runtime_state()
+        self.task.perform()
+        assert_is_not(self.task.get_from_database('Test_array'), array)
+
+    def test_perform_cache_limit(self):
+        # Test that the least recently used files are dropped from the cache
+        # and that too large files are not cached.
+        path = os.path.join(FOLDER_PATH, 'fake.dat')
+        other = os.path.join(FOLDER_PATH, 'fake.npy')
+        np.save(other, self.data)
+        old = load_tasks.FILE_CACHE_MAX_BYTES
+        load_tasks.FILE_CACHE_MAX_BYTES = 100
+        try:
+            array = self.task.load_file(path, lambda p: np.zeros(10))
+            assert_is(self.task.load_file(path, None), array)
+            self.task.load_file(other, lambda p: np.zeros(10))
+            assert_equal(list(self.task._file_cache), [other])
+            assert_is_not(self.task.load_file(path, lambda p: np.zeros(10)),
+                          array)
+
+            self.task.load_file(other, lambda p: np.zeros(20))
+            assert_equal(list(self.task._file_cache), [path])
+            assert_equal(self.task._cached_bytes, 80)
+        finally:
+            load_tasks.FILE_CACHE_MAX_BYTES = old
+            os.remove(other)
+
+
+class TestLoadArrayTaskBinaryInterface(object):
+
+    @classmethod
+    def setup_class(cls):
+        full_path = os.path.join(FOLDER_PATH, 'fake.bin')
+        write_sidecar(full_path, ['Freq', 'Log'], 1, 'comment')
+        with open(full_path, 'wb') as f:
+            for i in range(5):
+                append_block(f, [[i, 2*i]])
+
+    @classmethod
+    def teardown_class(cls):
+        full_path = os.path.join(FOLDER_PATH, 'fake.bin')
+        for path in (full_path, sidecar_path(full_path)):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def setup(self):
+        self.root = RootTask(should_stop=Event(), should_pause=Event())
+        self.task = LoadArrayTask(task_name='Test')
+        self.task.interface = BinaryLoadInterface()
+        self.task.folder = FOLDER_PATH
+        self.task.filename = 'fake.bin'
+        self.root.children_task.append(self.task)
+
+    def test_check(self):
+        # Test the names are read from the sidecar.
+        test, traceback = self.task.check()
+        assert_true(test)
+        assert_false(traceback)
+        array = self.task.get_from_database('Test_array')
+        assert_equal(array.dtype.names, ('Freq', 'Log'))
+
+    def test_perform(self):
+        # Test loading the file with and without memory mapping.
+        self.task.perform()
+        array = self.task.get_from_database('Test_array')
+        assert_is_instance(array, np.memmap)
+        np.testing.assert_array_equal(array['Log'], 2*np.arange(5))
+
+        self.task.interface.use_mmap = False
+        self.task.perform()
+        array = self.task.get_from_database('Test_array')
+        assert_false(isinstance(array, np.memmap))
+        np.testing.assert_array_equal(array['Freq'], np.arange(5))
+
+    def test_perform_option_change(self):
+        # Test the cached data are not used once an option of the interface
+        # changed.
+        self.task.interface.use_mmap = False
+        self.task.perform()
+        array = self.task.get_from_database('Test_array')
+        self.task.perform()
+        assert_is(self.task.get_from_database('Test_array'), array)
+
+        self.task.interface.use_mmap = True
+        self.task.perform()
+        assert_is_instance(self.task.get_from_database('Test_array'),
+                           np.memmap)
+
+
+class TestLoadArrayTaskNPYInterface(object):
+
+    @classmethod
+    def setup_class(cls):
+        cls.data = np.arange(10.)
+        np.save(os.path.join(FOLDER_PATH, 'fake.npy'), cls.data)
+
+    @classmethod
+    def teardown_class(cls):
+        full_path = os.path.join(FOLDER_PATH, 'fake.npy')
+        if os.path.isfile(full_path):
+            os.remove(full_path)
+
+    def setup(self):
+        self.root = RootTask(should_stop=Event(), should_pause=Event())
+        self.task = LoadArrayTask(task_name='Test')
+        self.task.interface = NPYLoadInterface()
+        self.task.folder = FOLDER_PATH
+        self.task.filename = 'fake.npy'
+        self.root.children_task.append(self.task)
+
+    def test_check(self):
+        # Test the type of the array is published in the database.
+        test, traceback = self.task.check()
+        assert_true(test)
+        assert_false(traceback)
+        array = self.task.get_from_database('Test_array')
+        assert_equal(array.dtype, self.data.dtype)
+
+    def test_perform(self):
+        # Test loading the file and reloading it once modified.
+        self.task.perform()
+        array = self.task.get_from_database('Test_array')
+        assert_is_instance(array, np.memmap)
+        np.testing.assert_array_equal(array, self.data)
+
+        self.task.perform()
+        assert_is(self.task.get_from_database('Test_array'), array)
+
+        full_path = os.path.join(FOLDER_PATH, 'fake.npy')
+        np.save(full_path, np.arange(20.))
+        self.task.perform()
+        array = self.task.get_from_database('Test_array')
+        assert_equal(len(array), 20)
+        np.save(full_path, self.data)
+
 
 @attr('ui')
 class TestLoadArrayView(object):
@@ -10,14 +10,18 @@ from nose.tools import (assert_equal, assert_true, assert_false, assert_in,
                         assert_not_in, assert_raises)
 from nose.plugins.attrib import attr
 from multiprocessing import Event
+from time import sleep
 from enaml.workbench.api import Workbench
 import os
 import shutil
 import numpy as np
+import h5py
 
 from hqc_meas.tasks.api import RootTask
 from hqc_meas.tasks.tasks_util.save_tasks import (SaveTask, SaveArrayTask,
-                                                  SaveFileTask)
+                                                  SaveFileTask,
+                                                  SaveFileHDF5Task)
+from hqc_meas.tasks.tools.binary_columns import load_columns
 
 import enaml
 with enaml.imports():
@@ -226,17 +230,16 @@ class TestSaveTask(object):
                      np.array([1.0]))
 
     def test_check8(self):
-        # Test check issues in array mode : absent array_size.
+        # Test check in array mode : absent array_size (growing array).
         task = self.task
         task.saving_target = 'Array'
         task.saved_values = [('toto', '{Root_str}'), ('tata', '{Root_float}')]
 
         test, traceback = task.check()
-        assert_false(test)
-        assert_true(traceback)
-        assert_equal(len(traceback), 1)
-        assert_equal(self.task.get_from_database('Test_array'),
-                     np.array([1.0]))
+        assert_true(test)
+        assert_false(traceback)
+        array = task.get_from_database('Test_array')
+        assert_equal(array.dtype.names, ('toto', 'tata'))
 
     def test_check9(self):
         # Test check issues in entrie.
@@ -315,6 +318,30 @@ class TestSaveTask(object):
             assert_equal(a, ['test\n', '# test a\n', 'toto\ttata\n',
                              'a\t2.0\n', 'a\t2.0\n', 'a\t2.0\n'])
 
+    def test_perform_buffered(self):
+        # Test performing in mode file with a background writer.
+        task = self.task
+        task.saving_target = 'File'
+        task.folder = self.test_dir
+        task.filename = 'test_perform_buffered.txt'
+        task.array_size = '3'
+        task.flush_interval = 100.0
+        task.saved_values = [('toto', '{Root_str}'), ('tata', '{Root_float}')]
+        file_path = os.path.join(self.test_dir, 'test_perform_buffered.txt')
+
+        task.perform()
+        task.perform()
+        self.root.should_stop.set()
+        sleep(0.5)
+        with open(file_path) as f:
+            a = f.readlines()
+            assert_equal(a, ['toto\ttata\n', 'a\t2.0\n', 'a\t2.0\n'])
+
+        task.perform()
+        assert_true(task.file_object.closed)
+        with open(file_path) as f:
+            assert_equal(len(f.readlines()), 4)
+
     def test_perform2(self):
         # Test performing in array mode. (Call three times perform)
         task = self.task
@@ -343,7 +370,46 @@ class TestSaveTask(object):
         array[0] = (1, 2.0)
         array[1] = (1, 2.0)
         array[2] = (1, 2.0)
-        np.testing.assert_array_equal(task.array, array)
+        saved = task.get_from_database('Test_array')
+        assert_true(isinstance(saved, np.ndarray))
+        np.testing.assert_array_equal(saved, array)
+
+    def test_perform3(self):
+        # Test performing in array mode with an unknown size and complex
+        # values.
+        task = self.task
+        task.saving_target = 'Array'
+        task.saved_values = [('toto', '{Root_int}'), ('tata', '{Root_float}')]
+
+        for i in range(20):
+            task.perform()
+        self.root.write_in_database('float', 1j)
+        task.perform()
+
+        assert_true(task.initialized)
+        array = task.get_from_database('Test_array')
+        assert_equal(len(array), 21)
+        assert_equal(array['toto'].dtype, np.float64)
+        assert_equal(array['tata'].dtype, np.complex128)
+        np.testing.assert_array_equal(array['tata'], [2.0]*20 + [1j])
+
+    def test_perform_save_array(self):
+        # Test the array can be saved by a SaveArrayTask.
+        task = self.task
+        task.saving_target = 'Array'
+        task.saved_values = [('toto', '{Root_int}'), ('tata', '{Root_float}')]
+        save = SaveArrayTask(task_name='Save', folder=self.test_dir,
+                             filename='array.dat', target_array='{Test_array}')
+        self.root.children_task.append(save)
+
+        for i in range(3):
+            task.perform()
+        save.perform()
+
+        data = np.genfromtxt(os.path.join(self.test_dir, 'array.dat'),
+                             names=True)
+        assert_equal(data.dtype.names, ('toto', 'tata'))
+        np.testing.assert_array_equal(data['tata'], [2.0]*3)
 
 
 class TestSaveFileTask(object):
@@ -551,6 +617,147 @@ class TestSaveFileTask(object):
             task.file_object.close()
 
 
+    def test_perform_binary(self):
+        # Test performing in binary mode with a rec array and a scalar.
+        self.root.write_in_database('array',
+                                    np.rec.fromarrays([range(10), range(10)],
+                                                      names=['a', 'b']))
+        task = self.task
+        task.folder = self.test_dir
+        task.filename = 'test_perform.bin'
+        task.file_format = 'Binary'
+        task.header = 'test {Root_float}'
+        task.saved_values = [('toto', '{Root_float}'),
+                             ('tata', '{Root_array}')]
+        file_path = os.path.join(self.test_dir, 'test_perform.bin')
+
+        try:
+            task.perform()
+            task.perform()
+        finally:
+            task.file_object.close()
+
+        data, header = load_columns(file_path)
+        assert_equal(header, 'test 2.0')
+        assert_equal(data.dtype.names, ('toto', 'tata_a', 'tata_b'))
+        assert_equal(data['tata_b'].shape, (2, 10))
+        np.testing.assert_array_equal(data['tata_a'][1], range(10))
+        np.testing.assert_array_equal(data['toto'], 2.0)
+
+    def test_perform_binary_size_change(self):
+        # Test that changing the arrays size stops the measure.
+        task = self.task
+        task.folder = self.test_dir
+        task.filename = 'test_size.bin'
+        task.file_format = 'Binary'
+        task.saved_values = [('tata', '{Root_array}')]
+
+        try:
+            task.perform()
+            self.root.write_in_database('array', np.array(range(5)))
+            task.perform()
+        finally:
+            task.file_object.close()
+
+        assert_true(self.root.should_stop.is_set())
+        file_path = os.path.join(self.test_dir, 'test_size.bin')
+        assert_equal(os.path.getsize(file_path), 80)
+
+
+class TestSaveFileHDF5Task(object):
+
+    test_dir = TEST_PATH + '4'
+
+    @classmethod
+    def setup_class(cls):
+        print complete_line(__name__ +
+                            ':{}.setup_class()'.format(cls.__name__), '-', 77)
+        os.mkdir(cls.test_dir)
+
+    @classmethod
+    def teardown_class(cls):
+        print complete_line(__name__ +
+                            ':{}.teardown_class()'.format(cls.__name__), '-',
+                            77)
+        shutil.rmtree(cls.test_dir)
+
+    def setup(self):
+        self.root = RootTask(should_stop=Event(), should_pause=Event())
+        self.task = SaveFileHDF5Task(task_name='Test')
+        self.root.children_task.append(self.task)
+
+        self.root.write_in_database('int', 1)
+        self.root.write_in_database('float', 2.0)
+        self.root.write_in_database('array', np.array(range(10)))
+
+    def teardown(self):
+        folder = self.test_dir
+        for the_file in os.listdir(folder):
+            file_path = os.path.join(folder, the_file)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+
+    def test_perform1(self):
+        # Test performing with non rec array, the points being written by
+        # chunks.
+        task = self.task
+        task.folder = self.test_dir
+        task.filename = 'test_perform{Root_int}.h5'
+        task.header = 'test {Root_float}'
+        task.datatype = 'float64'
+        task.flush_interval = 100.0
+        task.saved_values = [('toto', '{Root_float}'),
+                             ('tata', '{Root_array}')]
+        file_path = os.path.join(self.test_dir, 'test_perform1.h5')
+
+        try:
+            for i in range(3):
+                task.perform()
+
+            assert_true(task.initialized)
+            assert_equal(task.file_object.rows, 0)
+            task.file_object.flush()
+            assert_equal(task.file_object.rows, 3)
+        finally:
+            task.file_object.close()
+
+        with h5py.File(file_path, 'r') as f:
+            assert_equal(f.attrs['header'], 'test 2.0')
+            assert_equal(f.attrs['countCalls'], 3)
+            np.testing.assert_array_equal(f['toto'][:], [2.0]*3)
+            assert_equal(f['tata'].shape, (3, 10))
+            np.testing.assert_array_equal(f['tata'][2], range(10))
+
+    def test_perform2(self):
+        # Test performing with a rec array and compression.
+        self.root.write_in_database('array',
+                                    np.rec.fromarrays([range(10), range(10)],
+                                                      names=['a', 'b']))
+        task = self.task
+        task.folder = self.test_dir
+        task.filename = 'test_perform_rec.h5'
+        task.compression = True
+        task.compression_filter = 'lzf'
+        task.shuffle = True
+        task.flush_interval = 0.0
+        task.saved_values = [('toto', '{Root_float}'),
+                             ('tata', '{Root_array}')]
+        file_path = os.path.join(self.test_dir, 'test_perform_rec.h5')
+
+        try:
+            task.perform()
+            task.perform()
+            assert_equal(task.file_object.rows, 2)
+        finally:
+            task.file_object.close()
+
+        with h5py.File(file_path, 'r') as f:
+            assert_equal(sorted(f.keys()), ['tata_a', 'tata_b', 'toto'])
+            assert_equal(f['tata_a'].compression, 'lzf')
+            assert_equal(f['tata_b'].shape, (2, 10))
+            assert_equal(f.attrs['countCalls'], 2)
+
+
 class TestSaveArrayTask(object):
 
     test_dir = TEST_PATH